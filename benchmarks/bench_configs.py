@@ -0,0 +1,105 @@
+# Copyright (C) 10se1ucgo 2016
+#
+# This file is part of pyjam.
+#
+# pyjam is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# pyjam is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with pyjam.  If not, see <http://www.gnu.org/licenses/>.
+
+# Render and publish time of the pyjam cfg files for a big library with aliases and binds.
+# Run from the repository root: python benchmarks/bench_configs.py [--tracks 10000]
+from __future__ import print_function
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.path.pardir))
+
+from jam import renderer  # noqa: E402
+from jam.common import SOURCE_KEYS, Track  # noqa: E402
+
+
+def write_track_configs_legacy(path, tracks, play_key, relay_key, use_aliases):
+    # jam.cfg and jam_la.cfg the way write_configs used to write them: truncated, then written line by line.
+    with open(os.path.join(path, 'jam.cfg'), 'w') as cfg:
+        cfg.write('bind {play_key} jam_play\n'.format(play_key=play_key))
+        for x, track in enumerate(tracks):
+            cfg.write('alias {x} "bind {relay} {x}; echo Loaded: {name}; jam_cmd"\n'.format(
+                x=x, relay=relay_key, name=track.name
+            ))
+            if use_aliases:
+                for alias in track.aliases:
+                    cfg.write('alias {alias} "bind {relay} {x}; echo Loaded: {name}; jam_cmd"\n'.format(
+                        alias=alias, relay=relay_key, x=x, name=track.name
+                    ))
+            if track.bind:
+                cfg.write('bind {bind} "bind {relay} {x}; echo Loaded: {name}; jam_cmd"\n'.format(
+                    bind=track.bind, relay=relay_key, x=x, name=track.name
+                ))
+    with open(os.path.join(path, 'jam_la.cfg'), 'w') as cfg:
+        cfg.write('exec "jam_curtrack"\n')
+        for x, track in enumerate(tracks):
+            cfg.write('echo "{x}. {name}; Aliases: {aliases}{broken}"\n'.format(
+                x=x, name=track.name, aliases=track.aliases, broken=" (needs conversion)" if track.problems else ''
+            ))
+
+
+def make_tracks(count):
+    return [Track(index, "Artist {a} - Song {n}".format(a=index % 500, n=index),
+                  ["artist{a}".format(a=index % 500), "song{n}".format(n=index), "s{n}".format(n=index)],
+                  "/music/{n}.wav".format(n=index), SOURCE_KEYS[index] if index < len(SOURCE_KEYS) else None)
+            for index in range(count)]
+
+
+def timed(func, *args):
+    start = time.perf_counter()
+    func(*args)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark rendering and publishing the pyjam cfg files.")
+    parser.add_argument('--tracks', type=int, default=10000, help="amount of synthetic tracks (default: %(default)s)")
+    parser.add_argument('--repeat', type=int, default=5, help="runs to take the best time of (default: %(default)s)")
+    args = parser.parse_args()
+
+    tracks = make_tracks(args.tracks)
+    # The legacy writer always wrote the whole list to jam.cfg and jam_la.cfg. Pin the page size so the renderer writes
+    # the same two files instead of switching to the paged layout for big libraries.
+    page_size = max(args.tracks, 1)
+    cfg_path = tempfile.mkdtemp(prefix='pyjam_bench')
+    try:
+        legacy = min(timed(write_track_configs_legacy, cfg_path, tracks, 'F8', '=', True) for _ in range(args.repeat))
+        render = min(timed(renderer.render_track_configs, tracks, 'F8', '=', True, page_size)
+                     for _ in range(args.repeat))
+
+        def render_publish():
+            renderer.publish(cfg_path, renderer.render_track_configs(tracks, 'F8', '=', True, page_size))
+        # The legacy writer left its own output behind, so the first publish has to write.
+        first = timed(render_publish)
+        unchanged = min(timed(render_publish) for _ in range(args.repeat))
+        size = sum(os.path.getsize(os.path.join(cfg_path, name)) for name in renderer.TRACK_CONFIGS)
+    finally:
+        shutil.rmtree(cfg_path)
+
+    print("{num} tracks, {size:.1f} KiB of jam.cfg + jam_la.cfg".format(num=args.tracks, size=size / 1024))
+    print("{what:<34} {time:>8.1f} ms".format(what="legacy line by line write", time=legacy * 1000))
+    print("{what:<34} {time:>8.1f} ms".format(what="render in memory", time=render * 1000))
+    print("{what:<34} {time:>8.1f} ms".format(what="render + atomic publish (changed)", time=first * 1000))
+    print("{what:<34} {time:>8.1f} ms".format(what="render + publish (unchanged)", time=unchanged * 1000))
+
+
+if __name__ == '__main__':
+    main()
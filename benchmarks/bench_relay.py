@@ -0,0 +1,119 @@
+# Copyright (C) 10se1ucgo 2016
+#
+# This file is part of pyjam.
+#
+# pyjam is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# pyjam is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with pyjam.  If not, see <http://www.gnu.org/licenses/>.
+
+# Time it takes to find the relay key bind in a host_writeconfig dump of jam_cmd.cfg.
+# Run from the repository root: python benchmarks/bench_relay.py [--lines 5000]
+from __future__ import print_function
+import argparse
+import mmap
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.path.pardir))
+
+from jam.common import SOURCE_KEYS  # noqa: E402
+from jam.jam import find_relay_binds  # noqa: E402
+
+
+def read_relay_bind_legacy(path, relay_key):
+    # The way Jam.on_event used to find the bind: every line, one at a time.
+    with open(path) as cfg:
+        for line in cfg:
+            if line[0:4] != 'bind':
+                continue
+            line = line.replace('"', '').split()
+            if line[1] != relay_key:
+                continue
+            bind = line[2:]
+            if bind:
+                return bind
+    return None
+
+
+def read_relay_bind_regex(path, relay_key):
+    with open(path, 'rb') as cfg:
+        data = cfg.read()
+    return next(find_relay_binds(data, relay_key), None)
+
+
+def read_relay_bind_mmap(path, relay_key):
+    with open(path, 'rb') as cfg:
+        data = mmap.mmap(cfg.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            return next(find_relay_binds(data, relay_key), None)
+        finally:
+            data.close()
+
+
+def make_config(lines, relay_key, at_end=False, seed=0):
+    # Roughly what host_writeconfig writes: some unbindall/binds first, then a long list of cvars.
+    rand = random.Random(seed)
+    keys = [key for key in SOURCE_KEYS if key != relay_key]
+    out = ['unbindall\n']
+    binds = min(len(keys), lines // 10)
+    commands = ['+attack', 'slot1', 'jam_play', 'say gg']
+    out.extend('bind "{key}" "{cmd}"\n'.format(key=key, cmd=rand.choice(commands)) for key in keys[:binds])
+    # The relay key is bound somewhere in the second half of the binds, after the game's defaults.
+    relay = 'bind "{key}" "6"\n'.format(key=relay_key)
+    if not at_end:
+        out.insert(rand.randint(binds // 2, binds), relay)
+    out.extend('cvar_{n} "{value}"\n'.format(n=n, value=rand.random()) for n in range(lines - len(out) - at_end))
+    if at_end:
+        # Binds added with the console (like the relay key's) can end up after everything else.
+        out.append(relay)
+    return ''.join(out)
+
+
+def timed(func, *args):
+    start = time.perf_counter()
+    func(*args)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark finding the relay key bind in jam_cmd.cfg.")
+    parser.add_argument('--lines', type=int, default=5000, help="lines in the config dump (default: %(default)s)")
+    parser.add_argument('--repeat', type=int, default=200, help="runs to take the best time of (default: %(default)s)")
+    parser.add_argument('--relay', default='=', help="the relay key (default: %(default)s)")
+    parser.add_argument('--at-end', action='store_true', help="put the relay key bind on the last line")
+    args = parser.parse_args()
+
+    fd, path = tempfile.mkstemp(prefix='pyjam_bench', suffix='.cfg')
+    try:
+        with os.fdopen(fd, 'w') as cfg:
+            cfg.write(make_config(args.lines, args.relay, args.at_end))
+        expected = read_relay_bind_legacy(path, args.relay)
+        results = []
+        for what, func in (("legacy line by line", read_relay_bind_legacy),
+                           ("regex over bulk read", read_relay_bind_regex),
+                           ("regex over mmap", read_relay_bind_mmap)):
+            assert func(path, args.relay) == expected, what
+            results.append((what, min(timed(func, path, args.relay) for _ in range(args.repeat))))
+        size = os.path.getsize(path)
+    finally:
+        os.remove(path)
+
+    print("{lines} lines, {size:.1f} KiB of jam_cmd.cfg".format(lines=args.lines, size=size / 1024))
+    for what, seconds in results:
+        print("{what:<24} {time:>8.1f} us".format(what=what, time=seconds * 1000000))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,116 @@
+# Copyright (C) 10se1ucgo 2016
+#
+# This file is part of pyjam.
+#
+# pyjam is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# pyjam is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with pyjam.  If not, see <http://www.gnu.org/licenses/>.
+
+# Time and peak memory it takes to strip the encoder metadata FFmpeg adds to a converted WAV file.
+# Run from the repository root: python benchmarks/bench_strip.py [--size 256]
+from __future__ import print_function
+import argparse
+import hashlib
+import os
+import shutil
+import struct
+import sys
+import tempfile
+import time
+import tracemalloc
+import wave
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.path.pardir))
+
+from jam.riff import strip_chunks  # noqa: E402
+
+
+def strip_legacy(path):
+    # The way ffmpeg.strip_encoder used to do it: read all of the audio, then write the whole file again.
+    with wave.open(path, 'r') as f:
+        params = f.getparams()
+        frames = f.readframes(-1)
+    with wave.open(path, 'w') as f:
+        f.setparams(params)
+        f.writeframes(frames)
+
+
+def make_wav(path, size, metadata=True, rate=22050):
+    # What FFmpeg writes: a 16 byte fmt chunk, a LIST/INFO chunk with the encoder, then the data chunk.
+    fmt = struct.pack('<HHIIHH', 1, 1, rate, rate * 2, 2, 16)
+    info = b'INFO' + b'ISFT' + struct.pack('<I', 14) + b'Lavf58.76.100\0'
+    chunks = [b'fmt ' + struct.pack('<I', len(fmt)) + fmt]
+    if metadata:
+        chunks.append(b'LIST' + struct.pack('<I', len(info)) + info)
+    header = b''.join(chunks) + b'data' + struct.pack('<I', size)
+    with open(path, 'wb') as f:
+        f.write(b'RIFF' + struct.pack('<I', 4 + len(header) + size) + b'WAVE' + header)
+        block = os.urandom(1024 * 1024)
+        for start in range(0, size, len(block)):
+            f.write(block[:size - start])
+
+
+def file_hash(path):
+    digest = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def timed(func, *args):
+    tracemalloc.start()
+    start = time.perf_counter()
+    func(*args)
+    seconds = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return seconds, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark stripping metadata chunks from a WAV file.")
+    parser.add_argument('--size', type=int, default=256, help="audio data in MiB (default: %(default)s)")
+    parser.add_argument('--repeat', type=int, default=3, help="runs to take the best time of (default: %(default)s)")
+    parser.add_argument('--dir', default=None, help="where to put the test files (default: the temp folder)")
+    args = parser.parse_args()
+
+    folder = tempfile.mkdtemp(prefix='pyjam_bench', dir=args.dir)
+    template = os.path.join(folder, 'template.wav')
+    path = os.path.join(folder, 'test.wav')
+    try:
+        results = []
+        for metadata in (True, False):
+            make_wav(template, args.size * 1024 * 1024, metadata)
+            expected = None
+            for what, func in (("legacy wave rewrite", strip_legacy), ("chunk stripper", strip_chunks)):
+                best = None
+                for _ in range(args.repeat):
+                    shutil.copyfile(template, path)
+                    seconds, peak = timed(func, path)
+                    best = min(best or (seconds, peak), (seconds, peak))
+                digest = file_hash(path)
+                assert expected is None or digest == expected, what
+                expected = digest
+                results.append(("with LIST" if metadata else "already clean", what) + best)
+    finally:
+        shutil.rmtree(folder)
+
+    print("{size} MiB of audio".format(size=args.size))
+    for file, what, seconds, peak in results:
+        print("{file:<14} {what:<20} {time:>9.1f} ms {peak:>9.1f} MiB peak".format(
+            file=file, what=what, time=seconds * 1000, peak=peak / 1024 / 1024
+        ))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,101 @@
+# Copyright (C) 10se1ucgo 2016
+#
+# This file is part of pyjam.
+#
+# pyjam is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# pyjam is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with pyjam.  If not, see <http://www.gnu.org/licenses/>.
+
+# Memory use and build time of the Track model for a big synthetic library.
+# Run from the repository root: python benchmarks/bench_tracks.py [--tracks 100000]
+from __future__ import print_function
+import argparse
+import gc
+import os
+import sys
+import time
+import tracemalloc
+
+import unidecode
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.path.pardir))
+
+from jam.common import SOURCE_KEYS, Track, bindable  # noqa: E402
+
+
+class DictTrack(object):
+    """
+    The Track model before it had __slots__: a __dict__ per instance, and eager unidecode.
+    """
+    def __init__(self, index, name, aliases, path, bind=None, rate=None, channels=None, duration=None, problems=None):
+        self.index = index
+        self.name = unidecode.unidecode(name)
+        self.aliases = [unidecode.unidecode(alias) for alias in aliases]
+        self.path = path
+        self.bind = bind if bindable(bind) else ''
+        self.rate = rate
+        self.channels = channels
+        self.duration = duration
+        self.problems = problems or []
+
+    def get_aliases(self):
+        return str(self.aliases).strip('[]') if self.aliases else "This track has no aliases"
+
+
+def make_rows(count):
+    rows = []
+    for index in range(count):
+        name = "Artist {a} - Song number {n}".format(a=index % 500, n=index)
+        aliases = ["artist{a}".format(a=index % 500), "song", "number{n}".format(n=index)]
+        path = "/music/artist {a}/song number {n}.wav".format(a=index % 500, n=index)
+        bind = SOURCE_KEYS[index % len(SOURCE_KEYS)] if index < len(SOURCE_KEYS) else None
+        rows.append((index, name, aliases, path, bind, 22050, 1, 180.0 + index % 60, []))
+    return rows
+
+
+def measure(cls, rows, renders):
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    tracks = [cls(*row) for row in rows]
+    build_time = time.perf_counter() - start
+    memory = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    # ObjectListView calls get_aliases for every visible row on every repaint.
+    start = time.perf_counter()
+    for _ in range(renders):
+        for track in tracks:
+            track.get_aliases()
+    render_time = time.perf_counter() - start
+    return build_time, memory, render_time
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the Track model.")
+    parser.add_argument('--tracks', type=int, default=100000, help="amount of synthetic tracks (default: %(default)s)")
+    parser.add_argument('--renders', type=int, default=5, help="full list repaints to simulate (default: %(default)s)")
+    args = parser.parse_args()
+
+    rows = make_rows(args.tracks)
+    print("{num} tracks, {renders} repaints".format(num=args.tracks, renders=args.renders))
+    print("{model:<10} {build:>10} {memory:>12} {render:>12}".format(model="model", build="build (s)",
+                                                                     memory="memory (MiB)", render="repaint (s)"))
+    for cls in (DictTrack, Track):
+        build_time, memory, render_time = measure(cls, rows, args.renders)
+        print("{model:<10} {build:>10.3f} {memory:>12.1f} {render:>12.3f}".format(
+            model=cls.__name__, build=build_time, memory=memory / 1024 / 1024, render=render_time
+        ))
+
+
+if __name__ == '__main__':
+    main()
@@ -16,7 +16,8 @@
 # along with pyjam.  If not, see <http://www.gnu.org/licenses/>.
 import logging
 
-from . import about, common, ffmpeg, seven_zip, jam
+from . import (aliases, cache, common, config, dispatch, ffmpeg, headless, index, poller, prefetch, renderer, riff,
+               scanner, search, seven_zip, stats, status, steam, store, jam)
 from .jam import *
 
 logger = logging.getLogger(__name__)
@@ -27,11 +28,7 @@ except ImportError:
     downloader = None
     logger.exception("Error importing downloader, youtube-dl is likely not installed.")
 
-try:
-    from . import waveform
-except ImportError:
-    waveform = None
-    logger.exception("Error importing waveform viewer, numpy is likely not installed.")
-
-
-__all__ = ['about', 'common', 'downloader', 'ffmpeg', 'seven_zip', 'jam', 'waveform']
+# The GUI modules (about, dialogs, gui, waveform) need wxPython. They're left out here so that importing the package
+# for headless mode never pulls it in, import them directly (e.g. `from jam import gui`).
+__all__ = ['aliases', 'cache', 'common', 'config', 'dispatch', 'downloader', 'ffmpeg', 'headless', 'index', 'poller',
+           'prefetch', 'renderer', 'riff', 'scanner', 'search', 'seven_zip', 'stats', 'status', 'steam', 'store', 'jam']
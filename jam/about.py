@@ -23,8 +23,9 @@ import wx
 import wx.lib.scrolledpanel as sp
 import wx.adv
 
+from .common import __version__
+
 __all__ = ['about_dialog', 'Licenses', 'update_check', '__version__']
-__version__ = "1.3"
 
 
 def about_dialog(parent):
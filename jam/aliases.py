@@ -0,0 +1,171 @@
+# Copyright (C) 10se1ucgo 2016
+#
+# This file is part of pyjam.
+#
+# pyjam is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# pyjam is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with pyjam.  If not, see <http://www.gnu.org/licenses/>.
+
+# Alias generation. Every alias becomes a console alias, so they have to be unique across the whole library
+# and can't shadow any of the game's (or pyjam's) own commands.
+import collections
+import logging
+from string import whitespace
+
+__all__ = ['RESERVED_ALIASES', 'AliasCollision', 'AliasTrie', 'AliasRegistry']
+logger = logging.getLogger(__name__)
+
+RESERVED_ALIASES = frozenset([
+    'buy', 'cheer', 'compliment', 'coverme', 'enemydown', 'enemyspot', 'fallback', 'followme', 'getout',
+    'go', 'holdpos', 'inposition', 'negative', 'regroup', 'report', 'reportingin', 'roger', 'sectorclear',
+    'sticktog', 'takepoint', 'takingfire', 'thanks', 'drop', 'sm', 'jam_play', 'jam_on', 'jam_off',
+    'jam_cmd', 'jam_listaudio', 'jam_la', 'la', 'jam_saytrack', 'jam_say', 'jam_echotrack', 'jam_track',
+    'jam_stdin', 'stdin', 'jam_help', 'jam', 'jam_stats', 'jam_cancel', 'kill', 'explode'
+])
+
+# owner is None when the alias was reserved.
+AliasCollision = collections.namedtuple('AliasCollision', ['alias', 'owner', 'loser'])
+
+
+class AliasTrie(object):
+    """
+    A prefix tree of keys that counts how many keys pass through each node.
+    """
+    def __init__(self):
+        self.root = [0, {}]  # [count, children]
+
+    def add(self, key):
+        """Add a key to the trie.
+
+        Args:
+            key (str): The key to add.
+
+        Returns:
+            None
+        """
+        node = self.root
+        node[0] += 1
+        for char in key:
+            node = node[1].setdefault(char, [0, {}])
+            node[0] += 1
+
+    def unique_prefixes(self, key):
+        """Iterate over the prefixes of a key that no other key in the trie shares, shortest first.
+
+        Args:
+            key (str): A key that was added to the trie.
+
+        Returns:
+            generator[str]: The unique prefixes.
+        """
+        node = self.root
+        for length, char in enumerate(key, 1):
+            node = node[1].get(char)
+            if node is None:
+                return
+            if node[0] == 1:
+                yield key[:length]
+
+
+class AliasRegistry(object):
+    """
+    Hands out aliases, making sure no two tracks (or a track and a reserved command) share one.
+    """
+    def __init__(self, reserved=RESERVED_ALIASES):
+        """
+        Args:
+            reserved (iterable[str]): Aliases that can never be handed out.
+        """
+        self.reserved = frozenset(reserved)
+        self.owners = {}
+        self.collisions = []
+
+    def claim(self, alias, owner):
+        """Try to claim an alias.
+
+        Args:
+            alias (str): The alias to claim.
+            owner (object): Who the alias is for (normally the track index).
+
+        Returns:
+            bool: True if the alias now belongs to `owner`.
+        """
+        if not alias or alias in whitespace:
+            return False
+        if alias in self.reserved:
+            self.collisions.append(AliasCollision(alias, None, owner))
+            return False
+        if alias in self.owners:
+            if self.owners[alias] != owner:
+                self.collisions.append(AliasCollision(alias, self.owners[alias], owner))
+            return False
+        self.owners[alias] = owner
+        return True
+
+    def is_free(self, alias):
+        return alias not in self.reserved and alias not in self.owners
+
+    def assign(self, candidates):
+        """Assign aliases to every owner in one pass.
+        Custom aliases are claimed first, then the automatically generated ones, first come first served. Owners that
+        end up without any alias get the shortest prefix of their name that is unique in the library.
+
+        Args:
+            candidates (list[tuple[object, list[str], list[str] or None, str]]): For every owner:
+                (owner, automatic aliases, custom aliases or None, name key used for the fallback alias).
+
+        Returns:
+            dict[object, list[str]]: The aliases assigned to each owner.
+        """
+        assigned = collections.OrderedDict((owner, []) for owner, _, _, _ in candidates)
+        for owner, _, custom, _ in candidates:
+            if custom is not None:
+                assigned[owner].extend(alias for alias in custom if self.claim(alias, owner))
+        for owner, automatic, custom, _ in candidates:
+            if custom is None:
+                assigned[owner].extend(alias for alias in automatic if self.claim(alias, owner))
+
+        trie = None  # Only built if anyone needs a fallback, it's the slowest part for a big library.
+        for owner, _, _, key in candidates:
+            if not assigned[owner]:
+                if trie is None:
+                    trie = AliasTrie()
+                    for _, _, _, other_key in candidates:
+                        trie.add(other_key)
+                assigned[owner].append(self.fallback(owner, key, trie))
+        return assigned
+
+    def fallback(self, owner, key, trie):
+        """Claim the shortest free alias for a name key.
+
+        Args:
+            owner (object): Who the alias is for.
+            key (str): The name key, usually the filtered name with the spaces removed.
+            trie (AliasTrie): A trie of every name key in the library.
+
+        Returns:
+            str: The claimed alias.
+        """
+        key = key or 'track'
+        for prefix in trie.unique_prefixes(key):
+            if self.is_free(prefix):
+                self.owners[prefix] = owner
+                return prefix
+        if self.is_free(key):
+            self.owners[key] = owner
+            return key
+        # The name is a duplicate or a prefix of another one, so add a number. Aliases can't start with one.
+        suffix = 2
+        while not self.is_free(key + str(suffix)):
+            suffix += 1
+        self.owners[key + str(suffix)] = owner
+        return key + str(suffix)
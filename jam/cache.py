@@ -0,0 +1,256 @@
+# Copyright (C) 10se1ucgo 2016
+#
+# This file is part of pyjam.
+#
+# pyjam is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# pyjam is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with pyjam.  If not, see <http://www.gnu.org/licenses/>.
+
+# Converted files, stored by the hash of the source file and the conversion parameters, so converting the same
+# download again (e.g. the whole _ingame_dl folder after every in-game download) doesn't run FFmpeg again.
+from __future__ import division
+import collections
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+
+from .common import get_path, atomic_write, stage_file
+
+try:
+    FileNotFoundError  # This will throw a NameError if the user is using Python 2.
+except NameError:
+    FileNotFoundError = IOError
+
+__all__ = ['CACHE_DIR', 'MAX_CACHE_SIZE', 'ConversionCache', 'hash_file']
+logger = logging.getLogger(__name__)
+CACHE_DIR = '_convert_cache'
+INDEX_FILE = 'index.json'
+MAX_CACHE_SIZE = 1024  # MiB
+
+
+class ConversionCache(object):
+    """
+    A folder of converted files with a size bound. The least recently used files are removed first.
+    """
+    # Format for the index.
+    # {"entries": [["<key>", <size in bytes>, <last used, UNIX time>], ...] (least recently used first),
+    #  "sources": {"path/to/song.mp3": [<mtime>, <size>, "<SHA-1 of the file>"], ...}}
+    def __init__(self, folder=CACHE_DIR, max_size=MAX_CACHE_SIZE * 1024 * 1024):
+        """
+        Args:
+            folder (str): The folder to keep the converted files in.
+            max_size (int): The most converted audio to keep, in bytes. 0 disables the cache.
+        """
+        self.folder = folder
+        self.index_path = get_path(folder, INDEX_FILE)
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._entries = collections.OrderedDict()  # key -> [size, last used]
+        self._sources = {}  # path -> [mtime, size, digest], so unchanged sources aren't hashed again.
+        self._size = 0
+        self._dirty = False
+        self._load()
+
+    def _load(self):
+        try:
+            with open(self.index_path) as f:
+                index = json.load(f)
+            entries = index['entries']
+            sources = index['sources']
+        except FileNotFoundError:
+            return
+        except (ValueError, KeyError, TypeError):
+            logger.exception("Invalid conversion cache index {path}".format(path=self.index_path))
+            return
+        for key, size, used in entries:
+            if os.path.isfile(self._path(key)):
+                self._entries[key] = [size, used]
+                self._size += size
+        self._sources = {path: source for path, source in sources.items() if len(source) == 3}
+        self._evict()  # The size bound might have been lowered since.
+
+    def _path(self, key):
+        return get_path(self.folder, key + '.wav')
+
+    @property
+    def enabled(self):
+        return self.max_size > 0
+
+    def source_hash(self, path):
+        """Get the SHA-1 of a source file. It is only read again if its modification time or size changed.
+
+        Args:
+            path (str): Path to the file.
+
+        Returns:
+            str: The hex digest.
+
+        Raises:
+            OSError: If the file could not be read.
+        """
+        path = os.path.abspath(path)
+        stat = os.stat(path)
+        with self._lock:
+            source = self._sources.get(path)
+        if source and source[:2] == [stat.st_mtime, stat.st_size]:
+            return source[2]
+        digest = hash_file(path)
+        with self._lock:
+            self._sources[path] = [stat.st_mtime, stat.st_size, digest]
+            self._dirty = True
+        return digest
+
+    def make_key(self, path, params):
+        """Get the cache key for converting a file.
+
+        Args:
+            path (str): Path to the source file.
+            params (tuple): Everything that changes the output, e.g. (rate, volume, codec, FFmpeg version).
+
+        Returns:
+            str: The key.
+
+        Raises:
+            OSError: If the file could not be read.
+        """
+        params = json.dumps([str(param) for param in params])
+        return hashlib.sha1((self.source_hash(path) + params).encode('utf-8')).hexdigest()
+
+    def fetch(self, key, dest):
+        """Put the cached output for a key at `dest`, if there is one.
+
+        Args:
+            key (str): The cache key, see make_key.
+            dest (str): Where the converted file should go.
+
+        Returns:
+            str or None: How the file was put in place (see stage_file). None if the key isn't cached.
+        """
+        with self._lock:
+            if key not in self._entries:
+                self.misses += 1
+                return None
+            self._entries[key] = [self._entries.pop(key)[0], time.time()]  # Now the most recently used.
+            self._dirty = True
+        try:
+            method = stage_file(self._path(key), dest)
+        except OSError:
+            logger.exception("Could not use cached conversion {key}".format(key=key))
+            with self._lock:
+                self._forget(key)
+                self.misses += 1
+            return None
+        with self._lock:
+            self.hits += 1
+        return method
+
+    def store(self, key, src):
+        """Add a converted file to the cache, removing the least recently used files if it is over its size bound.
+
+        Args:
+            key (str): The cache key, see make_key.
+            src (str): The converted file. It is copied (or reflinked), never moved or hard linked.
+
+        Returns:
+            None
+        """
+        size = os.path.getsize(src)
+        if not self.enabled or size > self.max_size:
+            return
+        if not os.path.isdir(self.folder):
+            os.makedirs(self.folder)
+        try:
+            stage_file(src, self._path(key))
+        except OSError:
+            logger.exception("Could not cache {src}".format(src=src))
+            return
+        with self._lock:
+            self._forget(key)
+            self._entries[key] = [size, time.time()]
+            self._size += size
+            self._dirty = True
+            self._evict()
+
+    def _forget(self, key):
+        # Must be called with the lock held.
+        entry = self._entries.pop(key, None)
+        if entry:
+            self._size -= entry[0]
+
+    def _evict(self):
+        # Must be called with the lock held (or from __init__).
+        while self._entries and self._size > self.max_size:
+            self._remove(next(iter(self._entries)))
+            self._dirty = True
+
+    def _remove(self, key):
+        # Must be called with the lock held.
+        self._forget(key)
+        try:
+            os.remove(self._path(key))
+        except OSError:
+            logger.debug("Could not remove {key} from the conversion cache".format(key=key), exc_info=True)
+
+    def save(self):
+        """Write the index to disk if anything changed since it was last saved.
+
+        Returns:
+            None
+        """
+        with self._lock:
+            if not self._dirty or not os.path.isdir(self.folder):
+                return
+            # Sources that are gone can't be hashed again.
+            sources = {path: source for path, source in self._sources.items() if os.path.exists(path)}
+            index = {'entries': [[key, size, used] for key, (size, used) in self._entries.items()],
+                     'sources': sources}
+            self._dirty = False
+        atomic_write(self.index_path, json.dumps(index), sync=False)
+
+    def get_stats(self):
+        """Get the hit rate and size of the cache.
+
+        Returns:
+            dict: hits, misses, files, size (bytes) and max_size (bytes).
+        """
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses, 'files': len(self._entries), 'size': self._size,
+                    'max_size': self.max_size}
+
+    def __repr__(self):
+        return "{c}(folder={folder}, files={num})".format(c=self.__class__, folder=self.folder,
+                                                          num=len(self._entries))
+
+
+def hash_file(path, chunk_size=1024 * 1024):
+    """Hash a whole file.
+
+    Args:
+        path (str): Path to the file.
+        chunk_size (int): How much to read at a time, in bytes.
+
+    Returns:
+        str: The SHA-1 hex digest.
+
+    Raises:
+        OSError: If the file could not be read.
+    """
+    digest = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
@@ -19,12 +19,13 @@
 # This module should NOT import anything from jam_*, as it will create potential for circular imports.
 import logging
 import os
+import shutil
+import tempfile
 import traceback
 import sys
 from functools import wraps
 
 import unidecode
-import wx
 
 try:
     import winreg
@@ -39,9 +40,27 @@ try:
 except ImportError:
     psutil = None
 
-__all__ = ["SOURCE_KEYS", "WX_KEYS_CONVERSION", "Track", "Game", "wrap_exceptions", "get_steam_path",
-           "get_path", "bindable", "key_choice_override"]
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+try:
+    from os import replace as _replace
+except ImportError:  # Python 2
+    def _replace(src, dst):
+        if sys.platform == 'win32' and os.path.exists(dst):
+            os.remove(dst)
+        os.rename(src, dst)
+
+__all__ = ["SOURCE_KEYS", "Track", "Game", "wrap_exceptions", "set_error_hook", "report_error", "call_after",
+           "set_call_after", "get_steam_path", "get_path", "atomic_write", "stage_file", "bindable",
+           "filter_alias"]
+__version__ = "1.3"
 logger = logging.getLogger(__name__)
+_error_hook = None
+_call_after = None
+FICLONE = 0x40049409  # From linux/fs.h, the ioctl behind `cp --reflink`.
 
 # Special characters taken from the VDC wiki.
 SOURCE_KEYS = (
@@ -54,32 +73,20 @@ SOURCE_KEYS = (
     'KP_PGDN', 'KP_ENTER', 'KP_INS', 'KP_DEL', 'KP_SLASH', 'KP_MULTIPLY', 'KP_MINUS', 'KP_PLUS',
     'CAPSLOCK', 'MWHEELDOWN', 'MWHEELUP', 'MOUSE1', 'MOUSE2', 'MOUSE3', 'MOUSE4', 'MOUSE5', 'PAUSE'
 )
-# Conversion table for wx -> Source Engine keys.
-WX_KEYS_CONVERSION = {
-    wx.WXK_F1: 'F1', wx.WXK_F2: "F2", wx.WXK_F3: "F3", wx.WXK_F4: "F4", wx.WXK_F5: "F5", wx.WXK_F6: "F6",
-    wx.WXK_F7: "F7", wx.WXK_F8: "F8", wx.WXK_F9: "F9", wx.WXK_F10: "F10", wx.WXK_F11: "F11",
-    wx.WXK_F12: "F12", wx.WXK_TAB: "TAB", wx.WXK_RETURN: "ENTER", wx.WXK_ESCAPE: "ESCAPE",
-    wx.WXK_SPACE: "SPACE", wx.WXK_BACK: "BACKSPACE", wx.WXK_UP: "UPARROW", wx.WXK_DOWN: "DOWNARROW",
-    wx.WXK_LEFT: "LEFTARROW", wx.WXK_RIGHT: "RIGHTARROW", wx.WXK_ALT: "ALT", wx.WXK_CONTROL: "CTRL",
-    wx.WXK_SHIFT: "SHIFT", wx.WXK_INSERT: "INS", wx.WXK_DELETE: "DEL", wx.WXK_PAGEDOWN: "PGDN",
-    wx.WXK_PAGEUP: "PGUP", wx.WXK_HOME: "HOME", wx.WXK_END: "END", wx.WXK_NUMPAD_HOME: "KP_HOME",
-    wx.WXK_NUMPAD_UP: "KP_UPARROW", wx.WXK_NUMPAD_PAGEUP: "KP_PGUP", wx.WXK_NUMPAD_LEFT: "KP_LEFTARROW",
-    wx.WXK_NUMPAD5: "KP_5", wx.WXK_NUMPAD_RIGHT: "KP_RIGHTARROW", wx.WXK_NUMPAD_END: "KP_END",
-    wx.WXK_NUMPAD_DOWN: "KP_DOWNARROW", wx.WXK_NUMPAD_PAGEDOWN: "KP_PGDN", wx.WXK_NUMPAD_ENTER: "KP_ENTER",
-    wx.WXK_NUMPAD_INSERT: "KP_INS", wx.WXK_NUMPAD_DELETE: "KP_DEL", wx.WXK_NUMPAD_DIVIDE: "KP_SLASH",
-    wx.WXK_NUMPAD_MULTIPLY: "KP_MULTIPLY", wx.WXK_NUMPAD_SUBTRACT: "KP_MINUS", wx.WXK_NUMPAD_ADD: "KP_PLUS",
-    wx.WXK_CAPITAL: "CAPSLOCK", wx.WXK_PAUSE: "PAUSE", wx.WXK_NUMPAD0: "KP_INS",
-    wx.WXK_NUMPAD_DECIMAL: "KP_DEL", wx.WXK_NUMPAD1: "KP_END", wx.WXK_NUMPAD2: "KP_DOWNARROW",
-    wx.WXK_NUMPAD3: "KP_PGDN", wx.WXK_NUMPAD4: "KP_LEFTARROW", wx.WXK_NUMPAD6: "KP_RIGHTARROW",
-    wx.WXK_NUMPAD7: "KP_HOME", wx.WXK_NUMPAD8: "KP_UPARROW", wx.WXK_NUMPAD9: "KP_PGUP"
-}
+# Membership tests against the tuple above are linear, and every track's bind gets checked.
+_SOURCE_KEYS_SET = frozenset(SOURCE_KEYS)
 
 
 class Track(object):
     """
     A class representing a sound track.
+    Libraries can have hundreds of thousands of these, so attributes live in slots and everything derived from them
+    (transliterated names, the alias display string) is computed on first use and cached.
     """
-    def __init__(self, index, name, aliases, path, bind=None):
+    __slots__ = ('index', 'path', 'bind', 'rate', 'channels', 'duration', 'problems', '_name', '_aliases',
+                 '_alias_text', '_transliterated')
+
+    def __init__(self, index, name, aliases, path, bind=None, rate=None, channels=None, duration=None, problems=None):
         """
         Args:
             index (int): The ID of the Track. The value can be random, it is only used for display.
@@ -87,12 +94,60 @@ class Track(object):
             aliases (list[str]): A list of aliases that can be used in-game instead of the index.
             path (str): Path to the file.
             bind (str or None): Bind that the track can be used.
+            rate (int or None): The sample rate of the file. None if unknown.
+            channels (int or None): The amount of channels in the file. None if unknown.
+            duration (float or None): The length of the file in seconds. None if unknown.
+            problems (list[str] or None): Reasons the file can't be played properly in-game.
         """
         self.index = index
-        self.name = unidecode.unidecode(name)
-        self.aliases = [unidecode.unidecode(alias) for alias in aliases]
+        self._name = name
+        self._aliases = aliases
+        self._alias_text = None
+        self._transliterated = False
         self.path = path
-        self.bind = bind if bindable(bind) else ''
+        self.bind = bind if bind and bind.upper() in _SOURCE_KEYS_SET else ''
+        self.rate = rate
+        self.channels = channels
+        self.duration = duration
+        self.problems = problems or ()
+
+    @property
+    def name(self):
+        """str: The name of the Track, transliterated to ASCII."""
+        if not self._transliterated:
+            self._transliterate()
+        return self._name
+
+    @property
+    def aliases(self):
+        """list[str]: The aliases of the Track, transliterated to ASCII."""
+        if not self._transliterated:
+            self._transliterate()
+        return self._aliases
+
+    @aliases.setter
+    def aliases(self, aliases):
+        self._aliases = aliases
+        self._alias_text = None
+        self._transliterated = False
+
+    def _transliterate(self):
+        # Names and aliases are almost always ASCII already, and unidecode is slow.
+        if not _is_ascii(self._name):
+            self._name = unidecode.unidecode(self._name)
+        if not all(_is_ascii(alias) for alias in self._aliases):
+            self._aliases = [unidecode.unidecode(alias) for alias in self._aliases]
+        self._transliterated = True
+
+    def get_duration(self):
+        """Get the Track's duration.
+
+        Returns:
+            str: The duration as minutes:seconds, or an empty string if it's unknown.
+        """
+        if self.duration is None:
+            return ''
+        return "{m}:{s:02d}".format(m=int(self.duration) // 60, s=int(self.duration) % 60)
 
     def get_aliases(self):
         """Get the Track's aliases..
@@ -100,7 +155,9 @@ class Track(object):
         Returns:
             str: A string representation of the aliases.
         """
-        return str(self.aliases).strip('[]') if self.aliases else "This track has no aliases"
+        if self._alias_text is None:
+            self._alias_text = str(self.aliases).strip('[]') if self.aliases else "This track has no aliases"
+        return self._alias_text
 
     def __repr__(self):
         return "{c}(index:{index}, name:{name}, aliases:{aliases}, location:{path})".format(
@@ -116,16 +173,25 @@ class Game(object):
     A class representing a Source Engine game.
     """
     def __init__(self, audio_dir=os.curdir, audio_rate=11025, mod_path=os.curdir,
-                 name=None, play_key='F8', relay_key='=', use_aliases=True):
+                 name=None, play_key='F8', relay_key='=', use_aliases=True, extra_audio_dirs=None, event_window=0.05,
+                 prefetch_budget=256, observer='native', convert_workers=None, convert_cache_size=1024):
         """
         Args:
-            audio_dir (str): Path for finding audio.
+            audio_dir (str): Path for finding audio. Custom track data is stored here.
             audio_rate (int): The sample rate the game accepts.
             mod_path (str): Path to the mod folder (e.g. "Steam/SteamApps/common/Team Fortress 2/tf2")
             name (str): The name of the game.
             play_key (str): The key used to start/stop music in-game.
             relay_key (str): The key used to interact with the game.
             use_aliases (bool): Whether or not to use aliases to select songs in-game.
+            extra_audio_dirs (list[str] or None): Additional paths for finding audio.
+            event_window (float): How long to collect jam_cmd.cfg events before parsing it, in seconds.
+            prefetch_budget (int): How much of the likely next tracks to keep in memory, in MiB. 0 disables it.
+            observer (str): How to watch jam_cmd.cfg. 'native' uses the OS's change notifications, 'polling' checks
+                the file itself (for Wine/Proton, network folders and FUSE mounts that don't report changes).
+            convert_workers (int or None): How many files to convert at the same time. None for the CPU count.
+            convert_cache_size (int): How much converted audio to keep for converting the same files again, in MiB.
+                0 disables the conversion cache.
         """
         self.audio_dir = audio_dir
         self.audio_rate = audio_rate
@@ -134,6 +200,20 @@ class Game(object):
         self.play_key = play_key if bindable(play_key) else "F8"
         self.relay_key = relay_key if bindable(relay_key) else "="
         self.use_aliases = use_aliases
+        self.extra_audio_dirs = extra_audio_dirs or []
+        self.event_window = event_window
+        self.prefetch_budget = prefetch_budget
+        self.observer = observer
+        self.convert_workers = convert_workers
+        self.convert_cache_size = convert_cache_size
+
+    def get_audio_dirs(self):
+        """Get every path audio is loaded from.
+
+        Returns:
+            list[str]: The main audio path followed by any extra audio paths.
+        """
+        return [self.audio_dir] + [path for path in self.extra_audio_dirs if path != self.audio_dir]
 
     def __repr__(self):
         return "{c}(name:{name}, rate:{rate}, path:{path})".format(
@@ -162,56 +242,88 @@ def wrap_exceptions(func):
         except (SystemExit, KeyboardInterrupt):
             raise
         except Exception:
-            if isinstance(args[0], wx.TopLevelWindow):
-                parent = args[0]
-            elif hasattr(args[0], "parent") and isinstance(args[0].parent, wx.TopLevelWindow):
-                parent = args[0].parent
-            else:
-                parent = wx.GetApp().GetTopWindow()
-            error_message = ''.join(traceback.format_exc())
-            error_dialog = wx.MessageDialog(parent=parent,
-                                            message="An error has occured\n\n" + error_message,
-                                            caption="Error!", style=wx.OK | wx.ICON_ERROR)
-            error_dialog.RequestUserAttention()
-            error_dialog.ShowModal()
-            error_dialog.Destroy()
-            logger.critical(error_message)
+            report_error("An error has occured\n\n" + ''.join(traceback.format_exc()), args[0] if args else None)
             raise
 
     return wrapper
 
 
+def set_error_hook(hook):
+    """Set the function used to show errors to the user (e.g. a message dialog).
+
+    Args:
+        hook (function or None): Called with the error message and the object that caused the error (or None).
+            If None, errors are only logged.
+
+    Returns:
+        None
+    """
+    global _error_hook
+    _error_hook = hook
+
+
+def report_error(message, source=None):
+    """Log an error, and show it to the user if there's an error hook set.
+
+    Args:
+        message (str): The error message.
+        source (object or None): The object that caused the error, if any.
+
+    Returns:
+        None
+    """
+    logger.critical(message)
+    if _error_hook is not None:
+        _error_hook(message, source)
+
+
+def set_call_after(func):
+    """Set the function used to run callbacks from worker threads (e.g. wx.CallAfter to run them on the GUI thread).
+
+    Args:
+        func (function or None): Called with the callback and its arguments. If None, callbacks are run right away on
+            the worker thread.
+
+    Returns:
+        None
+    """
+    global _call_after
+    _call_after = func
+
+
+def call_after(func, *args, **kwargs):
+    """Run a callback from a worker thread.
+
+    Args:
+        func (function): The callback.
+        *args: Positional arguments for the callback.
+        **kwargs: Keyword arguments for the callback.
+
+    Returns:
+        None
+    """
+    if _call_after is not None:
+        _call_after(func, *args, **kwargs)
+    else:
+        func(*args, **kwargs)
+
+
 def bindable(key):
     """Test if a key is a valid Source Engine key.
     Args:
-        key (str or int): Either the wx.WXK key code, or the string key.
+        key (str or int): Either the string key, or a character code.
 
     Returns:
-        bool or str: If True, the key is already a valid Source Engine key. If a str, the key was able to be converted.
-            False otherwise.
+        bool: True if the key is a valid Source Engine key, False otherwise.
     """
     if isinstance(key, str):
-        return key.upper() in SOURCE_KEYS
+        return key.upper() in _SOURCE_KEYS_SET
     elif isinstance(key, int):
-        if key in WX_KEYS_CONVERSION:
-            return WX_KEYS_CONVERSION[key]
-        elif chr(key).upper() in SOURCE_KEYS:
-            return True
-
-    return False
-
+        try:
+            return chr(key).upper() in _SOURCE_KEYS_SET
+        except ValueError:
+            return False
 
-def key_choice_override(event):
-    converted = bindable(event.GetKeyCode())
-    # If converted gave us a bool, it's already a compatible key
-    if converted is True:
-        event.GetEventObject().SetStringSelection(chr(event.GetKeyCode()))
-        return True
-    # If converted gave us a string, it was converted
-    elif converted:
-        event.GetEventObject().SetStringSelection(converted)
-        return True
-    # Otherwise, it's not compatible and can't be converted.
     return False
 
 
@@ -256,6 +368,123 @@ def get_path(path1, path2=None):
     return os.path.normpath(path1)
 
 
+def atomic_write(path, data, mode='w', sync=True):
+    """Write a file through a temporary file in the same folder, so readers only ever see the old or the new contents.
+
+    Args:
+        path (str): Path to the file.
+        data (str or bytes): The new contents.
+        mode (str): The mode to open the temporary file with ('w' or 'wb').
+        sync (bool): Whether or not to flush the new contents to disk before replacing the file.
+
+    Returns:
+        None
+    """
+    directory, name = os.path.split(os.path.abspath(path))
+    fd, temp_path = tempfile.mkstemp(prefix='.' + name, suffix='.tmp', dir=directory)
+    try:
+        with os.fdopen(fd, mode) as f:
+            f.write(data)
+            if sync:
+                f.flush()
+                os.fsync(f.fileno())
+        _replace(temp_path, path)
+    except BaseException:
+        try:
+            os.remove(temp_path)
+        except OSError:
+            pass
+        raise
+
+
+def stage_file(src, dest, link=False):
+    """Put a copy of a file in place through a temporary file in the same folder, so readers only ever see the old or
+    the new file. The copy is made the cheapest way the filesystem allows: a reflink (copy-on-write clone), a hard
+    link (only if `link` is True), an in-kernel copy, or a plain copy.
+
+    Args:
+        src (str): Path to the file to copy.
+        dest (str): Path to put the copy at.
+        link (bool): Whether or not a hard link is good enough. Writing to either file in place then changes the other
+            one too, so only use it when neither of them is ever written to, only replaced.
+
+    Returns:
+        str: How the copy was made: 'reflink', 'hardlink', 'kernel' or 'copy'.
+
+    Raises:
+        OSError: If the file could not be copied or put in place.
+    """
+    directory, name = os.path.split(os.path.abspath(dest))
+    fd, temp_path = tempfile.mkstemp(prefix='.' + name, suffix='.tmp', dir=directory)
+    try:
+        with os.fdopen(fd, 'wb') as temp, open(src, 'rb') as source:
+            method = _clone(source, temp)
+        if method is None and link:
+            method = _link(src, temp_path)
+        if method is None:
+            with open(temp_path, 'wb') as temp, open(src, 'rb') as source:
+                method = _kernel_copy(source, temp) or _copy(source, temp)
+        _replace(temp_path, dest)
+    except BaseException:
+        try:
+            os.remove(temp_path)
+        except OSError:
+            pass
+        raise
+    return method
+
+
+def _clone(source, temp):
+    if fcntl is None or not sys.platform.startswith('linux'):
+        return None
+    try:
+        fcntl.ioctl(temp.fileno(), FICLONE, source.fileno())
+    except (IOError, OSError):  # Not supported by the filesystem, or the files are on different ones.
+        return None
+    return 'reflink'
+
+
+def _link(src, temp_path):
+    if not hasattr(os, 'link'):
+        return None
+    # The temporary file only reserved the name.
+    os.remove(temp_path)
+    try:
+        os.link(src, temp_path)
+    except OSError:  # Different filesystems, or no hard links (FAT32).
+        open(temp_path, 'wb').close()
+        return None
+    return 'hardlink'
+
+
+def _kernel_copy(source, temp):
+    copy = getattr(os, 'copy_file_range', None) or (getattr(os, 'sendfile', None)
+                                                    if sys.platform.startswith('linux') else None)
+    if copy is None:
+        return None
+    size = os.fstat(source.fileno()).st_size
+    offset = 0
+    try:
+        while offset < size:
+            if copy is os.sendfile:
+                sent = copy(temp.fileno(), source.fileno(), offset, size - offset)
+            else:
+                sent = copy(source.fileno(), temp.fileno(), size - offset, offset)
+            if not sent:
+                break
+            offset += sent
+    except OSError:
+        if offset:
+            raise
+        return None  # Nothing was copied yet, so a plain copy can still take over.
+    return 'kernel'
+
+
+def _copy(source, temp):
+    shutil.copyfileobj(source, temp, 1024 * 1024)
+    return 'copy'
+
+
 def get_resource(path):
     """Get the absolute path for a resource. Required for PyInstaller.
 
@@ -267,3 +496,28 @@ def get_resource(path):
     """
     base = getattr(sys, '_MEIPASS', os.curdir)
     return os.path.abspath(os.path.join(base, path))
+
+
+def _is_ascii(text):
+    try:
+        text.encode('ascii')
+    except UnicodeError:
+        return False
+    return True
+
+
+def filter_alias(alias):
+    """Filter an alias, removing all non-alphabetic characters or spaces.
+    Args:
+        alias (str): The alias to filter.
+
+    Returns:
+        str: The filtered alias.
+    """
+    filtered = []
+    for char in alias:
+        if char.isalpha() or char.isspace():
+            filtered.append(char.lower())
+        elif char != "'" and char != '"':
+            filtered.append(' ')
+    return ''.join(filtered).strip()
@@ -0,0 +1,213 @@
+# Copyright (C) 10se1ucgo 2016
+#
+# This file is part of pyjam.
+#
+# pyjam is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# pyjam is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with pyjam.  If not, see <http://www.gnu.org/licenses/>.
+# The pyjam config file and logging setup. Doesn't depend on wxPython, the headless mode uses it too.
+import json
+import logging
+import logging.config
+import os
+import platform
+import sys
+
+from . import ffmpeg
+from .common import Game, get_steam_path, get_path, report_error, __version__
+from .index import INDEX_FILE
+
+try:
+    FileNotFoundError  # This will throw a NameError if the user is using Python 2.
+except NameError:
+    FileNotFoundError = IOError
+
+__all__ = ['Config', 'ErrorFilter', 'start_logger']
+logger = logging.getLogger(__name__)
+
+
+class Config(object):
+    """
+    A class representing a pyjam config file.
+    """
+    def __init__(self, config_file):
+        """
+        Args:
+            config_file (str): Path to the config file.
+        """
+        self.config_file = config_file
+        self.steam_path = os.curdir
+        self.games = []
+        self.logger = {}
+        self.load()
+
+    def new(self):
+        """Create a new config file.
+
+        Returns:
+            None
+
+        """
+        steam = get_steam_path()
+        csgo_path = get_path(steam, 'steamapps/common/Counter-Strike Global Offensive/csgo')
+        css_path = get_path(steam, 'steamapps/common/Counter-Strike Source/css')
+        default = {'games':
+                   [{'audio_dir': 'audio/csgo', 'use_aliases': True, 'audio_rate': 22050,
+                     'name': 'Counter-Strike: Global Offensive',
+                     'mod_path': csgo_path if steam != os.curdir else os.curdir,
+                     'play_key': 'F8', 'relay_key': '='},
+                    {'audio_dir': 'audio/css', 'use_aliases': True, 'audio_rate': 11025,
+                     'name': 'Counter-Strike: Source',
+                     'mod_path': css_path if steam != os.curdir else os.curdir,
+                     'play_key': 'F8', 'relay_key': '='}],
+                   'steam_path': steam}
+
+        with open(self.config_file, 'w') as f:
+            json.dump(default, f, indent=4, sort_keys=True)
+
+    def load(self):
+        """Load/reload the config file.
+
+        Returns:
+            None
+        """
+        # type: () -> str, list
+        try:
+            with open(self.config_file) as f:
+                try:
+                    config_json = json.load(f)
+                except ValueError:
+                    logger.exception("Corrupt config.")
+                    report_error("Malformed config file! Overwriting with default.")
+                    self.new()
+                    return self.load()
+                else:
+                    self.steam_path = config_json.get('steam_path', os.curdir)
+                    self.games = config_json.get('games', [])
+                    self.logger = config_json.get('logger')
+                    ffmpeg.locator.invalidate()  # Look FFmpeg up again in case it moved along with the config.
+        except FileNotFoundError:
+            self.new()
+            return self.load()
+
+    def save(self):
+        """Save the config file.
+        Returns:
+            None
+        """
+        with open(self.config_file, 'w') as f:
+            # config_dict = json.loads(jsonpickle.encode(self, unpicklable=False))
+            config_dict = dict(self.__dict__)  # Oh god, I've been removing the actual variable from the class...
+            config_dict.pop('config_file')  # Exclude the redundant config_file variable.
+            json.dump(config_dict, f, indent=4, sort_keys=True)
+            logger.info("Config saved to location {loc}".format(loc=self.config_file))
+        ffmpeg.locator.invalidate()
+
+    def get_games(self):
+        """Get the config's games.
+        Returns:
+            list[Game]: A list of Source Engine Game objects representing the config's games.
+        """
+        return [Game(get_path(game.get('audio_dir', os.curdir)), game.get('audio_rate', 11025),
+                     get_path(game.get('mod_path', os.curdir)), game.get('name'), game.get('play_key', 'F8'),
+                     game.get('relay_key', '='), game.get('use_aliases', True),
+                     [get_path(path) for path in game.get('extra_audio_dirs', [])],
+                     game.get('event_window', 0.05), game.get('prefetch_budget', 256),
+                     game.get('observer', 'native'), game.get('convert_workers'),
+                     game.get('convert_cache_size', 1024)) for game in self.games]
+
+    def set_games(self, new_games):
+        """Set the config's games.
+        Args:
+            new_games (list[Game]): A list of Source Engine Game objects to set.
+
+        Returns:
+            None
+        """
+        # self.games = json.loads(jsonpickle.encode(new_games, unpicklable=False))
+        self.games = [dict(game.__dict__) for game in new_games]
+
+    def get_game(self, name):
+        """Get a single game by its name.
+
+        Args:
+            name (str): The name of the game (case insensitive).
+
+        Returns:
+            Game or None: The game. None if there is no game with that name.
+        """
+        for game in self.get_games():
+            if game.name.lower() == name.lower():
+                return game
+        return None
+
+    def get_index_file(self):
+        """Get the path to the track index, which is kept next to the config file.
+
+        Returns:
+            str: The path to the track index database.
+        """
+        return get_path(os.path.dirname(os.path.abspath(self.config_file)), INDEX_FILE)
+
+    def __repr__(self):
+        return "{c}(file={file})".format(c=self.__class__, file=self.config_file)
+
+
+class ErrorFilter(logging.Filter):
+    def filter(self, record):
+        return record.levelno < logging.ERROR
+
+
+def start_logger(config):
+    """Set up logging, either from the config or with the default handlers.
+
+    Args:
+        config (Config): The pyjam config.
+
+    Returns:
+        logging.Logger: The logger for the pyjam application.
+    """
+    if config.logger:
+        logging.config.dictConfig(config.logger)
+    else:
+        root_logger = logging.getLogger()
+        root_logger.setLevel(logging.DEBUG)
+
+        formatter = logging.Formatter(fmt='%(asctime)s::%(name)s::%(levelname)s::%(message)s', datefmt='%H:%M:%S')
+
+        if not hasattr(sys, 'frozen'):
+            stdout_log = logging.StreamHandler(sys.stdout)
+            stdout_log.setLevel(logging.DEBUG)
+            stdout_log.setFormatter(formatter)
+            stdout_log.addFilter(ErrorFilter())
+            root_logger.addHandler(stdout_log)
+
+            stderr_log = logging.StreamHandler(sys.stderr)
+            stderr_log.setLevel(logging.ERROR)
+            stderr_log.setFormatter(formatter)
+            root_logger.addHandler(stderr_log)
+
+        try:
+            file_log = logging.FileHandler(filename='pyjam.log')
+            file_log.setLevel(logging.INFO)
+            file_log.setFormatter(formatter)
+            root_logger.addHandler(file_log)
+        except (OSError, IOError):
+            root_logger.exception("Could not create log file.")
+            report_error("Could not create log file, errors will not be recorded!")
+
+    _logger = logging.getLogger('pyjam')
+    _logger.info("Python {version} on {platform}".format(version=sys.version, platform=sys.platform))
+    _logger.info(platform.uname())
+    _logger.info("pyjam version {v}".format(v=__version__))
+
+    return _logger
@@ -0,0 +1,479 @@
+# Copyright (C) 10se1ucgo 2016
+#
+# This file is part of pyjam.
+#
+# pyjam is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# pyjam is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with pyjam.  If not, see <http://www.gnu.org/licenses/>.
+
+# wxPython dialogs for the FFmpeg downloader, the audio converter and the audio downloader.
+from __future__ import division
+import collections
+import logging
+import os
+import threading
+import webbrowser
+
+import requests
+import wx
+import wx.lib.intctrl as intctrl
+from ObjectListView import ColumnDefn, ObjectListView
+
+from . import seven_zip
+from .common import wrap_exceptions, get_path
+from .ffmpeg import FILE_EXTS, FFmpegConvertThread
+
+try:
+    from .downloader import DownloaderThread, yt_extract, yt_search
+except ImportError:
+    DownloaderThread = yt_extract = yt_search = None
+
+__all__ = ['FFmpegDownloaderThread', 'FFmpegDownloader', 'FFmpegConvertDialog', 'DownloaderDialog', 'SearchDialog']
+logger = logging.getLogger(__name__)
+PD_STYLE = wx.PD_APP_MODAL | wx.PD_AUTO_HIDE | wx.PD_CAN_ABORT | wx.PD_ELAPSED_TIME | wx.PD_ESTIMATED_TIME
+
+
+class FFmpegDownloaderThread(threading.Thread):
+    def __init__(self, parent, url, file_size):
+        super(FFmpegDownloaderThread, self).__init__()
+        self.url = url
+        self.parent = parent
+        self.file_size = file_size
+        self._abort = threading.Event()
+
+        self.daemon = True
+
+    def abort(self):
+        logger.info("Aborting FFmpeg downloader thread.")
+        self._abort.set()
+
+    def is_aborted(self):
+        return self._abort.isSet()
+
+    @wrap_exceptions
+    def run(self):
+        file_size_dl = 0
+        response = requests.get(self.url, stream=True)
+        data_chunks = response.iter_content(chunk_size=1024)
+
+        if not os.path.exists('bin'):
+            os.mkdir('bin')
+
+        with open('bin/ffmpeg.7z', 'wb') as f:
+            while not self.is_aborted():
+                try:
+                    chunk = next(data_chunks)
+                    file_size_dl += len(chunk)
+                    logger.info("FFmpeg downloader: Downloaded chunk: {chunk}".format(chunk=len(chunk)))
+                    logger.info("FFmpeg downloader: Total downloaded so far: {total}".format(total=file_size_dl))
+                    logger.info("FFmpeg downloader: Remaining: {r}".format(r=self.file_size - file_size_dl))
+                    if chunk:
+                        f.write(chunk)
+                        f.flush()
+                        # This makes the download super slow.
+                        # os.fsync(f.fileno())
+                    wx.CallAfter(self.parent.ff_update, message=file_size_dl)
+                except StopIteration:
+                    wx.CallAfter(self.parent.ff_complete)
+                    break
+
+
+class FFmpegDownloader(wx.ProgressDialog):
+    def __init__(self, parent, url):
+        self.file_size = int(requests.head(url).headers["Content-Length"])
+        super(FFmpegDownloader, self).__init__(title="pyjam FFmpeg Downloader", message="Downloading FFmpeg...",
+                                               maximum=self.file_size // 1024, parent=parent, style=PD_STYLE)
+
+        self.downloader = FFmpegDownloaderThread(parent=self, url=url, file_size=self.file_size)
+        self.downloader.start()
+
+    def ff_update(self, message):
+        if self and self.downloader.isAlive():  # True PD has not been destroyed.
+            if not self.Update(value=message // 1024)[0]:
+                # Cancel button pressed
+                self.downloader.abort()
+                self.downloader.join()
+                logger.info("FFmpeg download canceled.")
+
+                alert = wx.MessageDialog(parent=self, message="Aborted! FFmpeg was not downloaded.", caption="pyjam",
+                                         style=wx.ICON_EXCLAMATION)
+                alert.ShowModal()
+                alert.Destroy()
+
+                wx.CallAfter(self.Destroy)
+
+    def ff_complete(self):
+        if self:
+            logger.info("FFmpeg download complete.")
+
+            if seven_zip.find() is None:
+                message_str = "FFmpeg was downloaded succesfully!\nPlease extract it. (bin/ffmpeg.7z)"
+            else:
+                seven_zip.extract_single(get_path('bin/ffmpeg.7z'), 'ffmpeg.exe', get_path('bin/'))
+                os.remove(get_path('bin/ffmpeg.7z'))
+                message_str = "FFmpeg was downloaded succesfully!"
+            message = wx.MessageDialog(self, message_str, "pyjam")
+            message.ShowModal()
+            message.Destroy()
+
+            wx.CallAfter(self.Destroy)
+
+
+class FFmpegConvertDialog(wx.Dialog):
+    def __init__(self, parent, rate=None, out_dir=None, in_dir=None):
+        super(FFmpegConvertDialog, self).__init__(parent=parent, title="pyjam Audio Converter",
+                                                  style=wx.DEFAULT_DIALOG_STYLE | wx.RESIZE_BORDER)
+
+        self.in_dir = in_dir
+
+        self.game_rate = intctrl.IntCtrl(self)
+        game_rate_text = wx.StaticText(self, label="Audio rate")
+        if rate is not None:
+            self.game_rate.SetValue(rate)
+
+        self.volume = wx.SpinCtrl(self, initial=85)
+        volume_text = wx.StaticText(self, label="Volume %")
+
+        self.in_picker = wx.FilePickerCtrl(self, style=wx.FLP_USE_TEXTCTRL)
+        in_picker_text = wx.StaticText(self, label="Input file names (manually changing them has no effect)")
+        self.in_files = []
+        # the dumbest thing i've done all year (i'm overriding the controls of the PickerBase)
+        for child in self.in_picker.GetChildren():
+            if isinstance(child, wx.Button):
+                child.Bind(wx.EVT_BUTTON, self.browse)
+
+        self.out_dir = wx.DirPickerCtrl(self, name="Output directory")
+        out_dir_text = wx.StaticText(self, label="Output directory")
+        if out_dir is not None:
+            self.out_dir.SetPath(out_dir)
+
+        top_sizer = wx.BoxSizer(wx.VERTICAL)
+        top_row = wx.BoxSizer(wx.HORIZONTAL)
+        rate_sizer = wx.BoxSizer(wx.VERTICAL)
+        vol_sizer = wx.BoxSizer(wx.VERTICAL)
+        dir_sizer = wx.BoxSizer(wx.VERTICAL)
+        button_sizer = self.CreateButtonSizer(wx.OK | wx.CANCEL)
+
+        rate_sizer.Add(game_rate_text, 0, wx.ALL ^ wx.BOTTOM | wx.ALIGN_LEFT, 5)
+        rate_sizer.Add(self.game_rate, 0, wx.ALL | wx.ALIGN_LEFT, 5)
+        vol_sizer.Add(volume_text, 0, wx.ALL ^ wx.BOTTOM | wx.ALIGN_LEFT, 5)
+        vol_sizer.Add(self.volume, 0, wx.ALL | wx.ALIGN_LEFT, 5)
+        top_row.Add(rate_sizer)
+        top_row.Add(vol_sizer)
+        dir_sizer.Add(in_picker_text, 0, wx.ALL ^ wx.LEFT | wx.ALIGN_LEFT, 3)
+        dir_sizer.Add(self.in_picker, 0, wx.ALL ^ wx.LEFT ^ wx.TOP | wx.ALIGN_LEFT | wx.EXPAND, 5)
+        dir_sizer.Add(out_dir_text, 0, wx.ALL ^ wx.LEFT | wx.ALIGN_LEFT, 3)
+        dir_sizer.Add(self.out_dir, 0, wx.ALL ^ wx.LEFT ^ wx.TOP | wx.ALIGN_LEFT | wx.EXPAND, 5)
+        top_sizer.Add(top_row)
+        top_sizer.Add(dir_sizer, 1, wx.ALL | wx.EXPAND | wx.ALIGN_TOP, 5)
+        top_sizer.Add(button_sizer, 0, wx.ALL | wx.ALIGN_CENTER, 5)
+
+        self.Bind(wx.EVT_BUTTON, self.on_ok, id=wx.ID_OK)
+        self.Bind(wx.EVT_BUTTON, self.on_cancel, id=wx.ID_CANCEL)
+
+        self.converter = None
+        self.progress_dialog = None
+        self.num_songs = 0
+
+        self.SetSizer(top_sizer)
+        # self.SetSize(400, 250)
+        self.Center()
+        self.ShowModal()
+
+    def on_ok(self, event):
+        if not os.path.exists(self.out_dir.GetPath()):
+            os.makedirs(self.out_dir.GetPath())
+        self.num_songs = len(self.in_files)
+        if self.num_songs <= 0:
+            alert = wx.MessageDialog(self, "No songs selected!", "pyjam", wx.ICON_EXCLAMATION)
+            alert.ShowModal()
+            alert.Destroy()
+            return
+
+        self.progress_dialog = wx.ProgressDialog(title="Conversion", message="Converting songs...",
+                                                 maximum=self.num_songs * 2, parent=self, style=PD_STYLE)
+
+        self.converter = FFmpegConvertThread(parent=self, dest=self.out_dir.GetPath(), rate=self.game_rate.GetValue(),
+                                             vol=self.volume.GetValue(), songs=self.in_files)
+        self.converter.start()
+
+    def on_cancel(self, event):
+        self.Destroy()
+        event.Skip()
+
+    def convert_update(self, message):
+        progress = "{songs} out of {total}".format(songs=message // 2, total=self.num_songs)
+        if self.progress_dialog and self.converter.isAlive():
+            if message >= self.num_songs * 2:
+                message = self.num_songs * 2 - 1
+            if not self.progress_dialog.Update(value=message, newmsg="Converted: {prog}".format(prog=progress))[0]:
+                self.converter.abort()
+                self.converter.join()
+                self.progress_dialog.Destroy()
+
+                alert_string = "Aborted! Only {progress} songs were converted".format(progress=progress)
+                alert = wx.MessageDialog(parent=self, message=alert_string, caption="pyjam", style=wx.ICON_EXCLAMATION)
+                alert.ToggleWindowStyle(wx.STAY_ON_TOP)
+                alert.ShowModal()
+                alert.Destroy()
+
+                logger.info("Audio conversion canceled canceled.")
+                logger.info(progress)
+                # wx.CallAfter(self.progress_dialog.Destroy)
+
+    def convert_complete(self, errors):
+        if self.progress_dialog:
+            self.converter.join()
+            if errors:
+                done_string = "Songs converted with {errors} error(s)".format(errors=len(errors))
+            else:
+                done_string = "All songs were converted succesfully!"
+            done_message = wx.MessageDialog(parent=self, message=done_string, caption="pyjam")
+            done_message.ToggleWindowStyle(wx.STAY_ON_TOP)
+            done_message.ShowModal()
+            done_message.Destroy()
+
+            if errors:
+                errors = '\n'.join(errors)
+                error_dialog = wx.MessageDialog(parent=self, message="The following files caused errors\n" + errors,
+                                                caption="Conversion Error!", style=wx.OK | wx.ICON_ERROR)
+                error_dialog.ShowModal()
+                error_dialog.Destroy()
+                logger.critical("Error converting these files\n{errors}".format(errors=errors))
+
+            logger.info(done_string)
+            wx.CallAfter(self.progress_dialog.Destroy)
+
+    def browse(self, event):
+        wildcard = "Audio and Video files ({wildcards})|{wildcards}".format(wildcards=';'.join(FILE_EXTS))
+        file_dialog = wx.FileDialog(self, message="Select files",
+                                    style=wx.FD_OPEN | wx.FD_MULTIPLE | wx.FD_FILE_MUST_EXIST, wildcard=wildcard)
+        file_dialog.SetDirectory(self.in_dir) if self.in_dir else None
+        if file_dialog.ShowModal() != wx.ID_OK:
+            file_dialog.Destroy()
+            return
+        self.in_files = file_dialog.GetPaths()
+        self.in_picker.GetTextCtrl().SetValue(str(file_dialog.GetFilenames()).strip('[]'))
+        file_dialog.Destroy()
+
+
+class DownloaderDialog(wx.Dialog):
+    def __init__(self, parent):
+        super(DownloaderDialog, self).__init__(parent, title="pyjam Downloader",
+                                               style=wx.DEFAULT_DIALOG_STYLE | wx.RESIZE_BORDER)
+        self.parent = parent
+
+        self.audio_links = wx.TextCtrl(self)
+        audio_link_text = wx.StaticText(self, label="URL(s) (Separate with commas)")
+
+        self.out_dir = wx.DirPickerCtrl(self, path=os.path.abspath("downloads"))
+        out_dir_text = wx.StaticText(self, label="Output directory")
+
+        warning_text = wx.StaticText(self, style=wx.ALIGN_CENTRE_HORIZONTAL,
+                                     label=("Note: The program will freeze for a bit while it processes the URL "
+                                            "before downloading"))
+        warning_text.Wrap(self.GetSize()[0])
+
+        search_button = wx.Button(self, label="Search")
+
+        top_sizer = wx.BoxSizer(wx.VERTICAL)
+        control_sizer = wx.BoxSizer(wx.VERTICAL)
+        text_sizer = wx.BoxSizer(wx.VERTICAL)
+        button_sizer = self.CreateButtonSizer(wx.OK | wx.CANCEL)
+
+        control_sizer.Add(audio_link_text, 0, wx.ALL ^ wx.LEFT | wx.ALIGN_LEFT, 3)
+        control_sizer.Add(self.audio_links, 0, wx.ALL ^ wx.LEFT ^ wx.TOP | wx.ALIGN_LEFT | wx.EXPAND, 5)
+        control_sizer.Add(out_dir_text, 0, wx.ALL ^ wx.LEFT | wx.ALIGN_LEFT, 3)
+        control_sizer.Add(self.out_dir, 0, wx.ALL ^ wx.LEFT ^ wx.TOP | wx.ALIGN_LEFT | wx.EXPAND, 5)
+        text_sizer.Add(warning_text, 0, wx.ALL | wx.ALIGN_CENTER, 5)
+        button_sizer.Add(search_button)
+        top_sizer.Add(control_sizer, 1, wx.ALL | wx.EXPAND | wx.ALIGN_TOP, 5)
+        top_sizer.Add(text_sizer, 0, wx.ALL | wx.ALIGN_CENTER, 5)
+        top_sizer.Add(button_sizer, 0, wx.ALL | wx.ALIGN_CENTER, 5)
+
+        self.Bind(wx.EVT_BUTTON, handler=self.on_ok, id=wx.ID_OK)
+        self.Bind(wx.EVT_BUTTON, handler=lambda x: SearchDialog(self), source=search_button)
+
+        self.downloader = None
+        self.progress_dialog = None
+        self.num_songs = 0
+
+        self.SetSizerAndFit(top_sizer)
+        self.Center()
+        self.ShowModal()
+
+    def on_ok(self, event):
+        songs = yt_extract(self.audio_links.GetValue().split(','))
+        if not songs:
+            error = wx.MessageDialog(parent=self,
+                                     message="Invalid/Unsupported URL!",
+                                     caption="Error!", style=wx.OK | wx.ICON_WARNING)
+            error.ShowModal()
+            error.Destroy()
+            return
+
+        self.num_songs = len(songs)
+
+        self.progress_dialog = wx.ProgressDialog(title="Download", message="Downloading songs...",
+                                                 maximum=self.num_songs * 100, parent=self, style=PD_STYLE)
+
+        self.downloader = DownloaderThread(self, songs, self.out_dir.GetPath())
+        self.downloader.start()
+
+    def download_update(self, message):
+        progress = "{songs} out of {total}".format(songs=message // 100, total=self.num_songs)
+        if self.progress_dialog and self.downloader.isAlive():
+            if not self.progress_dialog.Update(value=message, newmsg="Downloaded: {prog}".format(prog=progress))[0]:
+                self.downloader.abort()
+                self.downloader.join()
+
+                alert_string = "Aborted! Only {progress} songs were downloaded".format(progress=progress)
+                alert = wx.MessageDialog(parent=self, message=alert_string, caption="pyjam", style=wx.ICON_EXCLAMATION)
+                alert.ShowModal()
+                alert.Destroy()
+
+                logger.info("Audio download canceled.")
+                logger.info(alert_string)
+                wx.CallAfter(self.progress_dialog.Destroy)
+
+    def download_complete(self, errors):
+        if self.progress_dialog:
+            logger.info("Beginning download")
+            self.downloader.join()
+            if errors:
+                done_string = "Songs downloaded with {errors} error(s)".format(errors=len(errors))
+            else:
+                done_string = "All songs were downloaded succesfully!"
+            logger.info(done_string)
+            done_message = wx.MessageDialog(parent=self, message=done_string, caption="pyjam")
+            done_message.ShowModal()
+            done_message.Destroy()
+
+            if errors:
+                errors = '\n'.join(errors)
+                logger.critical("Error downloading these these URLs:\n{errors}".format(errors=errors))
+                error_dialog = wx.MessageDialog(parent=self, message="The following URLs caused errors\n" + errors,
+                                                caption="Download Error!", style=wx.ICON_ERROR)
+                error_dialog.ShowModal()
+                error_dialog.Destroy()
+
+            self.progress_dialog.Destroy()
+            self.Destroy()
+            wx.CallAfter(self.parent.convert, event=None, in_dir=self.out_dir.GetPath())
+
+
+class SearchDialog(wx.Dialog):
+    def __init__(self, parent):
+        super(SearchDialog, self).__init__(parent=parent, title="pyjam Audio Search")
+        self.parent = parent
+
+        self.result_list = ObjectListView(parent=self, style=wx.LC_REPORT | wx.BORDER_SUNKEN, sortable=True,
+                                          useAlternateBackColors=False)
+        self.result_list.SetEmptyListMsg("No results")
+        self.result_list.SetColumns([
+            ColumnDefn(title="Title", valueGetter="title", width=150),
+            ColumnDefn(title="Description", valueGetter="desc", width=300)
+        ])
+
+        self.search_recent = collections.deque([], 10)
+        search_help = wx.StaticText(parent=self, label=("Enter a search term and press Enter. "
+                                                        "Then, select the videos you want from the list and press OK."))
+        self.search_query = wx.SearchCtrl(parent=self, style=wx.TE_PROCESS_ENTER)
+        self.search_query.ShowCancelButton(True)
+        self.search_query.SetMenu(self.search_menu())
+
+        top_sizer = wx.BoxSizer(wx.VERTICAL)
+        olv_sizer = wx.BoxSizer(wx.VERTICAL)
+        query_sizer = wx.BoxSizer(wx.VERTICAL)
+
+        button_sizer = self.CreateButtonSizer(wx.OK | wx.CANCEL)
+
+        olv_sizer.Add(self.result_list, 1, wx.LEFT | wx.RIGHT | wx.EXPAND | wx.ALIGN_TOP, 5)
+        query_sizer.Add(search_help, 0, wx.ALL ^ wx.TOP, 5)
+        query_sizer.Add(self.search_query, 0, wx.ALL ^ wx.TOP | wx.EXPAND, 5)
+        top_sizer.Add(olv_sizer, 1, wx.ALL | wx.EXPAND, 5)
+        top_sizer.Add(query_sizer, 0, wx.ALL | wx.EXPAND, 5)
+        top_sizer.Add(button_sizer, 0, wx.ALL | wx.ALIGN_CENTER, 5)
+
+        # Context menu
+        self.context_menu = wx.Menu()
+        open_url = self.context_menu.Append(wx.ID_OPEN, "Open link in browser")
+        copy_url = self.context_menu.Append(wx.ID_COPY, "Copy link address")
+
+        self.Bind(wx.EVT_LIST_ITEM_RIGHT_CLICK, handler=self.list_right_click, source=self.result_list)
+        self.Bind(wx.EVT_MENU, handler=self.copy_url, source=copy_url)
+        self.Bind(wx.EVT_MENU, handler=self.open_url, source=open_url)
+
+        self.Bind(wx.EVT_TEXT_ENTER, handler=self.on_search, source=self.search_query)
+        self.Bind(wx.EVT_BUTTON, handler=self.on_ok, id=wx.ID_OK)
+        self.SetSizerAndFit(top_sizer)
+        self.Center()
+        self.ShowModal()
+
+    def on_search(self, event):
+        query = self.search_query.GetValue()
+        if not query or query.isspace():
+            alert = wx.MessageDialog(parent=self, message="Search term can't be empty!", caption="pyjam Audio Search")
+            alert.ShowModal()
+            alert.Destroy()
+            return
+        if query in self.search_recent:
+            self.search_recent.remove(query)
+        self.search_recent.appendleft(query)
+        self.search_query.SetMenu(self.search_menu())
+
+        results = yt_search(query)
+        if not results:
+            alert = wx.MessageDialog(parent=self,
+                                     message="There was an error processing your request.\nPlease try again later",
+                                     caption="pyjam Audio Search", style=wx.OK | wx.ICON_WARNING)
+            alert.ShowModal()
+            alert.Destroy()
+            return
+
+        self.result_list.SetObjects(results)
+
+    def on_ok(self, event):
+        self.parent.audio_links.SetValue(','.join(item['url'] for item in self.result_list.GetSelectedObjects()))
+        event.Skip()
+
+    def list_right_click(self, event):
+        self.selected_video = event.GetIndex()
+        self.PopupMenu(self.context_menu)
+
+    def copy_url(self, event):
+        if not wx.TheClipboard.Open():
+            alert = wx.MessageDialog(parent=self, message="There was an error opening the clipboard",
+                                     caption="pyjam Audio Search", style=wx.OK | wx.ICON_WARNING)
+            alert.ShowModal()
+            alert.Destroy()
+            return
+
+        url = self.result_list.GetObjects()[self.selected_video]["url"]
+        wx.TheClipboard.SetData(wx.TextDataObject(url))
+        wx.TheClipboard.Close()
+
+    def open_url(self, event):
+        url = self.result_list.GetObjects()[self.selected_video]["url"]
+        webbrowser.open_new_tab(url)
+
+    def search_menu(self):
+        menu = wx.Menu()
+        menu.Append(wx.ID_ANY, "Recent searches").Enable(False)
+        for item in self.search_recent:
+            self.Bind(wx.EVT_MENU, handler=self.click_recent, source=menu.Append(wx.ID_ANY, item))
+        return menu
+
+    def click_recent(self, event):
+        search = event.GetEventObject().GetLabel(event.GetId())
+        self.search_query.SetValue(search)
+        self.on_search(event=None)
@@ -0,0 +1,211 @@
+# Copyright (C) 10se1ucgo 2016
+#
+# This file is part of pyjam.
+#
+# pyjam is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# pyjam is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with pyjam.  If not, see <http://www.gnu.org/licenses/>.
+
+# Runs the slow in-game commands (YouTube searches, downloads, conversions) off the observer thread, so that loading
+# a track never has to wait for one of them.
+import collections
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from .common import wrap_exceptions
+
+__all__ = ['MAX_WORKERS', 'MAX_PENDING', 'COMMAND_LIMITS', 'Job', 'CommandDispatcher']
+logger = logging.getLogger(__name__)
+MAX_WORKERS = 4
+MAX_PENDING = 8  # Per command type. Anything past that is rejected.
+# How many commands of a type can run at the same time. Types that aren't listed get 1.
+COMMAND_LIMITS = {'search': 2, 'download': 1, 'convert': 1}
+COUNTERS = ('submitted', 'completed', 'failed', 'cancelled', 'rejected')
+
+
+class Job(object):
+    """
+    A single command handed to the dispatcher.
+    """
+    PENDING, RUNNING, DONE, FAILED, CANCELLED = 'pending', 'running', 'done', 'failed', 'cancelled'
+
+    def __init__(self, kind, func, args):
+        """
+        Args:
+            kind (str): The command type, e.g. 'search'.
+            func (function): Called with the job followed by `args`.
+            args (tuple): The arguments for `func`.
+        """
+        self.kind = kind
+        self.func = func
+        self.args = args
+        self.state = self.PENDING
+        self._cancelled = threading.Event()
+
+    def cancel(self):
+        """Cancel the job. Pending jobs never run. Running jobs can't be interrupted, they have to check is_cancelled()
+        and stop (or throw away their results) on their own.
+
+        Returns:
+            None
+        """
+        self._cancelled.set()
+
+    def is_cancelled(self):
+        return self._cancelled.isSet()
+
+    def __repr__(self):
+        return "{c}(kind={kind}, args={args}, state={state})".format(c=self.__class__, kind=self.kind, args=self.args,
+                                                                      state=self.state)
+
+
+class CommandDispatcher(object):
+    """
+    A bounded worker pool with a queue and a concurrency limit per command type.
+    """
+    def __init__(self, max_workers=MAX_WORKERS, limits=None, max_pending=MAX_PENDING):
+        """
+        Args:
+            max_workers (int): The most commands that can run at the same time, over all types.
+            limits (dict[str, int] or None): Overrides for COMMAND_LIMITS.
+            max_pending (int): The most commands of a single type that can wait for a worker.
+        """
+        self.limits = dict(COMMAND_LIMITS)
+        self.limits.update(limits or {})
+        self.max_pending = max_pending
+        self._pool = ThreadPoolExecutor(max_workers=max_workers)
+        self._lock = threading.Lock()
+        self._pending = collections.defaultdict(collections.deque)
+        self._running = collections.defaultdict(set)
+        self._counters = collections.defaultdict(collections.Counter)
+        self._closed = False
+
+    def submit(self, kind, func, *args, **kwargs):
+        """Queue a command.
+
+        Args:
+            kind (str): The command type, e.g. 'search'.
+            func (function): Called on a worker thread with the Job followed by `args`.
+            *args: The arguments for `func`.
+            replace (bool): If True, every other command of the same type is cancelled (e.g. an older search).
+
+        Returns:
+            Job or None: The job. None if it was rejected because too many commands of its type are waiting.
+        """
+        job = Job(kind, func, args)
+        with self._lock:
+            if kwargs.get('replace'):
+                self._cancel(kind)
+            if self._closed or len(self._pending[kind]) >= self.max_pending:
+                self._counters[kind]['rejected'] += 1
+                logger.warning("Rejected {job}, {num} already waiting".format(job=job, num=len(self._pending[kind])))
+                return None
+            self._counters[kind]['submitted'] += 1
+            self._pending[kind].append(job)
+            self._start_next(kind)
+        return job
+
+    def cancel(self, kind=None):
+        """Cancel every pending and running command.
+
+        Args:
+            kind (str or None): Only cancel commands of this type.
+
+        Returns:
+            int: How many commands were cancelled.
+        """
+        with self._lock:
+            return self._cancel(kind)
+
+    def _cancel(self, kind=None):
+        # Must be called with the lock held.
+        cancelled = 0
+        for job_kind in ([kind] if kind else list(set(self._pending) | set(self._running))):
+            while self._pending[job_kind]:
+                job = self._pending[job_kind].popleft()
+                job.cancel()
+                job.state = Job.CANCELLED
+                self._counters[job_kind]['cancelled'] += 1
+                cancelled += 1
+            for job in self._running[job_kind]:
+                if not job.is_cancelled():
+                    job.cancel()
+                    cancelled += 1
+        return cancelled
+
+    def _start_next(self, kind):
+        # Must be called with the lock held.
+        while self._pending[kind] and len(self._running[kind]) < self.limits.get(kind, 1):
+            job = self._pending[kind].popleft()
+            job.state = Job.RUNNING
+            self._running[kind].add(job)
+            self._pool.submit(self._run, job)
+
+    @wrap_exceptions
+    def _run(self, job):
+        try:
+            job.func(job, *job.args)
+        except Exception:
+            job.state = Job.FAILED
+            raise
+        else:
+            job.state = Job.CANCELLED if job.is_cancelled() else Job.DONE
+        finally:
+            with self._lock:
+                self._running[job.kind].discard(job)
+                self._counters[job.kind][{Job.DONE: 'completed'}.get(job.state, job.state)] += 1
+                if not self._closed:
+                    self._start_next(job.kind)
+
+    def queue_depth(self):
+        """Get how many commands are waiting for a worker.
+
+        Returns:
+            int: The amount of pending commands, over all types.
+        """
+        with self._lock:
+            return sum(len(pending) for pending in self._pending.values())
+
+    def get_metrics(self):
+        """Get the queue depth, the amount of running commands and the counters of every command type.
+
+        Returns:
+            collections.OrderedDict[str, dict[str, int]]: For every type that was ever submitted: pending, running,
+                limit, and the submitted, completed, failed, cancelled and rejected counters.
+        """
+        with self._lock:
+            metrics = collections.OrderedDict()
+            for kind in sorted(set(self._counters) | set(self._pending) | set(self._running)):
+                metrics[kind] = dict(pending=len(self._pending[kind]), running=len(self._running[kind]),
+                                     limit=self.limits.get(kind, 1), **{
+                                         counter: self._counters[kind][counter] for counter in COUNTERS
+                                     })
+            return metrics
+
+    def shutdown(self, wait=False):
+        """Cancel every command and stop the workers. Nothing can be submitted afterwards.
+
+        Args:
+            wait (bool): Whether or not to wait for the running commands to return.
+
+        Returns:
+            None
+        """
+        with self._lock:
+            self._closed = True
+            self._cancel()
+        self._pool.shutdown(wait=wait)
+
+    def __repr__(self):
+        return "{c}(limits={limits}, pending={pending})".format(c=self.__class__, limits=self.limits,
+                                                                 pending=self.queue_depth())
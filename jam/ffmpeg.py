@@ -15,33 +15,35 @@
 # You should have received a copy of the GNU General Public License
 # along with pyjam.  If not, see <http://www.gnu.org/licenses/>.
 
-# The downloading stuff here is pretty much Windows only.
 from __future__ import division
+import collections
 import logging
+import multiprocessing
 import os
+import re
 import subprocess
 import sys
 import threading
-import wave
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
-import requests
-import wx
-import wx.lib.intctrl as intctrl
-
-from . import seven_zip
-from .common import wrap_exceptions, get_path
+from .common import wrap_exceptions, call_after, get_path
+from .riff import strip_chunks
 
 try:
     from shutil import which
 except ImportError:
     from shutilwhich import which
 
-__all__ = ['FILE_EXTS', 'FFmpegDownloaderThread', 'FFmpegDownloader', 'FFmpegConvertThread', 'FFmpegConvertDialog',
-           'find', 'convert_audio']
+try:
+    import queue
+except ImportError:
+    import Queue as queue
+
+__all__ = ['FILE_EXTS', 'CONVERT_WORKERS', 'CODEC', 'FFmpegConvertThread', 'ConversionQueue', 'FFmpegInfo',
+           'FFmpegLocator', 'locator', 'find', 'get_info', 'get_version', 'probe', 'convert_audio']
 logger = logging.getLogger(__name__)
-ENCODER_START = 36
-ENCODER_LEN = 34
-PD_STYLE = wx.PD_APP_MODAL | wx.PD_AUTO_HIDE | wx.PD_CAN_ABORT | wx.PD_ELAPSED_TIME | wx.PD_ESTIMATED_TIME
+CONVERT_WORKERS = multiprocessing.cpu_count()
+CODEC = 'pcm_s16le'
 
 # Converted from a list of MIME types. If there is something missing, file an issue or create a PR!
 FILE_EXTS = (
@@ -58,295 +60,278 @@ FILE_EXTS = (
 )
 
 
-class FFmpegDownloaderThread(threading.Thread):
-    def __init__(self, parent, url, file_size):
-        super(FFmpegDownloaderThread, self).__init__()
-        self.url = url
+class FFmpegConvertThread(threading.Thread):
+    def __init__(self, parent, dest, rate, vol, songs, workers=None, cache=None):
+        """
+        Args:
+            parent (object): Receives the convert_update and convert_complete callbacks.
+            dest (str): The folder to put the converted files in.
+            rate (int or str): The sample rate for conversion.
+            vol (int): The volume to convert at.
+            songs (list[str]): Paths to the files to convert.
+            workers (int or None): How many FFmpeg processes to run at the same time. Defaults to the CPU count.
+            cache (ConversionCache or None): Where to look up files that were converted before.
+        """
+        super(FFmpegConvertThread, self).__init__()
         self.parent = parent
-        self.file_size = file_size
+        self.dest = dest
+        self.rate = rate
+        self.vol = vol
+        self.songs = songs
+        self.workers = workers or CONVERT_WORKERS
+        self.cache = cache
+        self.converted = 0
+        self._params = None
         self._abort = threading.Event()
+        self._lock = threading.Lock()
+        self._processes = set()
 
         self.daemon = True
 
     def abort(self):
-        logger.info("Aborting FFmpeg downloader thread.")
+        logger.info("Aborting FFmpeg converter thread.")
         self._abort.set()
+        with self._lock:
+            processes = list(self._processes)
+        for p in processes:
+            try:
+                p.kill()
+            except OSError:  # It already exited.
+                pass
 
     def is_aborted(self):
         return self._abort.isSet()
 
     @wrap_exceptions
     def run(self):
-        file_size_dl = 0
-        response = requests.get(self.url, stream=True)
-        data_chunks = response.iter_content(chunk_size=1024)
-
-        if not os.path.exists('bin'):
-            os.mkdir('bin')
-
-        with open('bin/ffmpeg.7z', 'wb') as f:
-            while not self.is_aborted():
-                try:
-                    chunk = next(data_chunks)
-                    file_size_dl += len(chunk)
-                    logger.info("FFmpeg downloader: Downloaded chunk: {chunk}".format(chunk=len(chunk)))
-                    logger.info("FFmpeg downloader: Total downloaded so far: {total}".format(total=file_size_dl))
-                    logger.info("FFmpeg downloader: Remaining: {r}".format(r=self.file_size - file_size_dl))
-                    if chunk:
-                        f.write(chunk)
-                        f.flush()
-                        # This makes the download super slow.
-                        # os.fsync(f.fileno())
-                    wx.CallAfter(self.parent.ff_update, message=file_size_dl)
-                except StopIteration:
-                    wx.CallAfter(self.parent.ff_complete)
+        if not os.path.exists(self.dest):
+            os.makedirs(self.dest)
+        errors = []
+        if self.cache and self.cache.enabled:
+            version = get_version()
+            # Without a version, a file converted by a different FFmpeg build could be handed out.
+            self._params = (self.rate, self.vol, CODEC, version) if version else None
+        logger.info("Converting {num} file(s) with {workers} FFmpeg process(es), params: rate: {rate} volume: {vol}"
+                    .format(num=len(self.songs), workers=self.workers, rate=self.rate, vol=self.vol))
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            futures = {pool.submit(self.convert, track): position for position, track in enumerate(self.songs)}
+            # Progress is only ever reported from this thread, so the counter always goes up one file at a time.
+            for future in as_completed(futures):
+                if self.is_aborted():
                     break
+                position = futures[future]
+                try:
+                    converted = future.result()
+                except Exception:
+                    logger.exception("FFmpeg converter: Couldn't convert {track}".format(track=self.songs[position]))
+                    converted = False
+                if not converted:
+                    errors.append((position, self.songs[position]))
+                # Every file counts twice, once for converting and once for stripping its headers.
+                self.converted += 2
+                logger.info("FFmpeg converter: {done} out of {total} converted".format(done=self.converted // 2,
+                                                                                       total=len(self.songs)))
+                call_after(self.parent.convert_update, message=self.converted)
+            if self.is_aborted():
+                for future in futures:
+                    future.cancel()
+                return
+        if self._params:
+            self.cache.save()
+            logger.info("Conversion cache: {hits} hit(s), {misses} miss(es)".format(**self.cache.get_stats()))
+        call_after(self.parent.convert_complete, errors=[track for _, track in sorted(errors)])
+
+    def convert(self, track):
+        """Convert a single file on one of the pool's threads.
+
+        Args:
+            track (str): The path to the file.
+
+        Returns:
+            bool: True if the file was converted.
+        """
+        if self.is_aborted():
+            return False
+        file = get_path(self.dest, os.path.basename(track))
+        key = None
+        if self._params:
+            try:
+                key = self.cache.make_key(track, self._params)
+            except OSError:
+                logger.exception("Could not hash {track}".format(track=track))
+            else:
+                if self.cache.fetch(key, file):
+                    logger.info("Using the cached conversion of {track}".format(track=track))
+                    return True
+        # FFmpeg overwrites an existing file in place, which would also change any other link to it.
+        if os.path.exists(file):
+            os.remove(file)
+        logger.info("Converting {track}".format(track=track))
+        p = convert_audio(track, file, self.rate, self.vol)
+        with self._lock:
+            self._processes.add(p)
+        try:
+            if self.is_aborted():  # Aborted while the process was starting, abort() didn't see it.
+                p.kill()
+            output = p.communicate()  # output[0] is stdout, output[1] is stderr.
+        finally:
+            with self._lock:
+                self._processes.discard(p)
+        if self.is_aborted():
+            return False
+        logger.info(output[0].decode())
+        if p.returncode:
+            logger.critical("FFmpeg converter: Couldn't convert {track}".format(track=track))
+            logger.critical("FFmpeg converter: Error output log\n" + output[1].decode())
+            return False
+        strip_encoder(file)
+        if key:
+            self.cache.store(key, file)
+        return True
 
 
-class FFmpegDownloader(wx.ProgressDialog):
-    def __init__(self, parent, url):
-        self.file_size = int(requests.head(url).headers["Content-Length"])
-        super(FFmpegDownloader, self).__init__(title="pyjam FFmpeg Downloader", message="Downloading FFmpeg...",
-                                               maximum=self.file_size // 1024, parent=parent, style=PD_STYLE)
-
-        self.downloader = FFmpegDownloaderThread(parent=self, url=url, file_size=self.file_size)
-        self.downloader.start()
-
-    def ff_update(self, message):
-        if self and self.downloader.isAlive():  # True PD has not been destroyed.
-            if not self.Update(value=message // 1024)[0]:
-                # Cancel button pressed
-                self.downloader.abort()
-                self.downloader.join()
-                logger.info("FFmpeg download canceled.")
-
-                alert = wx.MessageDialog(parent=self, message="Aborted! FFmpeg was not downloaded.", caption="pyjam",
-                                         style=wx.ICON_EXCLAMATION)
-                alert.ShowModal()
-                alert.Destroy()
-
-                wx.CallAfter(self.Destroy)
-
-    def ff_complete(self):
-        if self:
-            logger.info("FFmpeg download complete.")
+class ConversionQueue(threading.Thread):
+    """
+    Runs conversion jobs one after another on a single background thread.
+    """
+    def __init__(self):
+        super(ConversionQueue, self).__init__()
+        self.jobs = queue.Queue()
+        self.current = None
+        self._abort = threading.Event()
 
-            if seven_zip.find() is None:
-                message_str = "FFmpeg was downloaded succesfully!\nPlease extract it. (bin/ffmpeg.7z)"
-            else:
-                seven_zip.extract_single(get_path('bin/ffmpeg.7z'), 'ffmpeg.exe', get_path('bin/'))
-                os.remove(get_path('bin/ffmpeg.7z'))
-                message_str = "FFmpeg was downloaded succesfully!"
-            message = wx.MessageDialog(self, message_str, "pyjam")
-            message.ShowModal()
-            message.Destroy()
+        self.daemon = True
 
-            wx.CallAfter(self.Destroy)
+    def put(self, parent, dest, rate, vol, songs, workers=None, cache=None):
+        """Queue a batch of files for conversion.
 
+        Args:
+            parent (object): Receives the convert_update and convert_complete callbacks.
+            dest (str): The folder to put the converted files in.
+            rate (int or str): The sample rate for conversion.
+            vol (int): The volume to convert at.
+            songs (list[str]): Paths to the files to convert.
+            workers (int or None): How many FFmpeg processes to run at the same time. Defaults to the CPU count.
+            cache (ConversionCache or None): Where to look up files that were converted before.
 
-class FFmpegConvertThread(threading.Thread):
-    def __init__(self, parent, dest, rate, vol, songs):
-        super(FFmpegConvertThread, self).__init__()
-        self.parent = parent
-        self.dest = dest
-        self.rate = rate
-        self.vol = vol
-        self.songs = songs
-        self.converted = 0
-        self._abort = threading.Event()
+        Returns:
+            FFmpegConvertThread: The job. It is run on the queue's thread, don't start it.
+        """
+        job = FFmpegConvertThread(parent, dest, rate, vol, songs, workers, cache)
+        self.jobs.put(job)
+        return job
 
-        self.daemon = True
+    def pending(self):
+        return self.jobs.qsize()
 
     def abort(self):
-        logger.info("Aborting FFmpeg converter thread.")
+        logger.info("Aborting FFmpeg conversion queue.")
         self._abort.set()
+        if self.current:
+            self.current.abort()
+        self.jobs.put(None)  # Wake the thread up if it's waiting for a job.
 
     def is_aborted(self):
         return self._abort.isSet()
 
     @wrap_exceptions
     def run(self):
-        if not os.path.exists(self.dest):
-            os.makedirs(self.dest)
-        tracks = iter(self.songs)
-        errors = []
         while not self.is_aborted():
-            try:
-                track = next(tracks)
-                file = get_path(self.dest, os.path.basename(track))
-                logger.info("FFmpeg converter: Total converted so far: {total}".format(total=self.converted // 2))
-                logger.info("FFmpeg converter: Remaining: {r}".format(r=len(self.songs) - self.converted // 2))
-                logger.info("Converting {track} with params: rate: {rate} volume: {vol}".format(track=track,
-                                                                                                rate=self.rate,
-                                                                                                vol=self.vol))
-                p = convert_audio(track, file, self.rate, self.vol)
-                output = p.communicate()  # output[0] is stdout, output[1] is stderr.
-                self.converted += 1
-                wx.CallAfter(self.parent.convert_update, message=self.converted)
-                logger.info(output[0].decode())
-                if p.returncode:
-                    logger.critical("FFmpeg converter: Couldn't convert {track}".format(track=track))
-                    logger.critical("FFmpeg converter: Error output log\n" + output[1].decode())
-                    errors.append(track)
-                    # File's headers aren't stripped, which normally would increase self.converted by 1.
-                    self.converted += 1
-                else:
-                    self.strip_encoder(file)
-            except StopIteration:
-                wx.CallAfter(self.parent.convert_complete, errors=errors)
+            job = self.jobs.get()
+            if job is None or self.is_aborted():
                 break
+            self.current = job
+            job.run()
+            self.current = None
 
-    @wrap_exceptions
-    def strip_encoder(self, file):
-        strip_encoder(file)
-        self.converted += 1
-        wx.CallAfter(self.parent.convert_update, message=self.converted)
-
-
-class FFmpegConvertDialog(wx.Dialog):
-    def __init__(self, parent, rate=None, out_dir=None, in_dir=None):
-        super(FFmpegConvertDialog, self).__init__(parent=parent, title="pyjam Audio Converter",
-                                                  style=wx.DEFAULT_DIALOG_STYLE | wx.RESIZE_BORDER)
-
-        self.in_dir = in_dir
-
-        self.game_rate = intctrl.IntCtrl(self)
-        game_rate_text = wx.StaticText(self, label="Audio rate")
-        if rate is not None:
-            self.game_rate.SetValue(rate)
-
-        self.volume = wx.SpinCtrl(self, initial=85)
-        volume_text = wx.StaticText(self, label="Volume %")
-
-        self.in_picker = wx.FilePickerCtrl(self, style=wx.FLP_USE_TEXTCTRL)
-        in_picker_text = wx.StaticText(self, label="Input file names (manually changing them has no effect)")
-        self.in_files = []
-        # the dumbest thing i've done all year (i'm overriding the controls of the PickerBase)
-        for child in self.in_picker.GetChildren():
-            if isinstance(child, wx.Button):
-                child.Bind(wx.EVT_BUTTON, self.browse)
-
-        self.out_dir = wx.DirPickerCtrl(self, name="Output directory")
-        out_dir_text = wx.StaticText(self, label="Output directory")
-        if out_dir is not None:
-            self.out_dir.SetPath(out_dir)
-
-        top_sizer = wx.BoxSizer(wx.VERTICAL)
-        top_row = wx.BoxSizer(wx.HORIZONTAL)
-        rate_sizer = wx.BoxSizer(wx.VERTICAL)
-        vol_sizer = wx.BoxSizer(wx.VERTICAL)
-        dir_sizer = wx.BoxSizer(wx.VERTICAL)
-        button_sizer = self.CreateButtonSizer(wx.OK | wx.CANCEL)
-
-        rate_sizer.Add(game_rate_text, 0, wx.ALL ^ wx.BOTTOM | wx.ALIGN_LEFT, 5)
-        rate_sizer.Add(self.game_rate, 0, wx.ALL | wx.ALIGN_LEFT, 5)
-        vol_sizer.Add(volume_text, 0, wx.ALL ^ wx.BOTTOM | wx.ALIGN_LEFT, 5)
-        vol_sizer.Add(self.volume, 0, wx.ALL | wx.ALIGN_LEFT, 5)
-        top_row.Add(rate_sizer)
-        top_row.Add(vol_sizer)
-        dir_sizer.Add(in_picker_text, 0, wx.ALL ^ wx.LEFT | wx.ALIGN_LEFT, 3)
-        dir_sizer.Add(self.in_picker, 0, wx.ALL ^ wx.LEFT ^ wx.TOP | wx.ALIGN_LEFT | wx.EXPAND, 5)
-        dir_sizer.Add(out_dir_text, 0, wx.ALL ^ wx.LEFT | wx.ALIGN_LEFT, 3)
-        dir_sizer.Add(self.out_dir, 0, wx.ALL ^ wx.LEFT ^ wx.TOP | wx.ALIGN_LEFT | wx.EXPAND, 5)
-        top_sizer.Add(top_row)
-        top_sizer.Add(dir_sizer, 1, wx.ALL | wx.EXPAND | wx.ALIGN_TOP, 5)
-        top_sizer.Add(button_sizer, 0, wx.ALL | wx.ALIGN_CENTER, 5)
-
-        self.Bind(wx.EVT_BUTTON, self.on_ok, id=wx.ID_OK)
-        self.Bind(wx.EVT_BUTTON, self.on_cancel, id=wx.ID_CANCEL)
-
-        self.converter = None
-        self.progress_dialog = None
-        self.num_songs = 0
-
-        self.SetSizer(top_sizer)
-        # self.SetSize(400, 250)
-        self.Center()
-        self.ShowModal()
-
-    def on_ok(self, event):
-        if not os.path.exists(self.out_dir.GetPath()):
-            os.makedirs(self.out_dir.GetPath())
-        self.num_songs = len(self.in_files)
-        if self.num_songs <= 0:
-            alert = wx.MessageDialog(self, "No songs selected!", "pyjam", wx.ICON_EXCLAMATION)
-            alert.ShowModal()
-            alert.Destroy()
-            return
-
-        self.progress_dialog = wx.ProgressDialog(title="Conversion", message="Converting songs...",
-                                                 maximum=self.num_songs * 2, parent=self, style=PD_STYLE)
-
-        self.converter = FFmpegConvertThread(parent=self, dest=self.out_dir.GetPath(), rate=self.game_rate.GetValue(),
-                                             vol=self.volume.GetValue(), songs=self.in_files)
-        self.converter.start()
-
-    def on_cancel(self, event):
-        self.Destroy()
-        event.Skip()
-
-    def convert_update(self, message):
-        progress = "{songs} out of {total}".format(songs=message // 2, total=self.num_songs)
-        if self.progress_dialog and self.converter.isAlive():
-            if message >= self.num_songs * 2:
-                message = self.num_songs * 2 - 1
-            if not self.progress_dialog.Update(value=message, newmsg="Converted: {prog}".format(prog=progress))[0]:
-                self.converter.abort()
-                self.converter.join()
-                self.progress_dialog.Destroy()
-
-                alert_string = "Aborted! Only {progress} songs were converted".format(progress=progress)
-                alert = wx.MessageDialog(parent=self, message=alert_string, caption="pyjam", style=wx.ICON_EXCLAMATION)
-                alert.ToggleWindowStyle(wx.STAY_ON_TOP)
-                alert.ShowModal()
-                alert.Destroy()
-
-                logger.info("Audio conversion canceled canceled.")
-                logger.info(progress)
-                # wx.CallAfter(self.progress_dialog.Destroy)
-
-    def convert_complete(self, errors):
-        if self.progress_dialog:
-            self.converter.join()
-            if errors:
-                done_string = "Songs converted with {errors} error(s)".format(errors=len(errors))
-            else:
-                done_string = "All songs were converted succesfully!"
-            done_message = wx.MessageDialog(parent=self, message=done_string, caption="pyjam")
-            done_message.ToggleWindowStyle(wx.STAY_ON_TOP)
-            done_message.ShowModal()
-            done_message.Destroy()
-
-            if errors:
-                errors = '\n'.join(errors)
-                error_dialog = wx.MessageDialog(parent=self, message="The following files caused errors\n" + errors,
-                                                caption="Conversion Error!", style=wx.OK | wx.ICON_ERROR)
-                error_dialog.ShowModal()
-                error_dialog.Destroy()
-                logger.critical("Error converting these files\n{errors}".format(errors=errors))
-
-            logger.info(done_string)
-            wx.CallAfter(self.progress_dialog.Destroy)
-
-    def browse(self, event):
-        wildcard = "Audio and Video files ({wildcards})|{wildcards}".format(wildcards=';'.join(FILE_EXTS))
-        file_dialog = wx.FileDialog(self, message="Select files",
-                                    style=wx.FD_OPEN | wx.FD_MULTIPLE | wx.FD_FILE_MUST_EXIST, wildcard=wildcard)
-        file_dialog.SetDirectory(self.in_dir) if self.in_dir else None
-        if file_dialog.ShowModal() != wx.ID_OK:
-            file_dialog.Destroy()
-            return
-        self.in_files = file_dialog.GetPaths()
-        self.in_picker.GetTextCtrl().SetValue(str(file_dialog.GetFilenames()).strip('[]'))
-        file_dialog.Destroy()
 
+class FFmpegInfo(collections.namedtuple('FFmpegInfo', ['path', 'version', 'configuration', 'filters', 'codecs'])):
+    """
+    What an FFmpeg build can do, probed once.
+    """
+    __slots__ = ()
 
-def find():
-    """Get the path to FFmpeg/avconv.
+    def has_filter(self, name):
+        return name in self.filters
 
-    Returns:
-        None or str: The path to FFmpeg or avconv. None if not found.
+    def has_codec(self, name):
+        return name in self.codecs
+
+    @property
+    def has_soxr(self):
+        """bool: Whether or not aresample=resampler=soxr is available (high quality, and faster than swr)."""
+        return '--enable-libsoxr' in self.configuration
+
+
+class FFmpegLocator(object):
+    """
+    Finds FFmpeg/avconv once and probes what it can do, instead of walking the PATH for every file.
+    The path is looked up again when the PATH or working directory changes (bin/ffmpeg is relative to it), when the
+    file disappears, or after invalidate().
     """
+    def __init__(self):
+        self.lookups = 0
+        self.probes = 0
+        self._lock = threading.Lock()
+        self._state = None
+        self._path = None
+        self._info = None
+
+    def invalidate(self):
+        """Forget the path and the probe results, e.g. after the config changed or FFmpeg was downloaded.
+
+        Returns:
+            None
+        """
+        with self._lock:
+            self._state = None
+            self._path = None
+            self._info = None
+
+    def find(self):
+        """Get the path to FFmpeg/avconv.
+
+        Returns:
+            None or str: The path to FFmpeg or avconv. None if not found.
+        """
+        state = (os.environ.get('PATH'), os.getcwd())
+        with self._lock:
+            if state == self._state and self._path and os.path.isfile(self._path):
+                return self._path
+            self.lookups += 1
+            path = _search()
+            # Not finding it isn't remembered, so that installing FFmpeg while pyjam is running works.
+            self._state = state if path else None
+            if path != self._path:
+                self._info = None
+            self._path = path
+            return path
+
+    def get_info(self):
+        """Get what FFmpeg can do. The first call runs it a few times, later calls don't run it at all.
+
+        Returns:
+            FFmpegInfo or None: The probe results. None if FFmpeg could not be found or run.
+        """
+        path = self.find()
+        if path is None:
+            return None
+        with self._lock:
+            if self._info is not None and self._info.path == path:
+                return self._info
+        info = probe(path)
+        with self._lock:
+            self.probes += 1
+            if info is not None and self._path == path:
+                self._info = info
+        return info
+
+    def __repr__(self):
+        return "{c}(path={path}, lookups={lookups}, probes={probes})".format(c=self.__class__, path=self._path,
+                                                                            lookups=self.lookups, probes=self.probes)
+
+
+def _search():
     if sys.platform == "win32":
         ff = which('ffmpeg.exe') or which('bin/ffmpeg.exe') or which('avconv')
     else:
@@ -354,10 +339,81 @@ def find():
         # Tested on VM, it worked on Linux Mint.
         ff = which('ffmpeg') or which('bin/ffmpeg') or which('avconv')
 
-    return get_path(ff) if ff else None
+    return os.path.abspath(ff) if ff else None
+
+
+def _run(cmd):
+    try:
+        p = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, stdin=subprocess.PIPE)
+        output = p.communicate()[0]
+    except OSError:
+        logger.exception("Could not run {cmd}".format(cmd=cmd))
+        return None
+    return output.decode('utf-8', 'replace').splitlines() if p.returncode == 0 else None
+
+
+def probe(path):
+    """Run FFmpeg to get its version, configuration, filters and codecs.
+
+    Args:
+        path (str): The path to FFmpeg or avconv.
+
+    Returns:
+        FFmpegInfo or None: The results. None if FFmpeg could not be run.
+    """
+    version = _run((path, '-version'))
+    if not version:
+        return None
+    configuration = next((line.split(':', 1)[1].strip() for line in version if line.startswith('configuration:')), '')
+
+    # " TSC loudnorm          A->A       EBU R128 loudness normalization"
+    matches = (_FILTER_LINE.match(line) for line in _run((path, '-filters')) or ())
+    filters = frozenset(match.group(1) for match in matches if match)
+    # " DEA.L. pcm_s16le            PCM signed 16-bit little-endian", after a " -------" line.
+    codec_lines = _run((path, '-codecs')) or []
+    start = next((i + 1 for i, line in enumerate(codec_lines) if line.strip().startswith('---')), len(codec_lines))
+    codecs = frozenset(line.split()[1] for line in codec_lines[start:] if len(line.split()) > 1)
+
+    info = FFmpegInfo(path, version[0].strip(), configuration, filters, codecs)
+    logger.info("Probed {version}: {filters} filters, {codecs} codecs".format(
+        version=info.version, filters=len(filters), codecs=len(codecs)
+    ))
+    return info
+
+
+_FILTER_LINE = re.compile(r'^ [A-Z.|]{2,} +(\w+) +\S*->\S*')
+locator = FFmpegLocator()
+
+
+def find():
+    """Get the path to FFmpeg/avconv. It is only looked up once, see FFmpegLocator.
+
+    Returns:
+        None or str: The path to FFmpeg or avconv. None if not found.
+    """
+    return locator.find()
+
+
+def get_info():
+    """Get what FFmpeg can do. It is only probed once, see FFmpegLocator.
+
+    Returns:
+        FFmpegInfo or None: The probe results. None if FFmpeg could not be found or run.
+    """
+    return locator.get_info()
+
+
+def get_version():
+    """Get the version FFmpeg reports.
+
+    Returns:
+        str or None: The first line of `ffmpeg -version`. None if FFmpeg could not be found or run.
+    """
+    info = get_info()
+    return info.version if info else None
 
 
-def convert_audio(file, dest, rate, vol, codec="pcm_s16le"):
+def convert_audio(file, dest, rate, vol, codec=CODEC):
     """Convert an audio file with FFmpeg.
 
     Args:
@@ -394,9 +450,8 @@ def trim_audio(file, dest, start, stop):
 
 
 def strip_encoder(file):
-    """Strip encoder metadata from an audio file with the Python wave module.
-    The wave module ignores any chunks that aren't the "fmt " or "data" chunk.
-    Note the space in "fmt ".
+    """Strip encoder metadata (e.g. the LIST chunk FFmpeg adds) from a WAV file, in place.
+    Only the "fmt " and "data" chunks are kept. Note the space in "fmt ".
 
     Args:
         file (str): The path to the file to strip.
@@ -405,10 +460,4 @@ def strip_encoder(file):
         None
     """
     logger.info("Stripping metadata from {file}".format(file=file))
-    with wave.open(file, 'r') as f:
-        params = f.getparams()
-        frames = f.readframes(-1)
-    with wave.open(file, 'w') as f:
-        print(params)
-        f.setparams(params)
-        f.writeframes(frames)
+    strip_chunks(file)
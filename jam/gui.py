@@ -0,0 +1,693 @@
+# Copyright (C) 10se1ucgo 2016
+#
+# This file is part of pyjam.
+#
+# pyjam is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# pyjam is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with pyjam.  If not, see <http://www.gnu.org/licenses/>.
+# The wxPython GUI. Everything in here runs on the GUI thread, the rest of the package doesn't know wx exists.
+import logging
+import os
+import platform
+import sys
+import traceback
+
+import wx  # Tested w/ wxPhoenix 3.0.3
+import wx.adv
+import wx.lib.intctrl as intctrl  # This was fixed recently. You need the latest version of wxPython-Pheonix!
+from ObjectListView import ColumnDefn, ObjectListView
+
+from . import about, dialogs, ffmpeg
+from .common import (SOURCE_KEYS, Game, get_steam_path, get_resource, bindable, filter_alias, set_call_after,
+                     set_error_hook)
+from .jam import Jam, get_tracks, apply_track_data, find_duplicates
+from .store import TrackStore, TrackDataStore
+
+__all__ = ['WX_KEYS_CONVERSION', 'MainFrame', 'MainPanel', 'SetupDialog', 'key_choice_override', 'error_dialog',
+           'exception_hook', 'main']
+logger = logging.getLogger(__name__)
+NO_ALIASES = "This track has no aliases"  # im lazy, okay?
+
+try:
+    from . import downloader
+except ImportError:
+    downloader = None
+
+try:
+    from . import waveform
+except ImportError:
+    waveform = None
+    logger.exception("Error importing waveform viewer, numpy is likely not installed.")
+
+# Conversion table for wx -> Source Engine keys.
+WX_KEYS_CONVERSION = {
+    wx.WXK_F1: 'F1', wx.WXK_F2: "F2", wx.WXK_F3: "F3", wx.WXK_F4: "F4", wx.WXK_F5: "F5", wx.WXK_F6: "F6",
+    wx.WXK_F7: "F7", wx.WXK_F8: "F8", wx.WXK_F9: "F9", wx.WXK_F10: "F10", wx.WXK_F11: "F11",
+    wx.WXK_F12: "F12", wx.WXK_TAB: "TAB", wx.WXK_RETURN: "ENTER", wx.WXK_ESCAPE: "ESCAPE",
+    wx.WXK_SPACE: "SPACE", wx.WXK_BACK: "BACKSPACE", wx.WXK_UP: "UPARROW", wx.WXK_DOWN: "DOWNARROW",
+    wx.WXK_LEFT: "LEFTARROW", wx.WXK_RIGHT: "RIGHTARROW", wx.WXK_ALT: "ALT", wx.WXK_CONTROL: "CTRL",
+    wx.WXK_SHIFT: "SHIFT", wx.WXK_INSERT: "INS", wx.WXK_DELETE: "DEL", wx.WXK_PAGEDOWN: "PGDN",
+    wx.WXK_PAGEUP: "PGUP", wx.WXK_HOME: "HOME", wx.WXK_END: "END", wx.WXK_NUMPAD_HOME: "KP_HOME",
+    wx.WXK_NUMPAD_UP: "KP_UPARROW", wx.WXK_NUMPAD_PAGEUP: "KP_PGUP", wx.WXK_NUMPAD_LEFT: "KP_LEFTARROW",
+    wx.WXK_NUMPAD5: "KP_5", wx.WXK_NUMPAD_RIGHT: "KP_RIGHTARROW", wx.WXK_NUMPAD_END: "KP_END",
+    wx.WXK_NUMPAD_DOWN: "KP_DOWNARROW", wx.WXK_NUMPAD_PAGEDOWN: "KP_PGDN", wx.WXK_NUMPAD_ENTER: "KP_ENTER",
+    wx.WXK_NUMPAD_INSERT: "KP_INS", wx.WXK_NUMPAD_DELETE: "KP_DEL", wx.WXK_NUMPAD_DIVIDE: "KP_SLASH",
+    wx.WXK_NUMPAD_MULTIPLY: "KP_MULTIPLY", wx.WXK_NUMPAD_SUBTRACT: "KP_MINUS", wx.WXK_NUMPAD_ADD: "KP_PLUS",
+    wx.WXK_CAPITAL: "CAPSLOCK", wx.WXK_PAUSE: "PAUSE", wx.WXK_NUMPAD0: "KP_INS",
+    wx.WXK_NUMPAD_DECIMAL: "KP_DEL", wx.WXK_NUMPAD1: "KP_END", wx.WXK_NUMPAD2: "KP_DOWNARROW",
+    wx.WXK_NUMPAD3: "KP_PGDN", wx.WXK_NUMPAD4: "KP_LEFTARROW", wx.WXK_NUMPAD6: "KP_RIGHTARROW",
+    wx.WXK_NUMPAD7: "KP_HOME", wx.WXK_NUMPAD8: "KP_UPARROW", wx.WXK_NUMPAD9: "KP_PGUP"
+}
+
+
+class MainFrame(wx.Frame):
+    def __init__(self, config):
+        super(MainFrame, self).__init__(parent=wx.GetApp().GetTopWindow(), title="pyjam")
+        self.config = config
+        bitmap = wx.Bitmap(get_resource('data/splash.png'), wx.BITMAP_TYPE_PNG)
+        splash = wx.adv.SplashScreen(bitmap, wx.adv.SPLASH_CENTRE_ON_PARENT | wx.adv.SPLASH_NO_TIMEOUT, 0, parent=self)
+        panel = MainPanel(self, config)
+        self.SetSize(600, 400)
+
+        file_menu = wx.Menu()
+        settings = file_menu.Append(wx.ID_SETUP, "&Settings", "pyjam Setup")
+        duplicates = file_menu.Append(wx.ID_ANY, "Find &duplicates", "Find tracks with identical audio")
+        stats = file_menu.Append(wx.ID_ANY, "&Latency stats", "How long pyjam takes to react to the game")
+
+        help_menu = wx.Menu()
+        about_item = help_menu.Append(wx.ID_ABOUT, "&About", "About pyjam")
+        licenses = help_menu.Append(wx.ID_ANY, "&Licenses", "Open source licenses")
+
+        menu_bar = wx.MenuBar()
+        menu_bar.Append(file_menu, "&File")
+        menu_bar.Append(help_menu, "&Help")
+        self.SetMenuBar(menu_bar)
+        self.status_bar = self.CreateStatusBar()
+
+        if sys.platform == "win32":
+            icon = wx.Icon(sys.executable, wx.BITMAP_TYPE_ICO)
+        else:
+            icon = wx.Icon(get_resource('data/icon.ico'), wx.BITMAP_TYPE_ICO)
+        self.SetIcon(icon)
+
+        self.Bind(wx.EVT_MENU, handler=panel.settings, source=settings)
+        self.Bind(wx.EVT_MENU, handler=panel.find_duplicates, source=duplicates)
+        self.Bind(wx.EVT_MENU, handler=panel.show_stats, source=stats)
+        self.Bind(wx.EVT_MENU, handler=lambda x: about.about_dialog(self), source=about_item)
+        self.Bind(wx.EVT_MENU, handler=lambda x: about.Licenses(self), source=licenses)
+        self.Bind(wx.EVT_CLOSE, handler=panel.on_exit)
+
+        about.update_check(self)
+        splash.Destroy()
+        logger.info("Ready.")
+        self.status_bar.SetStatusText('Status: Ready')
+        self.Show()
+
+
+class MainPanel(wx.Panel):
+    def __init__(self, parent, config):
+        super(MainPanel, self).__init__(parent)
+        self.parent = parent
+        self.config = config
+        self.games = config.get_games()
+        self.game = None
+        self.game_watcher = None
+        while not self.games:
+            error = wx.MessageDialog(parent=self,
+                                     message="You have no games profiles set up. Replacing config with default.",
+                                     caption="Info", style=wx.OK | wx.ICON_INFORMATION)
+            error.ShowModal()
+            error.Destroy()
+            config.new()
+            config.load()
+            self.games = config.get_games()
+
+        self.profile = wx.ComboBox(parent=self, choices=[game.name for game in self.games],
+                                   style=wx.CB_READONLY)
+        self.profile.SetSelection(0)
+
+        self.track_list = ObjectListView(parent=self, style=wx.LC_REPORT | wx.BORDER_SUNKEN, sortable=True,
+                                         useAlternateBackColors=False)
+        self.track_list.SetEmptyListMsg("You currently do not have any sound files for this game.")
+        self.track_list.SetColumns([
+            ColumnDefn(title="#", fixedWidth=50, valueGetter="index", stringConverter="%i"),
+            ColumnDefn(title="Title", width=250, valueGetter="name", minimumWidth=150, isSpaceFilling=True),
+            ColumnDefn(title="Aliases", width=300, valueGetter="get_aliases", minimumWidth=200, isSpaceFilling=True),
+            ColumnDefn(title="Bind", width=75, valueGetter="bind", minimumWidth=50, maximumWidth=120),
+            ColumnDefn(title="Length", width=60, valueGetter="get_duration", minimumWidth=50, maximumWidth=80)
+        ])
+        self.track_list.rowFormatter = self.row_formatter
+        self.track_store = TrackStore()
+        self.track_store.add_listener(self.on_tracks_changed)
+        self.track_store.add_update_listener(self.on_tracks_updated)
+        self.track_data = None
+        self.selected_track = None
+        self.game_select(event=None)
+
+        refresh_button = wx.Button(parent=self, label="Refresh tracks")
+        self.start_stop_button = wx.Button(parent=self, label="Start")
+        convert_button = wx.Button(parent=self, label="Audio converter")
+        download_button = wx.Button(parent=self, label="Audio downloader")
+
+        top_sizer = wx.BoxSizer(wx.VERTICAL)  # Root sizer
+        profile_sizer = wx.BoxSizer(wx.VERTICAL)  # For the profile selection
+        olv_sizer = wx.BoxSizer(wx.VERTICAL)  # For the ObjectListView
+        button_sizer = wx.BoxSizer(wx.HORIZONTAL)  # Start/Stop and Refresh buttons
+
+        profile_sizer.Add(self.profile, 0, wx.LEFT | wx.RIGHT | wx.EXPAND | wx.ALIGN_TOP, 5)
+        olv_sizer.Add(self.track_list, 1, wx.LEFT | wx.RIGHT | wx.EXPAND | wx.ALIGN_TOP, 5)
+        button_sizer.Add(self.start_stop_button, 0, wx.ALL | wx.ALIGN_LEFT, 5)
+        button_sizer.Add(refresh_button, 0, wx.ALL | wx.ALIGN_LEFT, 5)
+        button_sizer.Add(convert_button, 0, wx.ALL | wx.ALIGN_LEFT, 5)
+        button_sizer.Add(download_button, 0, wx.ALL | wx.ALIGN_LEFT, 5)
+
+        top_sizer.Add(profile_sizer, 0, wx.ALL | wx.EXPAND, 5)
+        top_sizer.Add(olv_sizer, 1, wx.ALL | wx.EXPAND, 5)
+        top_sizer.Add(button_sizer, 0, wx.ALL | wx.EXPAND, 5)
+        top_sizer.SetSizeHints(self.parent)
+        self.SetSizerAndFit(top_sizer)
+
+        # Context menu
+        self.context_menu = wx.Menu()
+        set_aliases = self.context_menu.Append(wx.ID_ANY, "Set custom aliases")
+        clear_aliases = self.context_menu.Append(wx.ID_ANY, "Clear custom aliases")
+        set_bind = self.context_menu.Append(wx.ID_ANY, "Set bind")
+        clear_bind = self.context_menu.Append(wx.ID_ANY, "Clear bind")
+        clear_all = self.context_menu.Append(wx.ID_CLEAR, "Clear EVERYTHING (all tracks)")
+        trim_file = self.context_menu.Append(wx.ID_CUT, "Trim audio file")
+
+        self.Bind(wx.EVT_LIST_ITEM_RIGHT_CLICK, handler=self.list_right_click, source=self.track_list)
+        self.Bind(wx.EVT_MENU, handler=self.set_aliases, source=set_aliases)
+        self.Bind(wx.EVT_MENU, handler=self.clear_aliases, source=clear_aliases)
+        self.Bind(wx.EVT_MENU, handler=self.set_bind, source=set_bind)
+        self.Bind(wx.EVT_MENU, handler=self.clear_bind, source=clear_bind)
+        self.Bind(wx.EVT_MENU, handler=self.clear_all, source=clear_all)
+        self.Bind(wx.EVT_MENU, handler=self.trim_file, source=trim_file)
+
+        self.Bind(wx.EVT_COMBOBOX, handler=self.game_select, source=self.profile)
+        self.Bind(wx.EVT_BUTTON, handler=self.refresh, source=refresh_button)
+        self.Bind(wx.EVT_BUTTON, handler=self.start_stop, source=self.start_stop_button)
+        self.Bind(wx.EVT_BUTTON, handler=self.convert, source=convert_button)
+        self.Bind(wx.EVT_BUTTON, handler=self.download, source=download_button)
+
+        # self.Bind(wx.EVT_SIZE, handler=self.on_size)
+        self.Bind(wx.EVT_CLOSE, handler=self.on_exit)
+
+    @staticmethod
+    def row_formatter(list_item, track):
+        if track.problems:
+            # Needs to be converted before it can be played.
+            list_item.SetTextColour(wx.Colour(255, 128, 0))
+        elif track.get_aliases() == NO_ALIASES:
+            list_item.SetTextColour(wx.RED)
+
+    def on_tracks_changed(self, tracks):
+        # The store notifies on whichever thread replaced the tracks, and the ObjectListView must only be touched
+        # from the GUI thread.
+        if wx.IsMainThread():
+            self.track_list.SetObjects(tracks)
+        else:
+            wx.CallAfter(self.track_list.SetObjects, tracks)
+
+    def on_tracks_updated(self, tracks):
+        if wx.IsMainThread():
+            self.track_list.RefreshObjects(tracks)
+        else:
+            wx.CallAfter(self.track_list.RefreshObjects, tracks)
+
+    def game_select(self, event):
+        self.game = self.games[self.profile.GetSelection()]
+        self.track_data = TrackDataStore(self.game.audio_dir)
+        self.refresh(event=None)
+
+    def start_stop(self, event):
+        if not self.game_watcher:
+            self.refresh(event=None)
+            self.start_stop_button.SetLabel("Starting...")
+            self.start_stop_button.Disable()
+            self.game_watcher = Jam(self.config.steam_path, self.game, self.track_store, self.config.get_index_file())
+            self.game_watcher.start()
+            self.start_stop_button.Enable()
+            self.start_stop_button.SetLabel("Stop")
+            self.parent.status_bar.SetStatusText('Status: Running')
+        else:
+            self.start_stop_button.Disable()
+            self.start_stop_button.SetLabel("Stopping...")
+            self.parent.status_bar.SetStatusText('Status: Stopping...')
+            self.game_watcher.stop()
+            self.game_watcher = None
+            self.start_stop_button.Enable()
+            self.start_stop_button.SetLabel("Start")
+            self.parent.status_bar.SetStatusText('Status: Stopped')
+
+    def refresh(self, event):
+        self.track_store.set_tracks(get_tracks(self.game.get_audio_dirs(), audio_rate=self.game.audio_rate,
+                                               track_data=self.track_data.get_data(),
+                                               index_file=self.config.get_index_file()))
+
+    def convert(self, event, in_dir=None):
+        if ffmpeg.find() is None and sys.platform == "win32":
+            message = ("Couldn't detect FFmpeg in your PATH.\n"
+                       "FFmpeg is required for audio conversion. Would you like to download it?")
+            do_download = wx.MessageDialog(parent=self, message=message, caption="pyjam",
+                                           style=wx.YES_NO | wx.ICON_QUESTION)
+
+            if do_download.ShowModal() == wx.ID_YES:
+                if platform.architecture()[0] == '64bit':
+                    url = "https://ffmpeg.zeranoe.com/builds/win64/static/ffmpeg-latest-win64-static.7z"
+                else:
+                    url = "https://ffmpeg.zeranoe.com/builds/win32/static/ffmpeg-latest-win32-static.7z"
+                dialogs.FFmpegDownloader(self, url)
+
+            else:
+                download_info = ("Please download it and place FFmpeg.exe in your PATH\n"
+                                 "or inside the /pyjam/bin/ folder. You can download it at:\n\n"
+                                 "http://ffmpeg.zeranoe.com/")
+
+                message = wx.MessageDialog(parent=self, message=download_info, caption="pyjam")
+                message.ShowModal()
+                message.Destroy()
+
+            do_download.Destroy()
+
+        elif ffmpeg.find() is None:
+            message = wx.MessageDialog(parent=self, caption="pyjam",
+                                       message="You require FFmpeg or avconv to convert audio. Please install it.")
+            message.ShowModal()
+            message.Destroy()
+
+        else:
+            dialogs.FFmpegConvertDialog(self, self.game.audio_rate, self.game.audio_dir, in_dir)
+            self.game_select(event=None)
+
+    def download(self, event):
+        if not downloader:
+            msg = ("There was an error loading the pyjam downloader.\n"
+                   "It requires the youtube-dl module installed, please make sure you have it.")
+            raise ImportError(msg)
+        dialogs.DownloaderDialog(self)
+
+    def list_right_click(self, event):
+        self.selected_track = event.GetIndex()
+        self.PopupMenu(self.context_menu)
+
+    def set_aliases(self, event):
+        track_obj = self.track_store.get_track(self.selected_track)
+        default_aliases = ' '.join(track_obj.aliases)
+        dialog = wx.TextEntryDialog(parent=self, message="Enter aliases separated by spaces.",
+                                    caption="pyjam", value=default_aliases)
+        dialog.Center()
+        if dialog.ShowModal() != wx.ID_OK:
+            dialog.Destroy()
+            return
+
+        new_aliases = dialog.GetValue()
+        dialog.Destroy()
+        filtered_aliases = filter_alias(new_aliases).split()
+        self.write_track_data("aliases", filtered_aliases)
+
+    def clear_aliases(self, event):
+        self.write_track_data("aliases", None, self.track_list.GetSelectedObjects())
+
+    def set_bind(self, event):
+        dialog = wx.Dialog(parent=self, title="pyjam")
+
+        bind_text = wx.StaticText(parent=dialog, label="Key:")
+        bind_choice = wx.ComboBox(parent=dialog, choices=SOURCE_KEYS, style=wx.CB_READONLY)
+
+        top_sizer = wx.BoxSizer(wx.VERTICAL)
+        key_sizer = wx.BoxSizer(wx.HORIZONTAL)
+        button_sizer = dialog.CreateButtonSizer(wx.OK | wx.CANCEL)
+
+        key_sizer.Add(bind_text, 0, wx.ALL | wx.ALIGN_CENTER_VERTICAL, 5)
+        key_sizer.Add(bind_choice, 0, wx.ALL | wx.ALIGN_LEFT, 5)
+        top_sizer.Add(key_sizer)
+        top_sizer.Add(button_sizer, 0, wx.ALL | wx.ALIGN_CENTER, 5)
+
+        bind_choice.Bind(wx.EVT_KEY_DOWN, handler=key_choice_override)
+
+        dialog.SetSizerAndFit(top_sizer)
+        dialog.Center()
+        if dialog.ShowModal() == wx.ID_OK:
+            self.write_track_data('bind', bind_choice.GetStringSelection())
+        dialog.Destroy()
+
+    def clear_bind(self, event):
+        self.write_track_data("bind", None, self.track_list.GetSelectedObjects())
+
+    def clear_all(self, event):
+        self.update_tracks(self.track_data.clear())
+
+    def write_track_data(self, key, data, tracks=None):
+        # type (str, object, list) -> None
+        if not tracks:
+            tracks = [self.track_store.get_track(self.selected_track)]
+        with self.track_data.batch() as changed:
+            for track in tracks:
+                self.track_data.set(track.name, key, data)
+        self.update_tracks(changed)
+
+    def update_tracks(self, names):
+        # Only the tracks whose data changed are touched, there's no need to rescan the whole library.
+        positions = apply_track_data(self.track_store.get_tracks(), self.track_data.get_data(), names)
+        self.track_store.update_tracks(positions)
+
+    def trim_file(self, event):
+        # This will eventually be moved to the FFmpeg module
+        if not ffmpeg.find():
+            alert = wx.MessageDialog(parent=self, caption="pyjam",
+                                     message="You require FFmpeg or avconv to trim audio. Please install it.")
+            alert.ShowModal()
+            alert.Destroy()
+            return
+        if not waveform:
+            msg = ("There was an error loading the pyjam waveform viewer. It is required for audio trimming.\n"
+                   "It requires the numpy module installed, please make sure you have it.\nA version not requiring"
+                   "the waveform viewer will be added later (it will have no graphical hints, however).")
+            alert = wx.MessageDialog(parent=self, message=msg, caption="pyjam")
+            alert.ShowModal()
+            alert.Destroy()
+            return
+
+        track = self.track_store.get_track(self.selected_track)
+        wave_dialog = waveform.WaveformPlot(self, file=track.path)
+        if wave_dialog.ShowModal() != wx.ID_OK:
+            wave_dialog.Destroy()
+            return
+        values = wave_dialog.get_values()
+        wave_dialog.Destroy()
+
+        # a random dialog to show that pyjam is currently busy.
+        random_dialog = wx.Dialog(parent=self, title="pyjam: Working....")
+        random_dialog.Show()
+
+        path = os.path.splitext(track.path)
+        dest = path[0] + '.trim.wav'
+
+        p = ffmpeg.trim_audio(track.path, dest, *values)
+        output = p.communicate()
+        logger.info(output[0].decode())
+        if p.returncode:
+            logger.critical("FFmpeg trimmer: Couldn't trimmer {track}".format(track=track.path))
+            logger.critical("FFmpeg trimmer: Error output log\n" + output[1].decode())
+            return
+
+        ffmpeg.strip_encoder(dest)  # FFmpeg loves to add useless crap to our wav files.
+        os.replace(dest, track.path)
+        random_dialog.Destroy()
+
+    def find_duplicates(self, event):
+        with wx.BusyCursor():
+            duplicates = find_duplicates(self.track_store.get_tracks(), index_file=self.config.get_index_file())
+
+        if not duplicates:
+            message = "No duplicate tracks found."
+        else:
+            message = "These tracks have identical audio:\n\n" + '\n\n'.join(
+                '\n'.join("{index}. {name} ({path})".format(index=track.index, name=track.name, path=track.path)
+                          for track in group) for group in duplicates
+            )
+        dialog = wx.MessageDialog(parent=self, message=message, caption="pyjam Duplicate Finder")
+        dialog.ShowModal()
+        dialog.Destroy()
+
+    def show_stats(self, event):
+        if not self.game_watcher:
+            message = "Start pyjam to collect latency stats."
+        else:
+            message = "Latency of the in-game relay loop (ms):\n\n" + '\n'.join(self.game_watcher.stats_summary())
+        dialog = wx.MessageDialog(parent=self, message=message, caption="pyjam Latency Stats")
+        dialog.ShowModal()
+        dialog.Destroy()
+
+    def settings(self, event):
+        SetupDialog(self)
+        self.games = self.config.get_games()
+        self.profile.Set([game.name for game in self.games])
+        self.profile.SetSelection(0)
+        self.game_select(event=None)
+
+    def on_size(self, event):
+        if self.GetAutoLayout():
+            self.Layout()
+        event.Skip()
+
+    def on_exit(self, event):
+        if self.game_watcher:
+            self.game_watcher.stop()
+        event.Skip()
+
+
+class SetupDialog(wx.Dialog):
+    def __init__(self, parent):
+        super(SetupDialog, self).__init__(parent, title="pyjam Setup", style=wx.DEFAULT_DIALOG_STYLE | wx.RESIZE_BORDER)
+        self.config = parent.config
+
+        self.steam_path = wx.DirPickerCtrl(self, name="Path to Steam")
+        self.steam_path.SetInitialDirectory(get_steam_path())
+        steam_path_text = wx.StaticText(self, label="Path to Steam (e.g. C:\\Program Files (x86)\\Steam)")
+
+        self.games = self.config.get_games()
+        self.profile = wx.ComboBox(self, choices=[game.name for game in self.games], style=wx.CB_READONLY)
+        self.profile.SetSelection(0)
+        self.game = self.games[self.profile.GetSelection()]
+
+        separator = wx.StaticLine(self, style=wx.LI_HORIZONTAL, size=(self.GetSize()[0], 1))
+
+        self.prof_name = wx.TextCtrl(self)
+        prof_name_text = wx.StaticText(self, label="Profile/game name")
+
+        self.game_path = wx.DirPickerCtrl(self, message="Path to game")
+        self.game_path.SetInitialDirectory(get_steam_path())
+        self.game_path.SetToolTip("The folder the game is located in. Include the mod folder. For example, "
+                                  "/Steam/steamapps/common/Counter-Strike: Global Offensive/csgo")
+        game_path_text = wx.StaticText(self, label="Game folder (include mod folder, e.g. games\\Team Fortress 2\\tf2)")
+
+        self.audio_path = wx.DirPickerCtrl(self, message="Path to audio")
+        self.audio_path.SetInitialDirectory(os.getcwd())
+        self.audio_path.SetToolTip("The folder pyjam will load audio from.")
+        audio_path_text = wx.StaticText(self, label="Audio folder for this game")
+
+        self.game_rate = intctrl.IntCtrl(self)
+        self.game_rate.SetToolTip("The sample rate mic audio is played at. Most games have this at 11025. "
+                                  "Games like CS:GO or Dota 2, however, use 22050."
+                                  "If audio sounds too slow or too fast, chances are you need to switch these values.")
+        game_rate_text = wx.StaticText(self, label="Audio rate (usually 11025 or 22050)")
+
+        self.relay_choice = wx.ComboBox(self, choices=SOURCE_KEYS, style=wx.CB_READONLY)
+        self.relay_choice.SetToolTip("The relay key is how pyjam will interact with the game. You only need "
+                                     "to change this if you have an overlapping bind.")
+        relay_text = wx.StaticText(self, label="Relay key (default is fine for most cases, ignore)")
+
+        self.play_choice = wx.ComboBox(self, choices=SOURCE_KEYS, style=wx.CB_READONLY)
+        self.play_choice.SetToolTip("The key you will use to start/stop music.")
+        play_text = wx.StaticText(self, label="Play audio key")
+
+        self.aliases_box = wx.CheckBox(self, label="Enable aliases")
+        self.aliases_box.SetToolTip("Whether or not to enable the usage of selecting songs with aliases (words) "
+                                    "instead of indexes (numbers)")
+
+        save_button = wx.Button(self, wx.ID_SAVE, label="Save Game")
+        new_button = wx.Button(self, wx.ID_NEW, label="New Game")
+        remove_button = wx.Button(self, wx.ID_REMOVE, label="Remove Game")
+
+        # Sizer stuff
+        top_sizer = wx.BoxSizer(wx.VERTICAL)
+        profile_sizer = wx.BoxSizer(wx.VERTICAL)
+        button_sizer = wx.BoxSizer(wx.HORIZONTAL)
+
+        top_sizer.Add(profile_sizer, 1, wx.ALL | wx.EXPAND | wx.ALIGN_TOP, 5)
+        top_sizer.Add(button_sizer, 0, wx.ALL | wx.ALIGN_CENTER_HORIZONTAL, 5)
+        profile_sizer.Add(steam_path_text, 0, wx.ALL ^ wx.LEFT | wx.ALIGN_LEFT, 3)
+        profile_sizer.Add(self.steam_path, 0, wx.ALL ^ wx.LEFT ^ wx.TOP | wx.ALIGN_LEFT | wx.EXPAND, 5)
+        profile_sizer.Add(self.profile, 0, wx.ALL ^ wx.LEFT | wx.ALIGN_LEFT, 5)
+        profile_sizer.Add(separator, 0, wx.TOP | wx.BOTTOM | wx.ALIGN_LEFT, 3)
+        profile_sizer.Add(prof_name_text, 0, wx.ALL ^ wx.BOTTOM ^ wx.LEFT | wx.ALIGN_LEFT, 3)
+        profile_sizer.Add(self.prof_name, 0, wx.ALL ^ wx.LEFT | wx.ALIGN_LEFT | wx.EXPAND, 5)
+        profile_sizer.Add(game_path_text, 0, wx.ALL ^ wx.LEFT | wx.ALIGN_LEFT, 3)
+        profile_sizer.Add(self.game_path, 0, wx.ALL ^ wx.LEFT ^ wx.TOP | wx.ALIGN_LEFT | wx.EXPAND, 5)
+        profile_sizer.Add(audio_path_text, 0, wx.ALL ^ wx.LEFT | wx.ALIGN_LEFT, 3)
+        profile_sizer.Add(self.audio_path, 0, wx.ALL ^ wx.LEFT ^ wx.TOP | wx.ALIGN_LEFT | wx.EXPAND, 5)
+        profile_sizer.Add(game_rate_text, 0, wx.ALL ^ wx.BOTTOM ^ wx.LEFT | wx.ALIGN_LEFT, 3)
+        profile_sizer.Add(self.game_rate, 0, wx.ALL ^ wx.LEFT | wx.ALIGN_LEFT, 5)
+        profile_sizer.Add(relay_text, 0, wx.ALL ^ wx.BOTTOM ^ wx.LEFT | wx.ALIGN_LEFT, 3)
+        profile_sizer.Add(self.relay_choice, 0, wx.ALL ^ wx.LEFT | wx.ALIGN_LEFT, 5)
+        profile_sizer.Add(play_text, 0, wx.ALL ^ wx.BOTTOM ^ wx.LEFT | wx.ALIGN_LEFT, 3)
+        profile_sizer.Add(self.play_choice, 0, wx.ALL ^ wx.LEFT | wx.ALIGN_LEFT, 5)
+        profile_sizer.Add(self.aliases_box, 0, wx.ALL ^ wx.LEFT | wx.ALIGN_LEFT, 7)
+        button_sizer.Add(save_button, 0, wx.ALL | wx.ALIGN_CENTER_VERTICAL, 5)
+        button_sizer.Add(new_button, 0, wx.ALL | wx.ALIGN_CENTER_VERTICAL, 5)
+        button_sizer.Add(remove_button, 0, wx.ALL | wx.ALIGN_CENTER_VERTICAL, 5)
+
+        # self.Bind doesn't seem to work for wx.EVT_KEY_DOWN or wx.EVT_CHAR. Very likely intentional.
+        # http://wiki.wxpython.org/self.Bind%20vs.%20self.button.Bind.
+        self.relay_choice.Bind(wx.EVT_KEY_DOWN, handler=key_choice_override, source=self.relay_choice)
+        self.play_choice.Bind(wx.EVT_KEY_DOWN, handler=key_choice_override, source=self.play_choice)
+        self.Bind(wx.EVT_COMBOBOX, handler=self.update_profile, source=self.profile)
+        self.Bind(wx.EVT_BUTTON, handler=self.save, id=wx.ID_SAVE)
+        self.Bind(wx.EVT_BUTTON, handler=self.new, id=wx.ID_NEW)
+        self.Bind(wx.EVT_BUTTON, handler=self.remove, id=wx.ID_REMOVE)
+
+        self.SetSizerAndFit(top_sizer)
+        self.update_profile(event=None)
+        self.Center()
+        self.ShowModal()
+
+    def update_profile(self, event):
+        self.games = self.config.get_games()
+        self.game = self.games[self.profile.GetSelection()]
+        try:
+            self.steam_path.SetPath(self.config.steam_path)
+            self.prof_name.SetValue(self.game.name)
+            self.game_path.SetPath(self.game.mod_path)
+            self.audio_path.SetPath(self.game.audio_dir)
+            self.audio_path.SetInitialDirectory(os.path.abspath(self.game.audio_dir))
+            self.game_rate.SetValue(self.game.audio_rate)
+            self.relay_choice.SetStringSelection(self.game.relay_key)
+            self.play_choice.SetStringSelection(self.game.play_key)
+            self.aliases_box.SetValue(self.game.use_aliases)
+        except (IndexError, NameError, TypeError):
+            self.prof_name.Clear()
+            self.game_path.SetPath("")
+            self.audio_path.SetPath("")
+            self.game_rate.Clear()
+            self.relay_choice.Clear()
+            self.play_choice.Clear()
+
+    def new(self, event):
+        # type: (int) -> None
+        new_profile = wx.TextEntryDialog(parent=self, message="Enter the name of your new game.", caption="pyjam")
+        if new_profile.ShowModal() != wx.ID_OK:
+            new_profile.Destroy()
+            return
+
+        name = new_profile.GetValue()
+        new_profile.Destroy()
+
+        self.profile.Append(name)
+        self.games.append(Game(name=name))
+        self.config.set_games(self.games)
+        self.config.save()
+
+        self.profile.SetSelection(self.profile.GetCount() - 1)
+        self.update_profile(event=None)
+        logger.info("New game created: {name}".format(name=name))
+
+    def save(self, event):
+        # type: (int) -> None
+        self.config.steam_path = self.steam_path.GetPath()
+        self.profile.SetString(self.profile.GetSelection(), self.prof_name.GetValue())
+        self.game.name = self.prof_name.GetValue()
+        self.game.mod_path = self.game_path.GetPath()
+        self.game.audio_dir = self.audio_path.GetPath()
+        self.game.audio_rate = self.game_rate.GetValue()
+        self.game.relay_key = self.relay_choice.GetStringSelection()
+        self.game.play_key = self.play_choice.GetStringSelection()
+        self.game.use_aliases = self.aliases_box.IsChecked()
+        self.config.set_games(self.games)
+        self.config.save()
+        self.update_profile(event=None)
+        if not os.path.exists(self.audio_path.GetPath()):
+            os.makedirs(self.audio_path.GetPath())
+
+    def remove(self, event):
+        if len(self.games) <= 1:
+            message = wx.MessageDialog(parent=self, message="You can't remove your only game!",
+                                       style=wx.OK | wx.ICON_EXCLAMATION)
+            message.ShowModal()
+            message.Destroy()
+            return False
+
+        name = self.game.name
+        self.games.pop(self.profile.GetSelection())
+        self.config.set_games(self.games)
+        self.config.save()
+        self.games = self.config.get_games()
+
+        self.profile.Set([game.name for game in self.games])
+        self.profile.SetSelection(0)
+        self.update_profile(event=None)
+
+        logger.info("Game removed: {name}".format(name=name))
+
+
+def key_choice_override(event):
+    code = event.GetKeyCode()
+    # wx key codes for special keys (F1, arrows, numpad...) need to be converted.
+    converted = WX_KEYS_CONVERSION.get(code)
+    if converted:
+        event.GetEventObject().SetStringSelection(converted)
+        return True
+    # Otherwise it's a character, which might already be a compatible key.
+    elif bindable(code):
+        event.GetEventObject().SetStringSelection(chr(code))
+        return True
+    # Otherwise, it's not compatible and can't be converted.
+    return False
+
+
+def error_dialog(message, source=None):
+    """Show an error message in a dialog. Used as the error hook for jam.common.report_error.
+
+    Args:
+        message (str): The error message.
+        source (object or None): The object that caused the error, used to find the dialog's parent.
+
+    Returns:
+        None
+    """
+    if not wx.IsMainThread():
+        wx.CallAfter(error_dialog, message, source)
+        return
+
+    if isinstance(source, wx.TopLevelWindow):
+        parent = source
+    elif hasattr(source, "parent") and isinstance(source.parent, wx.TopLevelWindow):
+        parent = source.parent
+    else:
+        parent = wx.GetApp().GetTopWindow()
+    dialog = wx.MessageDialog(parent=parent, message=message, caption="Error!", style=wx.OK | wx.ICON_ERROR)
+    dialog.RequestUserAttention()
+    dialog.ShowModal()
+    dialog.Destroy()
+
+
+def exception_hook(error, value, trace):
+    error_message = ''.join(traceback.format_exception(error, value, trace))
+    logger.critical(error_message)
+    dialog = wx.MessageDialog(parent=None,
+                              message="An error has occured!\n\n" + error_message,
+                              caption="Error!", style=wx.OK | wx.CANCEL | wx.ICON_ERROR)
+    dialog.SetOKCancelLabels("Ignore", "Quit")
+    dialog.RequestUserAttention()
+    if dialog.ShowModal() == wx.ID_OK:
+        dialog.Destroy()
+    else:
+        dialog.Destroy()
+        sys.exit(1)
+
+
+def main(config):
+    """Run the GUI until the main window is closed.
+
+    Args:
+        config (jam.config.Config): The pyjam config.
+
+    Returns:
+        None
+    """
+    wx_app = wx.App()
+    set_call_after(wx.CallAfter)
+    set_error_hook(error_dialog)
+    sys.excepthook = exception_hook
+    MainFrame(config)
+    wx_app.MainLoop()
@@ -0,0 +1,65 @@
+# Copyright (C) 10se1ucgo 2016
+#
+# This file is part of pyjam.
+#
+# pyjam is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# pyjam is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with pyjam.  If not, see <http://www.gnu.org/licenses/>.
+# Runs pyjam without a GUI, for servers, streaming boxes and scripting. Nothing in here may import wx.
+import logging
+import signal
+import threading
+
+from .jam import Jam, get_tracks
+from .store import TrackStore
+
+__all__ = ['run']
+logger = logging.getLogger(__name__)
+
+
+def run(config, profile_name):
+    """Run pyjam for a single game until it is interrupted (Ctrl+C or SIGTERM).
+
+    Args:
+        config (jam.config.Config): The pyjam config.
+        profile_name (str): The name of the game profile to run (case insensitive).
+
+    Returns:
+        int: The exit code. 0 on a clean shutdown, 1 if the profile doesn't exist.
+    """
+    game = config.get_game(profile_name)
+    if game is None:
+        logger.error("No game profile named {name!r}. Available profiles: {names}".format(
+            name=profile_name, names=', '.join(game.name for game in config.get_games())
+        ))
+        return 1
+
+    index_file = config.get_index_file()
+    track_store = TrackStore(get_tracks(game.get_audio_dirs(), audio_rate=game.audio_rate, index_file=index_file))
+    logger.info("Loaded {num} tracks for {name}".format(num=len(track_store), name=game.name))
+
+    stopped = threading.Event()
+    # Signal handlers have to be installed from the main thread. On Python 2, wait() without a timeout can't be
+    # interrupted by a signal, hence the polling below.
+    signal.signal(signal.SIGINT, lambda signum, frame: stopped.set())
+    signal.signal(signal.SIGTERM, lambda signum, frame: stopped.set())
+
+    game_watcher = Jam(config.steam_path, game, track_store, index_file)
+    game_watcher.start()
+    logger.info("Running. Press Ctrl+C to stop.")
+    try:
+        while not stopped.wait(1):
+            pass
+    finally:
+        logger.info("Stopping...")
+        game_watcher.stop()
+    return 0
@@ -0,0 +1,224 @@
+# Copyright (C) 10se1ucgo 2016
+#
+# This file is part of pyjam.
+#
+# pyjam is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# pyjam is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with pyjam.  If not, see <http://www.gnu.org/licenses/>.
+
+# A persistent cache of everything pyjam derives from a track file, so a rescan only has to look at files
+# that were added, removed or changed since the last one.
+import collections
+import logging
+import os
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import unidecode
+
+from .common import get_path, filter_alias
+from .riff import RiffError, read_wav_info
+
+__all__ = ['INDEX_FILE', 'PROBE_WORKERS', 'IndexEntry', 'TrackIndex']
+logger = logging.getLogger(__name__)
+INDEX_FILE = 'track_index.db'
+PROBE_WORKERS = 8
+
+# format_tag, channels, rate, bits and duration are None if the file's header couldn't be read.
+# data_hash is only filled in once something asks for it (see TrackIndex.set_hashes).
+IndexEntry = collections.namedtuple('IndexEntry', ['path', 'mtime', 'size', 'name', 'words', 'format_tag',
+                                                   'channels', 'rate', 'bits', 'duration', 'data_hash'])
+COLUMNS = ', '.join(IndexEntry._fields)
+
+
+class TrackIndex(object):
+    """
+    An SQLite backed index of track files, keyed by path, modification time and size.
+    """
+    SCHEMA_VERSION = 3
+
+    def __init__(self, index_file=INDEX_FILE):
+        """
+        Args:
+            index_file (str): Path to the index database. Use ':memory:' for a throwaway index.
+        """
+        self.index_file = index_file
+        self._lock = threading.Lock()
+        try:
+            self._db = self._connect(index_file)
+        except sqlite3.Error:
+            logger.exception("Could not open track index {file}, using a temporary one.".format(file=index_file))
+            self._db = self._connect(':memory:')
+
+    def _connect(self, index_file):
+        # The index is shared between the GUI thread and the observer threads, hence check_same_thread.
+        db = sqlite3.connect(index_file, check_same_thread=False)
+        if db.execute('PRAGMA user_version').fetchone()[0] != self.SCHEMA_VERSION:
+            logger.info("Track index schema changed, rebuilding {file}".format(file=index_file))
+            db.execute('DROP TABLE IF EXISTS tracks')
+            db.execute('PRAGMA user_version = {v}'.format(v=self.SCHEMA_VERSION))
+        db.execute('CREATE TABLE IF NOT EXISTS tracks (path TEXT PRIMARY KEY, root TEXT NOT NULL, mtime REAL, '
+                   'size INTEGER, name TEXT, words TEXT, format_tag INTEGER, channels INTEGER, rate INTEGER, '
+                   'bits INTEGER, duration REAL, data_hash TEXT)')
+        db.execute('CREATE INDEX IF NOT EXISTS tracks_root ON tracks (root)')
+        db.commit()
+        return db
+
+    def update(self, root, files):
+        """Bring the index for a folder up to date and return its entries.
+        Only files whose mtime or size differ from the index are (re)processed, and entries for files that no longer
+        exist in `root` are dropped. New and changed files have their headers read in parallel.
+
+        Args:
+            root (str): The audio folder that was scanned.
+            files (list[tuple[str, float, int]]): (path, mtime, size) for every track file currently in `root`.
+
+        Returns:
+            list[IndexEntry]: An entry for every file, in the same order as `files`.
+        """
+        root = get_path(root)
+        with self._lock:
+            known = {row[0]: IndexEntry(*row) for row in self._db.execute(
+                'SELECT {columns} FROM tracks WHERE root = ?'.format(columns=COLUMNS), (root,)
+            )}
+
+            entries = []
+            stale = []
+            for position, (path, mtime, size) in enumerate(files):
+                entry = known.pop(path, None)
+                if entry is None or entry.mtime != mtime or entry.size != size:
+                    stale.append((position, (path, mtime, size)))
+                entries.append(entry)
+
+            changed = []
+            if stale:
+                with ThreadPoolExecutor(max_workers=PROBE_WORKERS) as pool:
+                    changed = list(pool.map(lambda args: self.make_entry(*args), (file for _, file in stale)))
+                for (position, _), entry in zip(stale, changed):
+                    entries[position] = entry
+
+            with self._db:
+                self._store(root, changed, known)
+
+        logger.info("Track index for {root}: {total} files, {changed} changed, {removed} removed".format(
+            root=root, total=len(entries), changed=len(changed), removed=len(known)
+        ))
+        return entries
+
+    def update_files(self, root, files, removed=()):
+        """Update the index for individual files without looking at the rest of the folder.
+
+        Args:
+            root (str): The audio folder the files are in.
+            files (list[tuple[str, float, int]]): (path, mtime, size) of every file that was added or changed.
+            removed (iterable[str]): Paths of files that no longer exist.
+
+        Returns:
+            list[IndexEntry]: An entry for every file in `files`, in the same order.
+        """
+        root = get_path(root)
+        with ThreadPoolExecutor(max_workers=PROBE_WORKERS) as pool:
+            changed = list(pool.map(lambda args: self.make_entry(*args), files))
+        with self._lock, self._db:
+            self._store(root, changed, removed)
+        return changed
+
+    def get_entries(self, paths):
+        """Get the index entries for a list of files.
+
+        Args:
+            paths (list[str]): Paths of the files.
+
+        Returns:
+            list[IndexEntry]: The entries, in the same order as `paths`. Files that aren't indexed are left out.
+        """
+        known = {}
+        with self._lock:
+            # SQLite limits the amount of parameters in a single query.
+            for start in range(0, len(paths), 500):
+                chunk = paths[start:start + 500]
+                known.update((row[0], IndexEntry(*row)) for row in self._db.execute(
+                    'SELECT {columns} FROM tracks WHERE path IN ({params})'.format(
+                        columns=COLUMNS, params=', '.join('?' * len(chunk))
+                    ), chunk
+                ))
+        return [known[path] for path in paths if path in known]
+
+    def set_hashes(self, hashes):
+        """Cache the audio data hashes of indexed files.
+        The hashes are dropped automatically when a file changes.
+
+        Args:
+            hashes (dict[str, str]): Paths mapped to the hash of their audio data.
+
+        Returns:
+            None
+        """
+        with self._lock, self._db:
+            self._db.executemany('UPDATE tracks SET data_hash = ? WHERE path = ?',
+                                 ((data_hash, path) for path, data_hash in hashes.items()))
+
+    def _store(self, root, entries, removed):
+        # Must be called with the lock held, inside a transaction.
+        self._db.executemany('INSERT OR REPLACE INTO tracks (root, {columns}) VALUES (?, {params})'.format(
+            columns=COLUMNS, params=', '.join('?' * len(IndexEntry._fields))
+        ), ((root,) + tuple(entry) for entry in entries))
+        self._db.executemany('DELETE FROM tracks WHERE path = ?', ((path,) for path in removed))
+
+    @staticmethod
+    def make_entry(path, mtime, size):
+        """Derive the index entry for a single track file.
+
+        Args:
+            path (str): Path to the file.
+            mtime (float): The file's modification time.
+            size (int): The file's size in bytes.
+
+        Returns:
+            IndexEntry: The new entry.
+        """
+        name = unidecode.unidecode(os.path.splitext(os.path.basename(path))[0])  # Name of file minus path/extension
+        try:
+            info = read_wav_info(path)
+        except (RiffError, OSError, IOError) as e:
+            logger.warning("Could not read the WAV header of {path}: {error}".format(path=path, error=e))
+            return IndexEntry(path, mtime, size, name, filter_alias(name), None, None, None, None, None, None)
+        return IndexEntry(path, mtime, size, name, filter_alias(name), info.format_tag, info.channels, info.rate,
+                          info.bits, info.duration, None)
+
+    def clear(self):
+        """Remove every entry from the index.
+
+        Returns:
+            None
+        """
+        with self._lock, self._db:
+            self._db.execute('DELETE FROM tracks')
+
+    def close(self):
+        """Close the underlying database.
+
+        Returns:
+            None
+        """
+        with self._lock:
+            self._db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def __repr__(self):
+        return "{c}(file={file})".format(c=self.__class__, file=self.index_file)
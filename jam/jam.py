@@ -14,23 +14,42 @@
 #
 # You should have received a copy of the GNU General Public License
 # along with pyjam.  If not, see <http://www.gnu.org/licenses/>.
+import collections
 import os
 import shutil
 import glob
 import json
 import logging
-from string import whitespace
+import re
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
 
 import unidecode
 from watchdog.observers import Observer
 from watchdog.events import FileSystemEventHandler
 
-from . import ffmpeg
-from .about import __version__
+from . import ffmpeg, renderer, steam
 from .common import *
+from .cache import CACHE_DIR, ConversionCache
+from .dispatch import CommandDispatcher
+from .aliases import AliasRegistry
+from .index import INDEX_FILE, TrackIndex
+from .poller import OBSERVERS, StatPoller
+from .prefetch import PlayHistory, Prefetcher
+from .riff import WAVE_FORMAT_PCM, RiffError, hash_wav_data
+from .scanner import scan_roots
+from .search import search_text
+from .stats import LatencyStats, timer
+from .status import StatusWriter
 
-__all__ = ['Jam', 'JamObserver', 'JamHandler', 'write_configs', 'get_tracks', 'filter_alias']
+__all__ = ['Jam', 'JamObserver', 'JamHandler', 'AudioDirHandler', 'write_configs', 'write_track_configs', 'get_tracks',
+           'read_track_data', 'build_tracks', 'assign_aliases', 'assign_binds', 'apply_track_data', 'check_track',
+           'find_duplicates', 'filter_alias', 'relay_pattern', 'find_relay_binds']
 logger = logging.getLogger(__name__)
+_RELAY_PATTERNS = {}
+NO_DOWNLOADER = ["There was an error processing your request.", "The youtube-dl module is likely not installed.",
+                 "It is required for usage."]
 
 
 try:
@@ -49,31 +68,69 @@ class Jam(object):
     """
     The actual worker that does the playing of music.
     """
-    def __init__(self, steam_path, game_class, track_list):
+    def __init__(self, steam_path, game_class, track_store, index_file=INDEX_FILE):
         """
         Args:
             steam_path (str): Path to Steam.
             game_class (Game): The game class for the running game.
-            track_list (ObjectListView[Track]): The ObjectListView that contains all of the Tracks.
+            track_store (TrackStore): The store that contains all of the Tracks. It is updated from the observer thread
+                whenever the audio folders change.
+            index_file (str): Path to the track index database (see Config.get_index_file).
         """
         self.steam_path = steam_path
         self.game = game_class
-        self.track_list = track_list
+        self.track_store = track_store
+        self.index_file = index_file
+        self.conversions = ffmpeg.ConversionQueue()
+        self.conversion_cache = ConversionCache(os.path.abspath(CACHE_DIR), self.game.convert_cache_size * 1024 * 1024)
         self.user_data = get_path(self.steam_path, 'userdata')
         self.voice = get_path(self.game.mod_path, get_path(os.path.pardir, 'voice_input.wav'))
         self.observer = JamObserver()
-        self.event_handler = JamHandler(self, 'jam_cmd.cfg')
+        self.poller = None
+        self.event_handler = JamHandler(self, 'jam_cmd.cfg', self.game.event_window)
+        self.audio_handlers = [AudioDirHandler(self, root) for root in self.game.get_audio_dirs()]
         self.total_downloads = 0
+        self.download_thread = None
         self.previous_bind = None
+        self.dispatcher = CommandDispatcher()
+        self.status = StatusWriter(get_path(self.game.mod_path, 'cfg/jam_stdin.cfg'))
+        self.stats = LatencyStats()
+        self.history = PlayHistory(self.game.audio_dir)
+        self.prefetcher = Prefetcher(self.track_store, self.history, self.game.prefetch_budget * 1024 * 1024)
+        self._track_data = None  # (stat of track_data.json, its contents)
+        self._alias_words = {}  # path -> filtered name, see filter_alias
 
     def start(self):
         """Start the observer and event handler + write the configs.
         Returns:
             None
         """
-        self.observer.schedule(self.event_handler, self.user_data, recursive=True)
+        # Watching all of userdata means a watch for every folder of every account and game, so narrow it down to
+        # the folder jam_cmd.cfg actually ends up in whenever possible.
+        if self.game.observer not in OBSERVERS:
+            logger.warning("Unknown observer {observer!r} for {game} (expected {observers}), using 'native'".format(
+                observer=self.game.observer, game=self.game.name, observers=', '.join(OBSERVERS)
+            ))
+        if self.game.observer == 'polling':
+            pattern = steam.get_watch_pattern(self.steam_path, self.game.mod_path, 'jam_cmd.cfg')
+            logger.info("Polling {pattern}".format(pattern=pattern))
+            self.poller = StatPoller(self.event_handler, pattern)
+            self.poller.start()
+        else:
+            watch_dir, recursive = steam.get_watch_dir(self.steam_path, self.game.mod_path)
+            logger.info("Watching {path} for jam_cmd.cfg{recursive}".format(
+                path=watch_dir, recursive=" (recursively)" if recursive else ''
+            ))
+            self.observer.schedule(self.event_handler, watch_dir, recursive=recursive)
+        for handler in self.audio_handlers:
+            if os.path.isdir(handler.root):
+                self.observer.schedule(handler, handler.root, recursive=True)
         self.observer.start()
-        write_configs(self.game.mod_path, self.track_list.GetObjects(), self.game.play_key,
+        self.conversions.start()
+        self.prefetcher.start()
+        self.prefetcher.request()
+        self.track_store.add_update_listener(self.on_tracks_updated)
+        write_configs(self.game.mod_path, self.track_store.get_tracks(), self.game.play_key,
                       self.game.relay_key, self.game.use_aliases)
 
         with open(get_path(self.game.mod_path, 'cfg/autoexec.cfg'), 'a') as cfg:
@@ -84,9 +141,23 @@ class Jam(object):
         Returns:
             None
         """
+        self.track_store.remove_update_listener(self.on_tracks_updated)
         self.observer.stop()
         self.observer.join()
+        if self.poller:
+            self.poller.abort()
+        self.event_handler.cancel()
+        for handler in self.audio_handlers:
+            handler.cancel()
+        self.conversions.abort()
+        self.dispatcher.shutdown()
+        self.status.close()
+        if self.download_thread:
+            self.download_thread.abort()
+        self.prefetcher.abort()
+        self.history.save()
         logger.info("Stopping...")
+        logger.info("Relay loop latency (ms):\n" + '\n'.join(self.stats_summary()))
         try:
             os.remove(get_path(self.game.mod_path, 'cfg/jam.cfg'))
             os.remove(get_path(self.game.mod_path, 'cfg/jam_la.cfg'))
@@ -94,6 +165,7 @@ class Jam(object):
             os.remove(get_path(self.game.mod_path, 'cfg/jam_saycurtrack.cfg'))
             os.remove(get_path(self.game.mod_path, 'cfg/jam_stdin.cfg'))
             os.remove(get_path(self.game.mod_path, 'cfg/jam_help.cfg'))
+            renderer.prune(get_path(self.game.mod_path, 'cfg'))
             os.remove(get_path(self.game.mod_path, self.voice))
             logger.info("Succesfully removed pyjam config files.")
         except (FileNotFoundError, OSError):
@@ -109,37 +181,54 @@ class Jam(object):
 
         logger.info("Removed 'exec jam' from autoexec.")
 
-    def on_event(self, path):
+    def on_event(self, path, received=None):
         """
         Args:
             path (str): The path to the event.
+            received (float or None): When the event came in, see stats.timer. Defaults to now.
 
         Returns:
             None
         """
+        start = received if received is not None else timer()
         logger.info("jam_cmd.cfg change detected, parsing config for song index/command...")
-        with open(get_path(path)) as cfg:
-            for line in cfg:
-                if line[0:4] != 'bind':
-                    continue
-                line = line.replace('"', '').split()
-                if line[1] != self.game.relay_key:
-                    continue
+        try:
+            # Leave out the time spent waiting for the rest of the burst, that's part of the total.
+            self.stats.record('notify', max(time.time() - os.path.getmtime(path) - (timer() - start), 0.0))
+        except OSError:
+            pass
 
-                try:
-                    bind = line[2:]
-                except IndexError:
-                    logger.exception("Relay key bind had no argument.")
-                    continue
+        with self.stats.span('parse'):
+            bind = self.read_relay_bind(path)
+        if bind is None:
+            return
 
-                if bind == self.previous_bind:
-                    continue
-                self.previous_bind = bind
+        if bind[0].isdigit():
+            self.load_song(int(bind[0]))
+        else:
+            with self.stats.span('command'):
+                self.read_command(bind)
+        self.stats.record('total', timer() - start)
 
-                if bind[0].isdigit():
-                    return self.load_song(int(bind[0]))
-                else:
-                    return self.read_command(bind)
+    def read_relay_bind(self, path):
+        """Find what the relay key is bound to in jam_cmd.cfg.
+
+        Args:
+            path (str): The path to jam_cmd.cfg.
+
+        Returns:
+            list[str] or None: The bind, split into words. None if there is none, or if it didn't change.
+        """
+        # One read and one regex scan. No mmap: on Windows a mapped file can't be truncated, so the game's next
+        # host_writeconfig could fail.
+        with open(get_path(path), 'rb') as cfg:
+            data = cfg.read()
+        for bind in find_relay_binds(data, self.game.relay_key):
+            if bind == self.previous_bind:
+                continue
+            self.previous_bind = bind
+            return bind
+        return None
 
     def read_command(self, bind):
         """Read the relay key for a command to run.
@@ -156,13 +245,58 @@ class Jam(object):
             logger.exception("A command was found, but it lacked any arguments.")
             return
 
-        if bind[0].strip(':').lower() == 'search':
+        command = bind[0].strip(':').lower()
+        if command == 'search':
             logger.info("Search command found, arguments: {args}".format(args=args))
-            self.search(' '.join(args))
-        elif bind[0].strip(':').lower() == 'download':
-            self.download(''.join(args))
-        elif bind[0].strip(':').lower() == 'convert':
-            self.convert(os.path.abspath(''.join(args)))
+            # Only the latest search matters.
+            self.dispatch('search', self.search, ' '.join(args), replace=True)
+        elif command == 'find':
+            logger.info("Find command found, arguments: {args}".format(args=args))
+            self.find(' '.join(args))
+        elif command == 'stats':
+            self.write_stats()
+            # Let the same command run again, the stats will have changed by then.
+            self.previous_bind = None
+        elif command == 'cancel':
+            self.cancel()
+            self.previous_bind = None
+        elif command == 'download':
+            self.dispatch('download', self.download, ''.join(args))
+        elif command == 'convert':
+            self.dispatch('convert', self.convert, os.path.abspath(''.join(args)))
+
+    def dispatch(self, kind, func, *args, **kwargs):
+        """Run a slow command on the dispatcher's workers, so the observer thread is free to load tracks.
+
+        Args:
+            kind (str): The command type, see CommandDispatcher.
+            func (function): The command. It gets the Job as its `job` keyword argument.
+            *args: The arguments for the command.
+            replace (bool): If True, cancel every other command of the same type.
+
+        Returns:
+            None
+        """
+        job = self.dispatcher.submit(kind, lambda job, *args: func(*args, job=job), *args, **kwargs)
+        if job is None:
+            self.status.post("PYJAM", ["Too many {kind} commands are waiting already, try again later.".format(
+                kind=kind
+            )])
+
+    def cancel(self):
+        """Cancel every running or waiting command, and any download in progress.
+
+        Returns:
+            None
+        """
+        cancelled = self.dispatcher.cancel()
+        if self.download_thread:
+            self.download_thread.abort()
+            self.download_thread = None
+            self.total_downloads = 0
+            cancelled += 1
+        logger.info("Cancelled {num} command(s)".format(num=cancelled))
+        self.status.post("PYJAM", ["Cancelled {num} command(s).".format(num=cancelled)])
 
     def load_song(self, index):
         """Load a song with the specified index.
@@ -174,53 +308,126 @@ class Jam(object):
             None
         """
         try:
-            track = self.track_list.GetObjects()[index]
+            track = self.track_store.get_track(index)
         except IndexError:
             logger.debug("Failed to load track with index {index}, out of range.".format(index=index))
             return
 
-        shutil.copy(track.path, self.voice)
-        logger.info("Song loaded: {track}".format(track=repr(track)))
-        with open(get_path(self.game.mod_path, 'cfg/jam_curtrack.cfg'), 'w') as cfg:
-            cfg.write('echo "pyjam :: Song :: {name}"\n'.format(name=track.name))
-        with open(get_path(self.game.mod_path, 'cfg/jam_saycurtrack.cfg'), 'w') as cfg:
-            cfg.write('say "pyjam :: Song :: {name}"\n'.format(name=track.name))
+        if track.problems:
+            logger.warning("Refusing to load {track}: {problems}".format(track=repr(track),
+                                                                        problems=', '.join(track.problems)))
+            with open(get_path(self.game.mod_path, 'cfg/jam_curtrack.cfg'), 'w') as cfg:
+                cfg.write('echo "pyjam :: Can\'t play {name} ({problems}), convert it first"\n'.format(
+                    name=track.name, problems=', '.join(track.problems)
+                ))
+            return
 
-    def search(self, query):
+        with self.stats.span('copy'):
+            try:
+                method = stage_file(track.path, self.voice)
+            except OSError:
+                # Windows won't replace a file that the game has open without sharing it for deletion.
+                logger.debug("Could not replace {voice}, copying over it instead.".format(voice=self.voice),
+                             exc_info=True)
+                try:
+                    os.remove(self.voice)  # Never write into a file that might share its data with a library track.
+                except OSError:
+                    pass
+                shutil.copyfile(track.path, self.voice)
+                method = 'copy over'
+        logger.info("Song loaded ({method}): {track}".format(method=method, track=repr(track)))
+        self.history.record(track.path)
+        self.prefetcher.request(index)
+        with self.stats.span('cfg'):
+            with open(get_path(self.game.mod_path, 'cfg/jam_curtrack.cfg'), 'w') as cfg:
+                cfg.write('echo "pyjam :: Song :: {name}"\n'.format(name=track.name))
+            with open(get_path(self.game.mod_path, 'cfg/jam_saycurtrack.cfg'), 'w') as cfg:
+                cfg.write('say "pyjam :: Song :: {name}"\n'.format(name=track.name))
+
+    def search(self, query, job=None):
         """Perform a YouTube search with a query (in-game).
 
         Args:
             query (str): The query to search for.
+            job (Job or None): The dispatcher job running the search. Nothing is written if it gets cancelled.
 
         Returns:
             None
         """
         if not downloader:
-            with open(get_path(self.game.mod_path, 'cfg/jam_stdin.cfg'), 'w') as cfg:
-                cfg.write('echo "YOUTUBE SEARCH RESULTS"\n')
-                cfg.write('echo "----------------------"\n')
-                cfg.write('echo "There was an error processing your request."\n')
-                cfg.write('echo "The youtube-dl module is likely not installed."\n')
-                cfg.write('echo "It is required for usage."\n')
-                return
+            self.status.post("YOUTUBE SEARCH RESULTS", NO_DOWNLOADER)
+            return
         result = downloader.yt_search(query)
-        with open(get_path(self.game.mod_path, 'cfg/jam_stdin.cfg'), 'w') as cfg:
-            cfg.write('echo "YOUTUBE SEARCH RESULTS"\n')
-            cfg.write('echo "----------------------"\n')
-            if not result:
-                cfg.write('echo "There was an error processing your request. Please try again later"\n')
-                return
-            for item in result:
-                out = unidecode.unidecode("{id}: {title} - {desc}".format(
-                    title=item['title'], id=item['id'], desc=item['desc']
-                ))
-                cfg.write('echo "{out}"\n'.format(out=out))
+        if job and job.is_cancelled():
+            logger.info("Dropping the results of the cancelled search for {query}".format(query=query))
+            return
+        if not result:
+            self.status.post("YOUTUBE SEARCH RESULTS", ["There was an error processing your request. "
+                                                        "Please try again later"])
+            return
+        self.status.post("YOUTUBE SEARCH RESULTS", [unidecode.unidecode("{id}: {title} - {desc}".format(
+            title=item['title'], id=item['id'], desc=item['desc']
+        )) for item in result])
+
+    def stats_summary(self):
+        """Format the latency histogram and event counters for humans.
+
+        Returns:
+            list[str]: The lines.
+        """
+        counters = self.event_handler.get_counters()
+        lines = self.stats.summary() + ["events   {received} received, {dropped} dropped as part of a burst".format(
+            **counters
+        )]
+        if self.poller:
+            lines.append("polling  {files} file(s), {polls} polls, {changes} changes, every {interval:.0f} ms now, "
+                         "{cpu_time:.2f} s CPU ({cpu_percent:.2f}% of a core)".format(
+                             **dict(self.poller.get_stats(), interval=self.poller.interval * 1000)
+                         ))
+        lines.extend("{kind:<8} {running}/{limit} running, {pending} waiting, {completed} done, {failed} failed, "
+                     "{cancelled} cancelled, {rejected} rejected".format(kind=kind, **metrics)
+                     for kind, metrics in self.dispatcher.get_metrics().items())
+        if self.conversion_cache.enabled:
+            cache_stats = self.conversion_cache.get_stats()
+            cache_stats.update(size=cache_stats['size'] / 1024 / 1024, max_size=cache_stats['max_size'] // 1024 // 1024)
+            lines.append("cache    {hits} hit(s), {misses} miss(es), {files} file(s), {size:.1f} of {max_size} MiB"
+                         .format(**cache_stats))
+        return lines
 
-    def download(self, urls):
+    def write_stats(self):
+        """Write the relay latency histogram to jam_stdin.cfg (in-game).
+
+        Returns:
+            None
+        """
+        self.status.post("PYJAM LATENCY (ms)", self.stats_summary())
+
+    def find(self, query):
+        """Search the local track library with a query (in-game).
+
+        Args:
+            query (str): The query to search for.
+
+        Returns:
+            None
+        """
+        results = self.track_store.search(query)
+        num_tracks = len(self.track_store)
+        if not results:
+            self.status.post("LIBRARY SEARCH RESULTS", ["No tracks matching {query}".format(query=search_text(query))])
+            return
+        # With the paged layout, the aliases of the results are only defined once their page is loaded.
+        pages = sorted(set(renderer.page_of(result.position, num_tracks) for result in results) - {None})
+        self.status.post("LIBRARY SEARCH RESULTS", ["{x}. {name}; Aliases: {aliases}".format(
+            x=result.position, name=result.track.name, aliases=result.track.aliases
+        ) for result in results], ['exec "jam_alias_{page}"'.format(page=page) for page in pages])
+
+    def download(self, urls, job=None):
         """Download videos from a list of URLs
 
         Args:
             urls (str): The comma seperated list of URLs to download
+            job (Job or None): The dispatcher job running the command. The download isn't started if it gets cancelled.
 
         Returns:
             None
@@ -228,114 +435,377 @@ class Jam(object):
         if self.total_downloads:
             # A download is already in progress.
             return
-        with open(get_path(self.game.mod_path, 'cfg/jam_stdin.cfg'), 'w') as cfg:
-            if not downloader:
-                # youtube-dl not installed.
-                cfg.write('echo "PYJAM DOWNLOADER"\n')
-                cfg.write('echo "----------------------"\n')
-                cfg.write('echo "There was an error processing your request."\n')
-                cfg.write('echo "The youtube-dl module is likely not installed."\n')
-                cfg.write('echo "It is required for usage."\n')
-                return
-            cfg.write('echo "PYJAM DOWNLOADER"\n')
-            cfg.write('echo "------------------"\n')
-            cfg.write('echo "Extracting URL info, starting download..."\n')
+        if not downloader:
+            self.status.post("PYJAM DOWNLOADER", NO_DOWNLOADER)
+            return
+        self.status.post("PYJAM DOWNLOADER", ["Extracting URL info, starting download..."])
         logger.info("Recieved urls: {urls}".format(urls=urls))
         urls = downloader.yt_extract(urls.split(','))
+        if job and job.is_cancelled():
+            return
         if not urls:
-            with open(get_path(self.game.mod_path, 'cfg/jam_stdin.cfg'), 'w') as cfg:
-                cfg.write('echo "PYJAM DOWNLOADER"\n')
-                cfg.write('echo "------------------"\n')
-                cfg.write('echo "Invalid/unsupported URL(s)!"\n')
+            self.status.post("PYJAM DOWNLOADER", ["Invalid/unsupported URL(s)!"])
             return
         self.total_downloads = len(urls)
-        download_thread = downloader.DownloaderThread(self, urls, os.path.abspath('_ingame_dl'))
-        download_thread.start()
+        self.download_thread = downloader.DownloaderThread(self, urls, os.path.abspath('_ingame_dl'))
+        self.download_thread.start()
         logger.info(urls)
 
     def download_update(self, message):
         progress = "{songs} out of {total}".format(songs=message // 100, total=self.total_downloads)
-        with open(get_path(self.game.mod_path, 'cfg/jam_stdin.cfg'), 'w') as cfg:
-            cfg.write('echo "PYJAM DOWNLOAD PROGRESS"\n')
-            cfg.write('echo "-------------------------"\n')
-            cfg.write('echo "{progress} downloaded so far"\n'.format(progress=progress))
+        self.status.post("PYJAM DOWNLOAD PROGRESS", ["{progress} downloaded so far".format(progress=progress)],
+                         progress=True)
 
     def download_complete(self, errors):
-        with open(get_path(self.game.mod_path, 'cfg/jam_stdin.cfg'), 'w') as cfg:
-            cfg.write('echo "PYJAM DOWNLOAD PROGRESS"\n')
-            cfg.write('echo "-------------------------"\n')
-            cfg.write('echo "Download complete! Downloaded to {folder}"\n'.format(folder=os.path.abspath('_ingame_dl')))
-            cfg.write('echo "Starting conversion..."\n')
+        self.download_thread = None
+        self.status.post("PYJAM DOWNLOAD PROGRESS", [
+            "Download complete! Downloaded to {folder}".format(folder=os.path.abspath('_ingame_dl')),
+            "Starting conversion..."
+        ])
         self.convert(os.path.abspath('_ingame_dl'))
 
-    def convert(self, folder):
+    def convert(self, folder, job=None):
         """Convert all files in a folder.
         Args:
             folder (str): Path to the folder
+            job (Job or None): The dispatcher job running the command, if any.
 
         Returns:
             None
         """
-        with open(get_path(self.game.mod_path, 'cfg/jam_stdin.cfg'), 'w') as cfg:
-            if ffmpeg.find() is None:
-                cfg.write('echo "PYJAM CONVERTER"\n')
-                cfg.write('echo "---------------"\n')
-                cfg.write('echo "FFmpeg could not be found on the system"\n')
-                cfg.write('echo "The audio converter will not work without it."\n')
-                cfg.write('echo "Please check your configuration and try again"\n')
-                return
-            else:
-                cfg.write('echo "PYJAM CONVERTER"\n')
-                cfg.write('echo "---------------"\n')
-                cfg.write('echo "Beginning conversion..."\n')
+        if ffmpeg.find() is None:
+            self.status.post("PYJAM CONVERTER", ["FFmpeg could not be found on the system",
+                                                 "The audio converter will not work without it.",
+                                                 "Please check your configuration and try again"])
+            return
+        self.status.post("PYJAM CONVERTER", ["Beginning conversion..."])
 
         files = glob.glob(get_path(folder, '*.*'))
-        convert_thread = ffmpeg.FFmpegConvertThread(self, self.game.audio_dir, self.game.audio_rate, 85, files)
-        convert_thread.start()
+        self.conversions.put(self, self.game.audio_dir, self.game.audio_rate, 85, files, self.game.convert_workers,
+                             self.conversion_cache)
 
     def convert_update(self, message):
         progress = "{songs} out of {total}".format(songs=message // 2, total=self.total_downloads)
-        with open(get_path(self.game.mod_path, 'cfg/jam_stdin.cfg'), 'w') as cfg:
-            cfg.write('echo "PYJAM CONVERSION PROGRESS"\n')
-            cfg.write('echo "-------------------------"\n')
-            cfg.write('echo "{progress} converted so far"\n'.format(progress=progress))
+        self.status.post("PYJAM CONVERSION PROGRESS", ["{progress} converted so far".format(progress=progress)],
+                         progress=True)
 
     def convert_complete(self, errors):
-        self.stop()
-        tracks = get_tracks(self.game.audio_dir)
-        self.track_list.SetObjects(tracks)
-        self.observer = JamObserver()  # Create new Observer object. Threads cannot be restarted.
-        self.start()
-        with open(get_path(self.game.mod_path, 'cfg/jam_stdin.cfg'), 'w') as cfg:
-            cfg.write('echo "PYJAM CONVERSION PROGRESS"\n')
-            cfg.write('echo "-------------------------"\n')
-            cfg.write('echo "Conversion complete!"\n'.format(folder=os.path.abspath('_ingame_dl')))
-            if errors:
-                cfg.write('echo "Songs converted with {errors} error(s)"\n'.format(errors=len(errors)))
-                cfg.write('echo "Error converting these files\n{errors}"\n'.format(errors=errors))
-            else:
-                cfg.write('echo "Songs converted without any errors"\n')
-            cfg.write('echo "pyjam will now reload..."\n')
-            cfg.write('exec jam\n')
+        # The audio folders are being watched, so just make sure the new tracks are in before reloading.
+        for handler in self.audio_handlers:
+            handler.flush()
+        lines = ["Conversion complete!"]
+        if errors:
+            lines.append("Songs converted with {errors} error(s)".format(errors=len(errors)))
+            lines.append("Error converting these files")
+            lines.extend(str(error) for error in errors)
+        else:
+            lines.append("Songs converted without any errors")
+        lines.append("pyjam will now reload...")
+        self.status.post("PYJAM CONVERSION PROGRESS", lines, ['exec jam'])
         self.total_downloads = 0
 
+    def update_tracks(self, root, changed, removed, moved):
+        """Apply changes in an audio folder to the track list and configs, without rescanning the folder.
+        Existing tracks keep their order (renamed ones included) and new tracks are added at the end.
+
+        Args:
+            root (str): The audio folder that changed.
+            changed (set[str]): Paths of files that were added or modified.
+            removed (set[str]): Paths of files that were deleted.
+            moved (dict[str, str]): Old paths of renamed files mapped to their new paths.
+
+        Returns:
+            None
+        """
+        files = []
+        for path in changed.union(moved.values()):
+            try:
+                stat = os.stat(path)
+            except OSError:
+                removed.add(path)
+                continue
+            files.append((path, stat.st_mtime, stat.st_size))
+
+        with TrackIndex(self.index_file) as track_index:
+            entries = {entry.path: entry for entry in track_index.update_files(root, files, removed.union(moved))}
+
+        # Everything but the new and changed files is taken from the current Tracks instead of the index.
+        kept = collections.OrderedDict()
+        for track in self.track_store.get_tracks():
+            path = moved.get(track.path, track.path)
+            if path not in removed and path not in kept:
+                kept[path] = track
+        for path in sorted((path for path in entries if path not in kept), key=lambda path: path.lower()):
+            kept[path] = None
+
+        rows = []  # (name, words, path, rate, channels, duration, problems)
+        for path, track in kept.items():
+            entry = entries.get(path)
+            if entry is not None:
+                self._alias_words[path] = entry.words
+                rows.append((entry.name, entry.words, path, entry.rate, entry.channels, entry.duration,
+                             check_track(entry, self.game.audio_rate)))
+            else:
+                words = self._alias_words.get(path)
+                if words is None:
+                    words = self._alias_words[path] = filter_alias(track.name)
+                rows.append((track.name, words, path, track.rate, track.channels, track.duration, track.problems))
+        for path in set(self._alias_words).difference(kept):
+            del self._alias_words[path]
+
+        track_data = self.get_track_data()
+        names = [row[0] for row in rows]
+        aliases = assign_aliases(names, [row[1] for row in rows], track_data)
+        binds = assign_binds(names, track_data)
+        tracks = [Track(index, name, aliases[index], path, binds[index], rate, channels, duration, problems)
+                  for index, (name, _, path, rate, channels, duration, problems) in enumerate(rows)]
+        logger.info("Audio folder {root} changed: {changed} added/modified, {removed} removed, {moved} renamed".format(
+            root=root, changed=len(changed), removed=len(removed), moved=len(moved)
+        ))
+        self.set_tracks(tracks)
+
+    def get_track_data(self):
+        """Get the custom track data of the main audio folder. It is only read again once track_data.json changes.
+
+        Returns:
+            dict: The custom track data.
+        """
+        try:
+            stat = os.stat(get_path(self.game.audio_dir, 'track_data.json'))
+            key = (stat.st_mtime, stat.st_size, stat.st_ino)
+        except OSError:
+            key = None
+        if self._track_data is None or self._track_data[0] != key:
+            self._track_data = (key, read_track_data(self.game.audio_dir))
+        return self._track_data[1]
+
+    def reload_tracks(self):
+        """Rescan every audio folder and update the track list and configs.
+
+        Returns:
+            None
+        """
+        self.set_tracks(get_tracks(self.game.get_audio_dirs(), audio_rate=self.game.audio_rate,
+                                   index_file=self.index_file))
+
+    def set_tracks(self, tracks):
+        """Replace the track list and rewrite the configs.
+
+        Args:
+            tracks (list[Track]): The new list of Tracks.
+
+        Returns:
+            None
+        """
+        self.track_store.set_tracks(tracks)
+        # Only the track configs depend on the track list, the rest (like the current track) are left alone.
+        write_track_configs(self.game.mod_path, tracks, self.game.play_key, self.game.relay_key,
+                            self.game.use_aliases)
+
+    def on_tracks_updated(self, tracks):
+        """Rewrite the track configs after Tracks were changed in place (e.g. new aliases or binds).
+
+        Args:
+            tracks (list[Track]): The changed Tracks.
+
+        Returns:
+            None
+        """
+        write_track_configs(self.game.mod_path, self.track_store.get_tracks(), self.game.play_key,
+                            self.game.relay_key, self.game.use_aliases)
+
 
 class JamHandler(FileSystemEventHandler):
-    def __init__(self, calling_class, file_name):
+    """
+    Hands changes to jam_cmd.cfg to Jam. host_writeconfig causes a burst of modify/move events for every write,
+    so events for the same file are coalesced and the file is only parsed once the burst is over.
+    """
+    def __init__(self, calling_class, file_name, window=0.05):
+        """
+        Args:
+            calling_class (Jam): The Jam to notify.
+            file_name (str): The name of the file to watch for.
+            window (float): How long to wait for more events after the first one of a burst, in seconds.
+                0 parses the file on every event.
+        """
         super(JamHandler, self).__init__()
         self.calling = calling_class
         self.file_name = file_name
+        self.window = window
+        self.received = 0
+        self.dropped = 0
+        self._lock = threading.Lock()
+        self._event_lock = threading.Lock()
+        self._pending = {}
 
     def on_modified(self, event):
         if os.path.basename(event.src_path) == self.file_name:
-            self.calling.on_event(event.src_path)
+            self.schedule(event.src_path)
 
     def on_moved(self, event):
         # This isn't really needed, but it's useful for things that use something like atomic saving.
         if os.path.basename(event.src_path) == self.file_name:
-            self.calling.on_event(event.src_path)
+            self.schedule(event.src_path)
         elif os.path.basename(event.dest_path) == self.file_name:
-            self.calling.on_event(event.dest_path)
+            self.schedule(event.dest_path)
+
+    def schedule(self, path):
+        """Parse a file once the current burst of events for it is over.
+
+        Args:
+            path (str): The path to the file.
+
+        Returns:
+            None
+        """
+        received = timer()
+        with self._lock:
+            self.received += 1
+            if path in self._pending:
+                self.dropped += 1
+                return
+            if self.window <= 0:
+                self._pending[path] = None
+            else:
+                self._pending[path] = threading.Timer(self.window, self.flush, args=(path, received))
+                self._pending[path].daemon = True
+                self._pending[path].start()
+        if self.window <= 0:
+            self.flush(path, received)
+
+    @wrap_exceptions
+    def flush(self, path, received=None):
+        """Parse a file right away.
+
+        Args:
+            path (str): The path to the file.
+            received (float or None): When the first event of the burst came in, see stats.timer.
+
+        Returns:
+            None
+        """
+        with self._lock:
+            self._pending.pop(path, None)
+        # Jam isn't thread safe, and every timer runs on its own thread.
+        with self._event_lock:
+            self.calling.on_event(path, received)
+
+    def cancel(self):
+        with self._lock:
+            for pending in self._pending.values():
+                if pending:
+                    pending.cancel()
+            self._pending.clear()
+
+    def get_counters(self):
+        """Get the event counters.
+
+        Returns:
+            dict[str, int]: How many events were received, and how many of them were dropped as part of a burst.
+        """
+        with self._lock:
+            return {'received': self.received, 'dropped': self.dropped}
+
+
+class AudioDirHandler(FileSystemEventHandler):
+    """
+    Collects changes to the .wav files in an audio folder, and hands them to Jam once things settle down.
+    """
+    def __init__(self, calling_class, root, delay=0.25, extension='.wav'):
+        """
+        Args:
+            calling_class (Jam): The Jam to notify.
+            root (str): The audio folder being watched.
+            delay (float): How long to wait after the last change before applying them, in seconds.
+            extension (str): Only files with this extension (case insensitive) are tracks.
+        """
+        super(AudioDirHandler, self).__init__()
+        self.calling = calling_class
+        self.root = get_path(root)
+        self.delay = delay
+        self.extension = extension
+        self._lock = threading.Lock()
+        self._timer = None
+        self._changed = set()
+        self._removed = set()
+        self._moved = {}
+        self._rescan = False
+
+    def is_track(self, path):
+        return path.lower().endswith(self.extension)
+
+    def on_created(self, event):
+        if not event.is_directory and self.is_track(event.src_path):
+            self.schedule(changed=get_path(event.src_path))
+
+    on_modified = on_created
+
+    def on_deleted(self, event):
+        if event.is_directory:
+            self.schedule(rescan=True)
+        elif self.is_track(event.src_path):
+            self.schedule(removed=get_path(event.src_path))
+
+    def on_moved(self, event):
+        if event.is_directory:
+            self.schedule(rescan=True)
+        elif self.is_track(event.src_path) and self.is_track(event.dest_path):
+            self.schedule(moved=(get_path(event.src_path), get_path(event.dest_path)))
+        elif self.is_track(event.src_path):
+            self.schedule(removed=get_path(event.src_path))
+        elif self.is_track(event.dest_path):
+            self.schedule(changed=get_path(event.dest_path))
+
+    def schedule(self, changed=None, removed=None, moved=None, rescan=False):
+        with self._lock:
+            if changed:
+                self._changed.add(changed)
+                self._removed.discard(changed)
+            if removed:
+                self._removed.add(removed)
+                self._changed.discard(removed)
+            if moved:
+                src, dest = moved
+                # A file that was renamed more than once is still only one rename.
+                for old, new in self._moved.items():
+                    if new == src:
+                        src = old
+                self._moved[src] = dest
+                if dest in self._changed:
+                    self._changed.discard(dest)
+            self._rescan = self._rescan or rescan
+
+            if self._timer:
+                self._timer.cancel()
+            self._timer = threading.Timer(self.delay, self.flush)
+            self._timer.daemon = True
+            self._timer.start()
+
+    @wrap_exceptions
+    def flush(self):
+        """Apply every pending change right away.
+
+        Returns:
+            None
+        """
+        with self._lock:
+            if self._timer:
+                self._timer.cancel()
+                self._timer = None
+            changed, removed, moved, rescan = self._changed, self._removed, self._moved, self._rescan
+            self._changed, self._removed, self._moved, self._rescan = set(), set(), {}, False
+
+        if rescan:
+            logger.info("Folder in {root} moved or deleted, rescanning.".format(root=self.root))
+            self.calling.reload_tracks()
+        elif changed or removed or moved:
+            self.calling.update_tracks(self.root, changed, removed, moved)
+
+    def cancel(self):
+        with self._lock:
+            if self._timer:
+                self._timer.cancel()
+                self._timer = None
 
 
 class JamObserver(Observer):
@@ -348,6 +818,47 @@ class JamObserver(Observer):
         self.join()
 
 
+def relay_pattern(relay_key):
+    """Get the compiled regex that finds the binds of a key in a host_writeconfig dump.
+
+    Args:
+        relay_key (str): The key.
+
+    Returns:
+        re.RegexObject: The pattern, matching bytes. Group 1 is everything the key is bound to.
+    """
+    pattern = _RELAY_PATTERNS.get(relay_key)
+    if pattern is None:
+        # Key names are case insensitive in the console, and the quotes are optional. The pattern has to start with a
+        # literal (no ^, no re.IGNORECASE) or the regex engine tries to match it at every single position.
+        key = ''.join('[{lower}{upper}]'.format(lower=char.lower(), upper=char.upper()) if char.isalpha()
+                      else re.escape(char) for char in relay_key).encode('utf-8')
+        pattern = re.compile(br'bind[ \t]+"?' + key + br'"?[ \t]+([^\r\n]*)')
+        _RELAY_PATTERNS[relay_key] = pattern
+    return pattern
+
+
+def find_relay_binds(data, relay_key):
+    """Find what a key is bound to in a host_writeconfig dump, without going through it line by line.
+
+    Args:
+        data (bytes or mmap.mmap): The contents of the cfg file.
+        relay_key (str): The key.
+
+    Returns:
+        generator[list[str]]: Every non-empty bind of the key, split into words, in the order they appear.
+    """
+    for match in relay_pattern(relay_key).finditer(data):
+        start = match.start()
+        if start and data[start - 1:start] not in b'\r\n':
+            continue  # Part of something else, e.g. an alias.
+        bind = match.group(1).decode('utf-8', 'replace').replace('"', '').split()
+        if not bind:
+            logger.error("Relay key bind had no argument.")
+            continue
+        yield bind
+
+
 def write_configs(path, tracks, play_key, relay_key, use_aliases):
     """Write the initial configs for running pyjam within the game.
     Args:
@@ -360,160 +871,260 @@ def write_configs(path, tracks, play_key, relay_key, use_aliases):
     Returns:
         None
     """
-    with open(get_path(path, 'cfg/jam.cfg'), 'w') as cfg:
-        cfg.write('bind {play_key} jam_play\n'.format(play_key=play_key))
-        cfg.write('alias jam_play jam_on\n')
-        cfg.write('alias jam_on "voice_inputfromfile 1; voice_loopback 1; +voicerecord; alias jam_play jam_off"\n')
-        cfg.write('alias jam_off "voice_inputfromfile 0; voice_loopback 0; -voicerecord; alias jam_play jam_on"\n')
-        cfg.write('alias jam_cmd "host_writeconfig jam_cmd"\n')
-        cfg.write('alias jam_listaudio "exec jam_la"\n')
-        cfg.write('alias jam_la "exec jam_la"\n')
-        cfg.write('alias la "exec jam_la"\n')
-        cfg.write('alias jam_saytrack "exec jam_saycurtrack"\n')
-        cfg.write('alias jam_say "exec jam_saycurtrack"\n')
-        cfg.write('alias jam_echotrack "exec jam_curtrack"\n')
-        cfg.write('alias jam_track "exec jam_curtrack"\n')
-        cfg.write('alias jam_stdin "exec jam_stdin"\n')
-        cfg.write('alias stdin "exec jam_stdin"\n')
-        cfg.write('alias jam_help "exec jam_help"\n')
-        cfg.write('alias jam "exec jam_help"\n')
-        for x, track in enumerate(tracks):
-            cfg.write('alias {x} "bind {relay} {x}; echo Loaded: {name}; jam_cmd"\n'.format(
-                x=x, relay=relay_key, name=track.name
-            ))
-            if use_aliases:
-                for alias in track.aliases:
-                    cfg.write('alias {alias} "bind {relay} {x}; echo Loaded: {name}; jam_cmd"\n'.format(
-                        alias=alias, relay=relay_key, x=x, name=track.name
-                    ))
-            if track.bind:
-                cfg.write('bind {bind} "bind {relay} {x}; echo Loaded: {name}; jam_cmd"\n'.format(
-                    bind=track.bind, relay=relay_key, x=x, name=track.name
-                ))
-        cfg.write('voice_enable 1; voice_modenable 1\n')
-        cfg.write('voice_forcemicrecord 0\n')
-        cfg.write('voice_fadeouttime 0.0\n')
-        cfg.write('con_enable 1; hideconsole; showconsole\n')
-        cfg.write('echo "pyjam v{v} loaded.\n'.format(v=__version__))
-        cfg.write('jam_help\n')
-        logger.info("Wrote jam.cfg to {path}".format(path=cfg.name))
-    with open(get_path(path, 'cfg/jam_la.cfg'), 'w') as cfg:
-        cfg.write('exec "jam_curtrack"\n')
-        for x, track in enumerate(tracks):
-            cfg.write('echo "{x}. {name}; Aliases: {aliases}"\n'.format(x=x, name=track.name, aliases=track.aliases))
-        logger.info("Wrote jam_la.cfg to {path}".format(path=cfg.name))
-    with open(get_path(path, 'cfg/jam_curtrack.cfg'), 'w') as cfg:
-        cfg.write('echo "pyjam :: No song loaded"\n')
-        logger.info("Wrote jam_curtrack.cfg to {path}".format(path=cfg.name))
-    with open(get_path(path, 'cfg/jam_saycurtrack.cfg'), 'w') as cfg:
-        cfg.write('say "pyjam :: No song loaded"\n')
-        logger.info("Wrote jam_saycurtrack.cfg to {path}".format(path=cfg.name))
-    with open(get_path(path, 'cfg/jam_stdin.cfg'), 'w') as cfg:
-        cfg.write('echo "Nothing to be reported at this time."\n')
-        logger.info("Wrote jam_stdin.cfg to {path}".format(path=cfg.name))
-    with open(get_path(path, 'cfg/jam_help.cfg'), 'w') as cfg:
-        cfg.write('echo "pyjam song playing guide:"\n')
-        cfg.write('echo "1. Use the \'la\' or \'jam_la\' commands for a list of your audio tracks"\n')
-        cfg.write('echo "2. Type the number of the track OR one of its aliases and press enter"\n')
-        cfg.write('echo "3. Press the \'{key}\' key to start or stop the music"\n'.format(key=play_key))
-        cfg.write('echo\n')
-        cfg.write('echo "pyjam common commands:"\n')
-        cfg.write('echo "la, jam_la, jam_listaudio: list all tracks + their index and aliases"\n')
-        cfg.write('echo "jam_say, jam_saytrack: say the name of the song in all chat."\n')
-        cfg.write('echo "jam_echotrack, jam_track: echo the name of the song in console."\n')
-        cfg.write('echo "jam_help: view this help guide."\n')
-        cfg.write('echo\n')
-        cfg.write('echo "pyjam in-game downloader + converter guide:"\n')
-        cfg.write('echo "Recommended only for advanced users. This may be difficult for some people."\n')
-        cfg.write("echo \"1. Run the command `bind {relay} ''search: SEARCH TERM HERE''`.\"\n".format(relay=relay_key))
-        cfg.write('echo "2. Now run the command \'jam_cmd\'. pyjam will then run the command."\n')
-        cfg.write('echo "3. To get the results, run the commands \'stdin\' or \'jam_stdin\'."\n')
-        cfg.write("echo \"4. Then, run the command `bind {relay} ''download: IDs HERE''`.\"\n".format(relay=relay_key))
-        cfg.write('echo "The IDs of the videos should be separated with commas, like so: Dkm8Hteeh6M,MqgtVpD328o"\n')
-        cfg.write('echo "5. Run the command \'jam_cmd\' again to get pyjam to read your command."\n')
-        cfg.write('echo "6. To get periodic updates, run the commands \'stdin\' or \'jam_stdin\'."\n')
-        cfg.write('echo "7. pyjam will reload after you run \'stdin\' or \'jam_stdin\' once conversion is complete."\n')
-        cfg.write('echo "NOTE: \'\' IS SUPPOSED TO REPRESENT A DOUBLE QUOTE!"\n')
-        cfg.write('echo\n')
-        cfg.write('echo "pyjam advanced commands:"\n')
-        cfg.write('echo "stdin, jam_stdin: get output from search or downloader/converter."\n')
-        cfg.write('echo "jam_cmd: run a command (after setting the command with `bind`)"\n')
-        cfg.write("echo \"bind {relay} ''command: arguments'': set a command\"\n".format(relay=relay_key))
-        logger.info("Wrote jam_help.cfg to {path}".format(path=cfg.name))
-
-
-def get_tracks(audio_path):
+    files = renderer.render_configs(tracks, play_key, relay_key, use_aliases)
+    renderer.publish(get_path(path, 'cfg'), files)
+    renderer.prune(get_path(path, 'cfg'), files)
+
+
+def write_track_configs(path, tracks, play_key, relay_key, use_aliases):
+    """Write the configs that depend on the track list (jam.cfg and jam_la.cfg), leaving the others alone.
+    Args:
+        path (str): The mod path for the Source Engine game.
+        tracks (list[Track]): The list of valid tracks.
+        play_key (str): The key used to start/stop music.
+        relay_key (str): The key used to interact with the game.
+        use_aliases (bool): Whether or not to use aliases
+
+    Returns:
+        None
+    """
+    files = renderer.render_track_configs(tracks, play_key, relay_key, use_aliases)
+    renderer.publish(get_path(path, 'cfg'), files)
+    renderer.prune(get_path(path, 'cfg'), files)
+
+
+def get_tracks(audio_path, track_index=None, alias_registry=None, audio_rate=None, track_data=None,
+               index_file=INDEX_FILE):
     """Get all track files from a folder and generate aliases/binds (as well as read custom track data).
     Args:
-        audio_path (str): The path to where all the .wavs are stored.
+        audio_path (str or list[str]): The path to where all the .wavs are stored. If a list of paths is given, the
+            tracks from all of them are merged (in order), and custom track data is read from the first one.
+        track_index (TrackIndex or None): The track index to use. If None, the default on-disk index is opened.
+        alias_registry (AliasRegistry or None): The registry to assign aliases with. Pass one in to inspect the alias
+            collisions that were resolved afterwards.
+        audio_rate (int or None): The sample rate the game accepts. Tracks with a different rate are flagged.
+        track_data (dict or None): The custom track data (e.g. from a TrackDataStore). If None, it's read from disk.
+        index_file (str): Path to the on-disk index, if `track_index` is None.
 
     Returns:
         list[Track]: A list of Track objects for all of the tracks found..
     """
-    black_list = [
-        'buy', 'cheer', 'compliment', 'coverme', 'enemydown', 'enemyspot', 'fallback', 'followme', 'getout',
-        'go', 'holdpos', 'inposition', 'negative', 'regroup', 'report', 'reportingin', 'roger', 'sectorclear',
-        'sticktog', 'takepoint', 'takingfire', 'thanks', 'drop', 'sm', 'jam_play', 'jam_on', 'jam_off',
-        'jam_cmd', 'jam_listaudio', 'jam_la', 'la', 'jam_saytrack', 'jam_say', 'jam_echotrack',  'jam_track',
-        'jam_stdin', 'stdin', 'jam_help', 'jam', 'kill', 'explode'
-    ]
+    audio_paths = [audio_path] if isinstance(audio_path, str) else list(audio_path)
+    logger.info("Generating track list with path(s) {paths}".format(paths=audio_paths))
+    if track_data is None:
+        track_data = read_track_data(audio_paths[0])
+
+    scanned = scan_roots(audio_paths)
+    if track_index is None:
+        with TrackIndex(index_file) as track_index:
+            entries = [entry for root, files in scanned.items() for entry in track_index.update(root, files)]
+    else:
+        entries = [entry for root, files in scanned.items() for entry in track_index.update(root, files)]
+
+    return build_tracks(entries, track_data, alias_registry, audio_rate)
 
-    current_tracks = []
-    bound_keys = []
 
+def read_track_data(audio_path):
+    """Read the custom track data of an audio folder.
+
+    Args:
+        audio_path (str): The audio folder.
+
+    Returns:
+        dict: The custom track data. Empty if there is none, or if it's invalid.
+    """
     # Format for custom track data.
     # {
     #     "song1": {"aliases": ["alias1", "alias2", "etc."], "bind": "DOWNARROW"},
     #     "song2": {"aliases": ["alias3", "alias4", "etc."], "bind": "KP_INS"}
     # }
-    logger.info("Generating track list with path {path}".format(path=audio_path))
     try:
         with open(get_path(audio_path, 'track_data.json')) as f:
-            track_data = json.load(f)
+            return json.load(f)
     except FileNotFoundError:
-        track_data = {}
+        return {}
     except ValueError:
-        track_data = {}
         logger.exception("Invalid track data for {path}".format(path=get_path(audio_path, 'track_data.json')))
+        return {}
 
-    index = 0
-    for track in glob.glob(get_path(audio_path, '*.wav')):
-        bind = None
-        name = unidecode.unidecode(os.path.splitext(os.path.basename(track))[0])  # Name of file minus path/extension
-        if name in track_data and 'aliases' in track_data[name]:
-            custom_aliases = track_data[name].get('aliases')
-            if custom_aliases:
-                aliases = [filter_alias(x) for x in custom_aliases if x not in black_list and x not in whitespace]
-        else:
-            aliases = [x for x in filter_alias(name).split() if x not in black_list and x not in whitespace]
-        if name in track_data and 'bind' in track_data[name]:
-            custom_bind = track_data[name].get('bind')
-            if custom_bind and bindable(custom_bind) and custom_bind not in bound_keys:
-                bind = custom_bind
-                bound_keys.extend(custom_bind)
-        black_list.extend(aliases)
-        current_tracks.append(Track(index, name, aliases, track, bind))
-        index += 1
-
-    if current_tracks:
-        logger.debug("Generated track list: {tracks}".format(tracks='\n'.join([repr(x) for x in current_tracks])))
-    else:
+
+def build_tracks(entries, track_data, alias_registry=None, audio_rate=None):
+    """Generate aliases/binds for a list of indexed track files.
+
+    Args:
+        entries (list[IndexEntry]): The index entries of the tracks, in order.
+        track_data (dict): The custom track data.
+        alias_registry (AliasRegistry or None): The registry to assign aliases with.
+        audio_rate (int or None): The sample rate the game accepts. Tracks with a different rate are flagged.
+
+    Returns:
+        list[Track]: A list of Track objects, one for each entry.
+    """
+    names = [entry.name for entry in entries]
+    aliases = assign_aliases(names, [entry.words for entry in entries], track_data, alias_registry)
+    binds = assign_binds(names, track_data)
+    current_tracks = [Track(index, entry.name, aliases[index], entry.path, binds[index], entry.rate, entry.channels,
+                            entry.duration, check_track(entry, audio_rate)) for index, entry in enumerate(entries)]
+
+    broken = [track for track in current_tracks if track.problems]
+    if broken:
+        logger.warning("{num} track(s) need to be converted before they can be played:\n{tracks}".format(
+            num=len(broken), tracks='\n'.join("{path}: {problems}".format(path=track.path,
+                                                                         problems=', '.join(track.problems))
+                                              for track in broken)
+        ))
+
+    if not current_tracks:
         logger.debug("No tracks found.")
+    elif logger.isEnabledFor(logging.DEBUG):
+        # Formatting this for a big library is expensive, so don't do it unless it's going to be logged.
+        logger.debug("Generated track list: {tracks}".format(tracks='\n'.join([repr(x) for x in current_tracks])))
     return current_tracks
 
 
-def filter_alias(alias):
-    """Filter an alias, removing all non-alphabetic characters or spaces.
+def assign_aliases(names, words, track_data, alias_registry=None):
+    """Work out the aliases of a whole track list.
+    Custom aliases win over other tracks' automatic ones, and tracks left without any alias get a fallback.
+
+    Args:
+        names (list[str]): The names of the tracks, in order.
+        words (list[str]): The filtered names of the tracks (see filter_alias), in the same order.
+        track_data (dict): The custom track data.
+        alias_registry (AliasRegistry or None): The registry to assign aliases with.
+
+    Returns:
+        dict[int, list[str]]: The aliases of every track, by position.
+    """
+    candidates = []
+    for index, (name, name_words) in enumerate(zip(names, words)):
+        custom_aliases = track_data.get(name, {}).get('aliases')
+        if custom_aliases:
+            custom_aliases = [filter_alias(x) for x in custom_aliases]
+        candidates.append((index, name_words.split(), custom_aliases or None, name_words.replace(' ', '')))
+
+    if alias_registry is None:
+        alias_registry = AliasRegistry()
+    aliases = alias_registry.assign(candidates)
+    if alias_registry.collisions:
+        logger.info("Resolved {num} alias collision(s)".format(num=len(alias_registry.collisions)))
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Alias collisions: {collisions}".format(collisions=alias_registry.collisions))
+    return aliases
+
+
+def assign_binds(names, track_data):
+    """Work out the binds of a whole track list. A key only goes to the first track that wants it.
+
     Args:
-        alias (str): The alias to filter.
+        names (list[str]): The names of the tracks, in order.
+        track_data (dict): The custom track data.
 
     Returns:
-        str: The filtered alias.
+        list[str or None]: The bind of every track, in the same order.
     """
-    filtered = []
-    for char in alias:
-        if char.isalpha() or char.isspace():
-            filtered.append(char.lower())
-        elif char != "'" and char != '"':
-            filtered.append(' ')
-    return ''.join(filtered).strip()
+    binds = []
+    bound_keys = set()
+    for name in names:
+        bind = track_data.get(name, {}).get('bind')
+        if bind and bindable(bind) and bind not in bound_keys:
+            bound_keys.add(bind)
+            binds.append(bind)
+        else:
+            binds.append(None)
+    return binds
+
+
+def apply_track_data(tracks, track_data, names):
+    """Apply changed custom track data to the Tracks in place, without rebuilding the track list.
+    Aliases and binds are worked out for the whole list again (see assign_aliases and assign_binds), so the result
+    is exactly what build_tracks would give after a restart: a custom alias can take another track's automatic
+    alias away, and clearing it hands the alias back.
+
+    Args:
+        tracks (list[Track]): The current track list.
+        track_data (dict): The custom track data.
+        names (iterable[str]): The names of the tracks whose data changed.
+
+    Returns:
+        list[int]: The positions of every Track that changed.
+    """
+    names = set(names)
+    if not any(track.name in names for track in tracks):
+        return []
+
+    track_names = [track.name for track in tracks]
+    aliases = assign_aliases(track_names, [filter_alias(name) for name in track_names], track_data)
+    binds = assign_binds(track_names, track_data)
+    changed = []
+    for position, track in enumerate(tracks):
+        bind = binds[position] or ''
+        if track.aliases != aliases[position] or track.bind != bind:
+            track.aliases = aliases[position]
+            track.bind = bind
+            changed.append(position)
+    return changed
+
+
+def check_track(entry, audio_rate=None):
+    """Check whether a track file can be played in-game as it is.
+
+    Args:
+        entry (IndexEntry): The index entry of the track.
+        audio_rate (int or None): The sample rate the game accepts. If None, the rate isn't checked.
+
+    Returns:
+        list[str]: Everything that is wrong with the file. Empty if nothing is.
+    """
+    if entry.format_tag is None:
+        return ["unreadable WAV header"]
+    problems = []
+    if entry.format_tag != WAVE_FORMAT_PCM or entry.bits != 16:
+        problems.append("not 16 bit PCM")
+    if entry.channels != 1:
+        problems.append("{channels} channels instead of 1".format(channels=entry.channels))
+    if audio_rate and entry.rate != audio_rate:
+        problems.append("{rate} Hz instead of {audio_rate} Hz".format(rate=entry.rate, audio_rate=audio_rate))
+    return problems
+
+
+def find_duplicates(tracks, track_index=None, max_workers=None, index_file=INDEX_FILE):
+    """Find tracks with the exact same audio, even if their names or metadata differ.
+    Only the audio data is hashed, and hashes are cached in the track index so only new or changed files are read.
+
+    Args:
+        tracks (list[Track]): The tracks to check.
+        track_index (TrackIndex or None): The track index to use. If None, the default on-disk index is opened.
+        max_workers (int or None): The maximum amount of processes hashing files. Defaults to the amount of CPUs.
+        index_file (str): Path to the on-disk index, if `track_index` is None.
+
+    Returns:
+        list[list[Track]]: Groups of two or more tracks with identical audio, in track list order.
+    """
+    if track_index is None:
+        with TrackIndex(index_file) as track_index:
+            return find_duplicates(tracks, track_index, max_workers)
+
+    entries = track_index.get_entries([track.path for track in tracks])
+    hashes = {entry.path: entry.data_hash for entry in entries}
+    # Files with different sizes can still have the same audio (different metadata), so everything gets hashed.
+    # Files whose header couldn't be read during the scan are skipped, they would just fail again.
+    missing = [entry.path for entry in entries if not entry.data_hash and entry.format_tag is not None]
+    if missing:
+        logger.info("Hashing {num} track(s) for duplicate detection".format(num=len(missing)))
+        new_hashes = {}
+        with ProcessPoolExecutor(max_workers=max_workers) as pool:
+            for path, future in [(path, pool.submit(hash_wav_data, path)) for path in missing]:
+                try:
+                    new_hashes[path] = future.result()
+                except (RiffError, OSError, IOError) as e:
+                    logger.warning("Could not hash {path}: {error}".format(path=path, error=e))
+        track_index.set_hashes(new_hashes)
+        hashes.update(new_hashes)
+
+    groups = collections.OrderedDict()
+    for track in tracks:
+        if hashes.get(track.path):
+            groups.setdefault(hashes[track.path], []).append(track)
+    duplicates = [group for group in groups.values() if len(group) > 1]
+    logger.info("Found {num} group(s) of duplicate tracks".format(num=len(duplicates)))
+    return duplicates
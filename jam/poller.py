@@ -0,0 +1,151 @@
+# Copyright (C) 10se1ucgo 2016
+#
+# This file is part of pyjam.
+#
+# pyjam is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# pyjam is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with pyjam.  If not, see <http://www.gnu.org/licenses/>.
+
+# A replacement for the watchdog observer for filesystems that don't report changes (Wine/Proton prefixes, network
+# home folders, some FUSE mounts). Instead of polling a whole folder tree, only the files pyjam cares about are
+# stat'ed, quickly right after a change and less and less often while nothing happens.
+from __future__ import division
+import glob
+import logging
+import os
+import threading
+import time
+
+from watchdog.events import FileModifiedEvent
+
+from .common import wrap_exceptions
+
+__all__ = ['OBSERVERS', 'StatPoller']
+logger = logging.getLogger(__name__)
+OBSERVERS = ('native', 'polling')  # The observer backends a Game can pick from.
+# time.thread_time only counts this thread, but it's Python 3.7+. process_time counts every thread.
+_cpu_time = getattr(time, 'thread_time', None) or getattr(time, 'process_time', None) or time.clock
+
+
+class StatPoller(threading.Thread):
+    """
+    Polls a few files with os.stat and hands any change to a watchdog event handler as a modified event.
+    """
+    def __init__(self, handler, pattern, min_interval=0.02, max_interval=0.25, backoff=1.5, discover_interval=5.0):
+        """
+        Args:
+            handler (watchdog.events.FileSystemEventHandler): Gets an on_modified call for every change.
+            pattern (str): The path of the file to watch. Can be a glob pattern (e.g. userdata/*/730/local/cfg/x.cfg),
+                in which case the matching files are looked up again every `discover_interval` seconds.
+            min_interval (float): Seconds between polls right after a change.
+            max_interval (float): The most seconds between polls, once nothing has changed for a while.
+            backoff (float): What the interval is multiplied with after every poll without a change.
+            discover_interval (float): Seconds between looking up the files matching `pattern`.
+        """
+        super(StatPoller, self).__init__()
+        self.handler = handler
+        self.pattern = pattern
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.backoff = backoff
+        self.discover_interval = discover_interval
+        self.interval = min_interval
+        self.polls = 0
+        self.changes = 0
+        self.cpu_time = 0.0
+        self._start_time = None
+        self._states = {}
+        self._halt = threading.Event()
+
+        self.daemon = True
+
+    def stop(self):
+        self._halt.set()
+
+    def abort(self):
+        self.stop()
+        self.join()
+
+    @wrap_exceptions
+    def run(self):
+        self._start_time = time.time()
+        next_discovery = 0
+        while not self._halt.isSet():
+            cpu_start = _cpu_time()
+            now = time.time()
+            if now >= next_discovery:
+                self.discover()
+                next_discovery = now + self.discover_interval
+            changed = self.poll()
+            self.cpu_time += _cpu_time() - cpu_start
+
+            if changed:
+                self.interval = self.min_interval
+            else:
+                self.interval = min(self.interval * self.backoff, self.max_interval)
+            self._halt.wait(self.interval)
+
+    def discover(self):
+        """Look up which files match the pattern. New files are only reported once they change.
+
+        Returns:
+            None
+        """
+        paths = set(glob.glob(self.pattern)) if glob.has_magic(self.pattern) else {self.pattern}
+        for path in paths.difference(self._states):
+            self._states[path] = self.stat(path)
+        for path in set(self._states).difference(paths):
+            del self._states[path]
+
+    def poll(self):
+        """Stat every watched file once, and report the ones that changed.
+
+        Returns:
+            bool: Whether or not anything changed.
+        """
+        self.polls += 1
+        changed = False
+        for path, state in list(self._states.items()):
+            new_state = self.stat(path)
+            if new_state == state:
+                continue
+            self._states[path] = new_state
+            if new_state is None:
+                continue  # Deleted. The next write will show up as a change.
+            self.changes += 1
+            changed = True
+            self.handler.on_modified(FileModifiedEvent(path))
+        return changed
+
+    @staticmethod
+    def stat(path):
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        # The inode catches atomic saves that happen to keep the same mtime and size.
+        return getattr(stat, 'st_mtime_ns', stat.st_mtime), stat.st_size, stat.st_ino
+
+    def get_stats(self):
+        """Get how much polling has cost so far.
+
+        Returns:
+            dict: polls, changes, files (being watched), interval (current, in seconds), cpu_time (seconds) and
+                cpu_percent (of a single core, since the poller started).
+        """
+        elapsed = time.time() - self._start_time if self._start_time else 0
+        return {'polls': self.polls, 'changes': self.changes, 'files': len(self._states), 'interval': self.interval,
+                'cpu_time': self.cpu_time, 'cpu_percent': self.cpu_time / elapsed * 100 if elapsed else 0.0}
+
+    def __repr__(self):
+        return "{c}(pattern={pattern}, interval={interval})".format(c=self.__class__, pattern=self.pattern,
+                                                                    interval=self.interval)
@@ -0,0 +1,272 @@
+# Copyright (C) 10se1ucgo 2016
+#
+# This file is part of pyjam.
+#
+# pyjam is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# pyjam is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with pyjam.  If not, see <http://www.gnu.org/licenses/>.
+
+# Play history, and warming the tracks that are likely to be played next into the OS page cache, so switching tracks
+# doesn't have to wait for a (possibly sleeping) hard drive.
+from __future__ import division
+import collections
+import json
+import logging
+import os
+import threading
+import time
+
+from .common import get_path, atomic_write, wrap_exceptions
+
+try:
+    FileNotFoundError  # This will throw a NameError if the user is using Python 2.
+except NameError:
+    FileNotFoundError = IOError
+
+__all__ = ['HISTORY_FILE', 'MAX_HISTORY', 'PlayHistory', 'rank_tracks', 'Prefetcher', 'warm_file']
+logger = logging.getLogger(__name__)
+HISTORY_FILE = 'play_history.json'
+MAX_HISTORY = 500
+HALF_LIFE = 7 * 24 * 60 * 60  # A play from a week ago counts half as much as one from just now.
+BIND_WEIGHT = 1.0  # Tracks bound to a key are one key press away.
+NEXT_WEIGHT = 0.5  # Going through the list one track after another is common.
+SAVE_INTERVAL = 5 * 60  # The history is saved at most this often while running (in seconds), and always on exit.
+
+
+class PlayHistory(object):
+    """
+    The tracks played with an audio folder (i.e. a profile), newest last.
+    """
+    # Format for the play history.
+    # [["path/to/song1.wav", 1476000000.0], ["path/to/song2.wav", 1476000060.0]]
+    def __init__(self, audio_path, size=MAX_HISTORY):
+        """
+        Args:
+            audio_path (str): The audio folder. The history is stored in it.
+            size (int): How many plays to remember.
+        """
+        self.history_path = get_path(audio_path, HISTORY_FILE)
+        self._lock = threading.Lock()
+        self._entries = collections.deque(self._load(), maxlen=size)
+        self._dirty = False
+
+    def _load(self):
+        try:
+            with open(self.history_path) as f:
+                entries = json.load(f)
+        except FileNotFoundError:
+            return []
+        except ValueError:
+            logger.exception("Invalid play history for {path}".format(path=self.history_path))
+            return []
+        if not isinstance(entries, list):
+            return []
+        return [(path, when) for path, when in (entry for entry in entries if len(entry) == 2)]
+
+    def record(self, path, when=None):
+        """Remember that a track was played. The history isn't saved until save() is called.
+
+        Args:
+            path (str): The path to the track.
+            when (float or None): When it was played (UNIX time). Defaults to now.
+
+        Returns:
+            None
+        """
+        with self._lock:
+            self._entries.append((path, time.time() if when is None else when))
+            self._dirty = True
+
+    def get_entries(self):
+        """Get the history.
+
+        Returns:
+            list[tuple[str, float]]: (path, UNIX time) of every play, oldest first.
+        """
+        with self._lock:
+            return list(self._entries)
+
+    def save(self):
+        """Write the history to disk if anything was played since it was last saved.
+
+        Returns:
+            None
+        """
+        with self._lock:
+            if not self._dirty:
+                return
+            entries = list(self._entries)
+            self._dirty = False
+        atomic_write(self.history_path, json.dumps(entries), sync=False)
+
+    def __len__(self):
+        return len(self.get_entries())
+
+    def __repr__(self):
+        return "{c}(file={file}, plays={num})".format(c=self.__class__, file=self.history_path, num=len(self))
+
+
+def rank_tracks(tracks, history, current=None, now=None):
+    """Rank the tracks by how likely they are to be played next.
+    Every play counts (recent ones more than old ones), and tracks bound to a key or right after the current track
+    get a bonus. Tracks that can't be played are left out.
+
+    Args:
+        tracks (list[Track]): The track list.
+        history (list[tuple[str, float]]): (path, UNIX time) of previous plays.
+        current (int or None): The index of the track that was just loaded, if any. It is left out too.
+        now (float or None): The current UNIX time. Defaults to now.
+
+    Returns:
+        list[Track]: The likely tracks, most likely first.
+    """
+    now = time.time() if now is None else now
+    scores = collections.defaultdict(float)
+    for path, when in history:
+        scores[path] += 0.5 ** (max(now - when, 0) / HALF_LIFE)
+    for track in tracks:
+        if track.bind:
+            scores[track.path] += BIND_WEIGHT
+    if current is not None and current + 1 < len(tracks):
+        scores[tracks[current + 1].path] += NEXT_WEIGHT
+
+    skip = tracks[current].path if current is not None and current < len(tracks) else None
+    likely = [track for track in tracks if track.path in scores and track.path != skip and not track.problems]
+    likely.sort(key=lambda track: scores[track.path], reverse=True)
+    return likely
+
+
+class Prefetcher(threading.Thread):
+    """
+    Warms the most likely next tracks into the page cache on a background thread, up to a memory budget.
+    """
+    def __init__(self, track_store, history, budget):
+        """
+        Args:
+            track_store (TrackStore): The track list.
+            history (PlayHistory): The play history of the profile.
+            budget (int): The most audio to keep warm, in bytes. 0 disables prefetching.
+        """
+        super(Prefetcher, self).__init__()
+        self.track_store = track_store
+        self.history = history
+        self.budget = budget
+        self.warmed_bytes = 0
+        self._current = None
+        self._warmed = {}  # path -> (mtime, size), for the read through fallback.
+        self._saved = time.time()
+        self._wake = threading.Event()
+        self._abort = threading.Event()
+
+        self.daemon = True
+
+    def request(self, current=None):
+        """Ask for a new prefetch pass, e.g. after a track was loaded.
+
+        Args:
+            current (int or None): The index of the track that was just loaded, if any.
+
+        Returns:
+            None
+        """
+        self._current = current
+        self._wake.set()
+
+    def abort(self):
+        self._abort.set()
+        self._wake.set()
+
+    def is_aborted(self):
+        return self._abort.isSet()
+
+    @wrap_exceptions
+    def run(self):
+        while True:
+            self._wake.wait()
+            self._wake.clear()
+            if self.is_aborted():
+                break
+            # Saving on every play would be a disk write per track switch. Jam.stop saves whatever is left.
+            if time.time() - self._saved >= SAVE_INTERVAL:
+                self.history.save()
+                self._saved = time.time()
+            if self.budget > 0:
+                self.prefetch(self._current)
+
+    def prefetch(self, current=None):
+        """Warm the likely next tracks right away.
+
+        Args:
+            current (int or None): The index of the track that was just loaded, if any.
+
+        Returns:
+            int: How many bytes of audio were warmed (or asked to be).
+        """
+        total = 0
+        warmed = 0
+        start = time.time()
+        for track in rank_tracks(self.track_store.get_tracks(), self.history.get_entries(), current):
+            if self.is_aborted():
+                break
+            try:
+                size = os.path.getsize(track.path)
+                if total + size > self.budget:
+                    continue  # A smaller track might still fit.
+                warm_file(track.path, self._warmed)
+            except OSError:
+                logger.debug("Could not prefetch {path}".format(path=track.path), exc_info=True)
+                continue
+            total += size
+            warmed += 1
+        self.warmed_bytes = total
+        logger.debug("Prefetched {num} track(s), {size:.1f} MiB in {time:.1f} ms".format(
+            num=warmed, size=total / 1024 / 1024, time=(time.time() - start) * 1000
+        ))
+        return total
+
+    def __repr__(self):
+        return "{c}(budget={budget}, warm={warm})".format(c=self.__class__, budget=self.budget,
+                                                           warm=self.warmed_bytes)
+
+
+def warm_file(path, warmed=None, chunk_size=1024 * 1024):
+    """Get a file into the OS page cache.
+    Where posix_fadvise is available the kernel reads the file in the background. Elsewhere the file is read through
+    once, and not again while it's unchanged.
+
+    Args:
+        path (str): The path to the file.
+        warmed (dict or None): Files that were already read through, see Prefetcher.
+        chunk_size (int): How much to read at a time, in bytes.
+
+    Returns:
+        None
+
+    Raises:
+        OSError: If the file could not be read.
+    """
+    if hasattr(os, 'posix_fadvise'):
+        fd = os.open(path, os.O_RDONLY)
+        try:
+            os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_WILLNEED)
+        finally:
+            os.close(fd)
+        return
+
+    stat = os.stat(path)
+    if warmed is not None and warmed.get(path) == (stat.st_mtime, stat.st_size):
+        return
+    with open(path, 'rb') as f:
+        while f.read(chunk_size):
+            pass
+    if warmed is not None:
+        warmed[path] = (stat.st_mtime, stat.st_size)
@@ -0,0 +1,378 @@
+# Copyright (C) 10se1ucgo 2016
+#
+# This file is part of pyjam.
+#
+# pyjam is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# pyjam is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with pyjam.  If not, see <http://www.gnu.org/licenses/>.
+
+# Renders the pyjam cfg files in memory and publishes them atomically, skipping files whose contents didn't change.
+# The game can exec a cfg at any moment, so it must never see one that's only half written.
+import collections
+import glob
+import hashlib
+import logging
+import os
+import threading
+
+from .common import get_path, atomic_write, __version__
+
+__all__ = ['TRACK_CONFIGS', 'PAGE_SIZE', 'render_configs', 'render_track_configs', 'render_jam', 'render_la',
+           'render_la_index', 'render_la_page', 'render_alias_page', 'render_help', 'page_of', 'publish', 'prune']
+logger = logging.getLogger(__name__)
+TRACK_CONFIGS = ('jam.cfg', 'jam_la.cfg')
+# Libraries with more tracks than this get the paged layout. Every page has its own jam_la_N.cfg listing and
+# jam_alias_N.cfg with the aliases of its tracks, which is only exec'd once the page is listed.
+PAGE_SIZE = 250
+PAGE_FILES = ('jam_la_*.cfg', 'jam_alias_*.cfg')
+
+_published = {}  # Path -> (digest, mtime, size) of what was last published there.
+_published_lock = threading.Lock()
+
+
+def render_configs(tracks, play_key, relay_key, use_aliases, page_size=PAGE_SIZE):
+    """Render every pyjam cfg file.
+
+    Args:
+        tracks (list[Track]): The list of valid tracks.
+        play_key (str): The key used to start/stop music.
+        relay_key (str): The key used to interact with the game.
+        use_aliases (bool): Whether or not to use aliases
+        page_size (int): The amount of tracks per page, for libraries that need paging.
+
+    Returns:
+        collections.OrderedDict[str, str]: The contents of each cfg file, keyed by file name.
+    """
+    files = render_track_configs(tracks, play_key, relay_key, use_aliases, page_size)
+    files['jam_curtrack.cfg'] = 'echo "pyjam :: No song loaded"\n'
+    files['jam_saycurtrack.cfg'] = 'say "pyjam :: No song loaded"\n'
+    files['jam_stdin.cfg'] = 'echo "Nothing to be reported at this time."\n'
+    files['jam_help.cfg'] = render_help(play_key, relay_key)
+    return files
+
+
+def render_track_configs(tracks, play_key, relay_key, use_aliases, page_size=PAGE_SIZE):
+    """Render the cfg files that depend on the track list (see TRACK_CONFIGS, plus the pages of big libraries).
+
+    Args:
+        tracks (list[Track]): The list of valid tracks.
+        play_key (str): The key used to start/stop music.
+        relay_key (str): The key used to interact with the game.
+        use_aliases (bool): Whether or not to use aliases
+        page_size (int): The amount of tracks per page, for libraries that need paging.
+
+    Returns:
+        collections.OrderedDict[str, str]: The contents of each cfg file, keyed by file name.
+    """
+    if len(tracks) <= page_size:
+        return collections.OrderedDict([
+            ('jam.cfg', render_jam(tracks, play_key, relay_key, use_aliases)),
+            ('jam_la.cfg', render_la(tracks))
+        ])
+
+    # jam.cfg only gets the binds (there's only so many keys), so exec'ing it takes the same time for any library.
+    files = collections.OrderedDict([
+        ('jam.cfg', render_jam(tracks, play_key, relay_key, use_aliases, paged=True)),
+        ('jam_la.cfg', render_la_index(len(tracks), page_size))
+    ])
+    for page in range(1, _page_count(len(tracks), page_size) + 1):
+        files['jam_la_{page}.cfg'.format(page=page)] = render_la_page(tracks, page, page_size)
+        files['jam_alias_{page}.cfg'.format(page=page)] = render_alias_page(tracks, page, page_size, relay_key,
+                                                                           use_aliases)
+    return files
+
+
+def render_jam(tracks, play_key, relay_key, use_aliases, paged=False):
+    """Render jam.cfg, which sets up pyjam's commands and an alias (and bind) for every track.
+
+    Args:
+        tracks (list[Track]): The list of valid tracks.
+        play_key (str): The key used to start/stop music.
+        relay_key (str): The key used to interact with the game.
+        use_aliases (bool): Whether or not to use aliases
+        paged (bool): If True, the track aliases are left to the jam_alias_N.cfg pages and only binds are written.
+
+    Returns:
+        str: The contents of jam.cfg.
+    """
+    lines = []
+    lines.append('bind {play_key} jam_play\n'.format(play_key=play_key))
+    lines.append('alias jam_play jam_on\n')
+    lines.append('alias jam_on "voice_inputfromfile 1; voice_loopback 1; +voicerecord; alias jam_play jam_off"\n')
+    lines.append('alias jam_off "voice_inputfromfile 0; voice_loopback 0; -voicerecord; alias jam_play jam_on"\n')
+    lines.append('alias jam_cmd "host_writeconfig jam_cmd"\n')
+    lines.append('alias jam_listaudio "exec jam_la"\n')
+    lines.append('alias jam_la "exec jam_la"\n')
+    lines.append('alias la "exec jam_la"\n')
+    lines.append('alias jam_saytrack "exec jam_saycurtrack"\n')
+    lines.append('alias jam_say "exec jam_saycurtrack"\n')
+    lines.append('alias jam_echotrack "exec jam_curtrack"\n')
+    lines.append('alias jam_track "exec jam_curtrack"\n')
+    lines.append('alias jam_stdin "exec jam_stdin"\n')
+    lines.append('alias stdin "exec jam_stdin"\n')
+    lines.append('alias jam_help "exec jam_help"\n')
+    lines.append('alias jam "exec jam_help"\n')
+    lines.append('alias jam_stats "bind {relay} stats; jam_cmd; echo pyjam :: Run stdin to see the stats"\n'.format(
+        relay=relay_key
+    ))
+    lines.append('alias jam_cancel "bind {relay} cancel; jam_cmd"\n'.format(relay=relay_key))
+    if paged:
+        lines.extend('bind ' + track.bind + _track_command(x, track, relay_key)
+                     for x, track in enumerate(tracks) if track.bind)
+    else:
+        _render_track_aliases(lines, tracks, 0, relay_key, use_aliases, binds=True)
+    lines.append('voice_enable 1; voice_modenable 1\n')
+    lines.append('voice_forcemicrecord 0\n')
+    lines.append('voice_fadeouttime 0.0\n')
+    lines.append('con_enable 1; hideconsole; showconsole\n')
+    lines.append('echo "pyjam v{v} loaded.\n'.format(v=__version__))
+    lines.append('jam_help\n')
+    return ''.join(lines)
+
+
+def render_la(tracks):
+    """Render jam_la.cfg, the in-game track list.
+
+    Args:
+        tracks (list[Track]): The list of valid tracks.
+
+    Returns:
+        str: The contents of jam_la.cfg.
+    """
+    lines = ['exec "jam_curtrack"\n']
+    lines.extend('echo "{x}. {name}; Aliases: {aliases}{broken}"\n'.format(
+        x=x, name=track.name, aliases=track.aliases, broken=" (needs conversion)" if track.problems else ''
+    ) for x, track in enumerate(tracks))
+    return ''.join(lines)
+
+
+def render_la_index(num_tracks, page_size=PAGE_SIZE):
+    """Render jam_la.cfg for the paged layout. It only defines the page commands (la_1, la_2...).
+
+    Args:
+        num_tracks (int): The amount of tracks.
+        page_size (int): The amount of tracks per page.
+
+    Returns:
+        str: The contents of jam_la.cfg.
+    """
+    pages = _page_count(num_tracks, page_size)
+    lines = ['exec "jam_curtrack"\n']
+    lines.extend('alias la_{page} "exec jam_la_{page}"\n'.format(page=page) for page in range(1, pages + 1))
+    lines.append('echo "pyjam :: {num} tracks on {pages} pages of {size}"\n'.format(num=num_tracks, pages=pages,
+                                                                                   size=page_size))
+    lines.append('echo "Type la_1 to la_{pages} to list a page. Listing a page also loads its aliases."\n'.format(
+        pages=pages
+    ))
+    return ''.join(lines)
+
+
+def render_la_page(tracks, page, page_size=PAGE_SIZE):
+    """Render jam_la_N.cfg, a single page of the in-game track list. It also loads the aliases of the page.
+
+    Args:
+        tracks (list[Track]): The list of valid tracks.
+        page (int): The page number, starting at 1.
+        page_size (int): The amount of tracks per page.
+
+    Returns:
+        str: The contents of jam_la_N.cfg.
+    """
+    pages = _page_count(len(tracks), page_size)
+    start = (page - 1) * page_size
+    lines = ['exec "jam_alias_{page}"\n'.format(page=page)]
+    lines.extend('echo "{x}. {name}; Aliases: {aliases}{broken}"\n'.format(
+        x=x, name=track.name, aliases=track.aliases, broken=" (needs conversion)" if track.problems else ''
+    ) for x, track in enumerate(tracks[start:start + page_size], start))
+    lines.append('echo "pyjam :: Page {page} of {pages}{prev}{next}"\n'.format(
+        page=page, pages=pages, prev="; la_{0}: previous".format(page - 1) if page > 1 else '',
+        next="; la_{0}: next".format(page + 1) if page < pages else ''
+    ))
+    return ''.join(lines)
+
+
+def render_alias_page(tracks, page, page_size, relay_key, use_aliases):
+    """Render jam_alias_N.cfg, the aliases (index and words) of the tracks on a single page.
+
+    Args:
+        tracks (list[Track]): The list of valid tracks.
+        page (int): The page number, starting at 1.
+        page_size (int): The amount of tracks per page.
+        relay_key (str): The key used to interact with the game.
+        use_aliases (bool): Whether or not to use aliases
+
+    Returns:
+        str: The contents of jam_alias_N.cfg.
+    """
+    start = (page - 1) * page_size
+    lines = []
+    _render_track_aliases(lines, tracks[start:start + page_size], start, relay_key, use_aliases, binds=False)
+    return ''.join(lines)
+
+
+def page_of(position, num_tracks, page_size=PAGE_SIZE):
+    """Get the page a track is on.
+
+    Args:
+        position (int): The position of the track in the track list.
+        num_tracks (int): The amount of tracks.
+        page_size (int): The amount of tracks per page.
+
+    Returns:
+        int or None: The page number, starting at 1. None if the library is small enough to not be paged.
+    """
+    if num_tracks <= page_size:
+        return None
+    return position // page_size + 1
+
+
+def _page_count(num_tracks, page_size):
+    return (num_tracks + page_size - 1) // page_size
+
+
+def _track_command(x, track, relay_key):
+    # Every alias and bind of a track runs the same command.
+    return ' "bind {relay} {x}; echo Loaded: {name}; jam_cmd"\n'.format(relay=relay_key, x=x, name=track.name)
+
+
+def _render_track_aliases(lines, tracks, start, relay_key, use_aliases, binds):
+    for x, track in enumerate(tracks, start):
+        command = _track_command(x, track, relay_key)
+        lines.append('alias {x}'.format(x=x) + command)
+        if use_aliases:
+            lines.extend('alias ' + alias + command for alias in track.aliases)
+        if binds and track.bind:
+            lines.append('bind ' + track.bind + command)
+
+
+def render_help(play_key, relay_key):
+    """Render jam_help.cfg, the in-game help guide.
+
+    Args:
+        play_key (str): The key used to start/stop music.
+        relay_key (str): The key used to interact with the game.
+
+    Returns:
+        str: The contents of jam_help.cfg.
+    """
+    lines = []
+    lines.append('echo "pyjam song playing guide:"\n')
+    lines.append('echo "1. Use the \'la\' or \'jam_la\' commands for a list of your audio tracks"\n')
+    lines.append('echo "2. Type the number of the track OR one of its aliases and press enter"\n')
+    # jam_help.cfg isn't rewritten when the track list changes, so this has to hold whether the list is paged or not.
+    lines.append('echo "In big libraries, list the page of the track with la_N first. That loads its aliases."\n')
+    lines.append('echo "3. Press the \'{key}\' key to start or stop the music"\n'.format(key=play_key))
+    lines.append('echo\n')
+    lines.append('echo "pyjam common commands:"\n')
+    lines.append('echo "la, jam_la, jam_listaudio: list all tracks + their index and aliases"\n')
+    lines.append('echo "la_1, la_2, ...: list a page of tracks. Big libraries only, run la first to see the pages."\n')
+    lines.append('echo "jam_say, jam_saytrack: say the name of the song in all chat."\n')
+    lines.append('echo "jam_echotrack, jam_track: echo the name of the song in console."\n')
+    lines.append('echo "jam_help: view this help guide."\n')
+    lines.append('echo\n')
+    lines.append('echo "pyjam library search:"\n')
+    lines.append("echo \"1. Run the command `bind {relay} ''find: NAME OR ALIAS''`, then \'jam_cmd\'.\"\n".format(
+            relay=relay_key
+        ))
+    lines.append('echo "2. Run \'stdin\' or \'jam_stdin\' to see the best matches, then type a number to load it."\n')
+    lines.append('echo\n')
+    lines.append('echo "pyjam in-game downloader + converter guide:"\n')
+    lines.append('echo "Recommended only for advanced users. This may be difficult for some people."\n')
+    lines.append("echo \"1. Run the command `bind {relay} ''search: SEARCH TERM HERE''`.\"\n".format(relay=relay_key))
+    lines.append('echo "2. Now run the command \'jam_cmd\'. pyjam will then run the command."\n')
+    lines.append('echo "3. To get the results, run the commands \'stdin\' or \'jam_stdin\'."\n')
+    lines.append("echo \"4. Then, run the command `bind {relay} ''download: IDs HERE''`.\"\n".format(relay=relay_key))
+    lines.append('echo "The IDs of the videos should be separated with commas, like so: Dkm8Hteeh6M,MqgtVpD328o"\n')
+    lines.append('echo "5. Run the command \'jam_cmd\' again to get pyjam to read your command."\n')
+    lines.append('echo "6. To get periodic updates, run the commands \'stdin\' or \'jam_stdin\'."\n')
+    lines.append('echo "7. pyjam will reload after you run \'stdin\' or \'jam_stdin\' once conversion is complete."\n')
+    lines.append('echo "Run \'jam_cancel\' to cancel a search or download that is still running."\n')
+    lines.append('echo "NOTE: \'\' IS SUPPOSED TO REPRESENT A DOUBLE QUOTE!"\n')
+    lines.append('echo\n')
+    lines.append('echo "pyjam advanced commands:"\n')
+    lines.append('echo "stdin, jam_stdin: get output from search or downloader/converter."\n')
+    lines.append('echo "jam_stats: measure how long pyjam takes to load tracks (results in stdin)."\n')
+    lines.append('echo "jam_cmd: run a command (after setting the command with `bind`)"\n')
+    lines.append("echo \"bind {relay} ''command: arguments'': set a command\"\n".format(relay=relay_key))
+    lines.append('echo "commands: search, download, convert, find"\n')
+    return ''.join(lines)
+
+
+def publish(cfg_path, files):
+    """Write rendered cfg files, skipping the ones that are already up to date.
+    A file is only rewritten if its contents changed since pyjam last published it, or if something else wrote to it
+    in the meantime.
+
+    Args:
+        cfg_path (str): The game's cfg folder.
+        files (dict[str, str]): The contents of each cfg file, keyed by file name.
+
+    Returns:
+        list[str]: The names of the files that were written.
+    """
+    written = []
+    for name, text in files.items():
+        path = get_path(cfg_path, name)
+        digest = hashlib.sha1(text.encode('utf-8')).hexdigest()
+        with _published_lock:
+            previous = _published.get(path)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                stat = None
+            if previous is not None and stat is not None and previous == (digest, _mtime(stat), stat.st_size):
+                continue
+
+            atomic_write(path, text, sync=False)
+            stat = os.stat(path)
+            _published[path] = (digest, _mtime(stat), stat.st_size)
+        written.append(name)
+
+    logger.info("Published {written} in {path} ({skipped} unchanged)".format(
+        written=', '.join(written) or 'nothing', path=cfg_path, skipped=len(files) - len(written)
+    ))
+    return written
+
+
+def prune(cfg_path, files=()):
+    """Remove the page files (jam_la_N.cfg, jam_alias_N.cfg) that aren't part of the current layout.
+
+    Args:
+        cfg_path (str): The game's cfg folder.
+        files (iterable[str]): The names of the files that should be kept.
+
+    Returns:
+        list[str]: The names of the files that were removed.
+    """
+    keep = set(files)
+    removed = []
+    for pattern in PAGE_FILES:
+        for path in glob.glob(get_path(cfg_path, pattern)):
+            name = os.path.basename(path)
+            if name in keep:
+                continue
+            try:
+                os.remove(path)
+            except OSError:
+                logger.exception("Could not remove {path}".format(path=path))
+                continue
+            with _published_lock:
+                _published.pop(get_path(cfg_path, name), None)
+            removed.append(name)
+    if removed:
+        logger.info("Removed {num} old page file(s) from {path}".format(num=len(removed), path=cfg_path))
+    return removed
+
+
+def _mtime(stat):
+    # Nanoseconds where available, plenty of writes happen within the same second.
+    return getattr(stat, 'st_mtime_ns', stat.st_mtime)
@@ -0,0 +1,223 @@
+# Copyright (C) 10se1ucgo 2016
+#
+# This file is part of pyjam.
+#
+# pyjam is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# pyjam is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with pyjam.  If not, see <http://www.gnu.org/licenses/>.
+
+# Low level RIFF/WAVE handling that works on chunks directly, without loading the audio like the wave module does.
+from __future__ import division
+import collections
+import hashlib
+import logging
+import os
+import struct
+
+__all__ = ['WAVE_FORMAT_PCM', 'WAVE_FORMAT_EXTENSIBLE', 'KEEP_CHUNKS', 'RiffError', 'WavInfo', 'read_wav_info',
+           'hash_wav_data', 'strip_chunks']
+logger = logging.getLogger(__name__)
+WAVE_FORMAT_PCM = 0x0001
+WAVE_FORMAT_EXTENSIBLE = 0xFFFE
+KEEP_CHUNKS = (b'fmt ', b'data')  # Everything else (LIST/INFO, id3, ...) is only metadata the game doesn't need.
+MAX_CHUNK_SIZE = 0xFFFFFFFF
+
+
+class RiffError(ValueError):
+    pass
+
+
+class WavInfo(collections.namedtuple('WavInfo', ['format_tag', 'channels', 'rate', 'bits', 'data_offset',
+                                                 'data_size'])):
+    """
+    The format of a WAV file, and where its audio data is.
+    """
+    __slots__ = ()
+
+    @property
+    def duration(self):
+        """float: The length of the audio in seconds."""
+        block_align = self.channels * self.bits // 8
+        if not block_align or not self.rate:
+            return 0.0
+        return self.data_size / block_align / self.rate
+
+    @property
+    def is_s16le(self):
+        """bool: Whether or not the audio is plain 16 bit PCM, the only format the Source Engine can play."""
+        return self.format_tag == WAVE_FORMAT_PCM and self.bits == 16
+
+
+def read_chunk_header(f):
+    """Read a chunk header from a RIFF file.
+
+    Args:
+        f (file): The file, positioned at the start of a chunk.
+
+    Returns:
+        tuple[bytes, int] or None: The chunk ID and size. None at the end of the file.
+    """
+    header = f.read(8)
+    if len(header) < 8:
+        return None
+    return struct.unpack('<4sI', header)
+
+
+def read_wav_info(path):
+    """Get the format of a WAV file from its "fmt " and "data" chunk headers.
+
+    Args:
+        path (str): Path to the WAV file.
+
+    Returns:
+        WavInfo: The format of the file.
+
+    Raises:
+        RiffError: If the file is not a valid WAV file.
+        OSError: If the file could not be read.
+    """
+    file_size = os.path.getsize(path)
+    with open(path, 'rb') as f:
+        riff, _, wave = struct.unpack('<4sI4s', f.read(12).ljust(12, b'\0'))
+        if riff != b'RIFF' or wave != b'WAVE':
+            raise RiffError("{path} is not a RIFF/WAVE file".format(path=path))
+
+        fmt = None
+        while True:
+            header = read_chunk_header(f)
+            if header is None:
+                raise RiffError("{path} has no {chunk} chunk".format(path=path, chunk='data' if fmt else 'fmt '))
+            chunk_id, size = header
+            if chunk_id == b'fmt ':
+                data = f.read(size)
+                if len(data) < 16:
+                    raise RiffError("{path} has a truncated fmt chunk".format(path=path))
+                format_tag, channels, rate, _, _, bits = struct.unpack('<HHIIHH', data[:16])
+                if format_tag == WAVE_FORMAT_EXTENSIBLE and len(data) >= 26:
+                    # The real format tag is the first two bytes of the SubFormat GUID.
+                    format_tag = struct.unpack('<H', data[24:26])[0]
+                fmt = (format_tag, channels, rate, bits)
+                f.seek(size % 2, os.SEEK_CUR)
+            elif chunk_id == b'data':
+                if fmt is None:
+                    raise RiffError("{path} has a data chunk before its fmt chunk".format(path=path))
+                offset = f.tell()
+                # Streamed writers leave the size as 0 or 0xFFFFFFFF, so never trust it beyond the end of the file.
+                if not size or offset + size > file_size:
+                    size = file_size - offset
+                return WavInfo(*(fmt + (offset, size)))
+            else:
+                f.seek(size + size % 2, os.SEEK_CUR)
+
+
+def hash_wav_data(path, chunk_size=1024 * 1024):
+    """Hash the audio data of a WAV file, ignoring its header and any metadata chunks.
+
+    Args:
+        path (str): Path to the WAV file.
+        chunk_size (int): How much to read at a time, in bytes.
+
+    Returns:
+        str: The SHA-1 hex digest of the "data" chunk.
+
+    Raises:
+        RiffError: If the file is not a valid WAV file.
+        OSError: If the file could not be read.
+    """
+    info = read_wav_info(path)
+    digest = hashlib.sha1()
+    remaining = info.data_size
+    with open(path, 'rb') as f:
+        f.seek(info.data_offset)
+        while remaining > 0:
+            chunk = f.read(min(chunk_size, remaining))
+            if not chunk:
+                break
+            digest.update(chunk)
+            remaining -= len(chunk)
+    return digest.hexdigest()
+
+
+def strip_chunks(path, keep=KEEP_CHUNKS, block_size=1024 * 1024):
+    """Remove every chunk that isn't in `keep` from a RIFF/WAVE file, in place.
+    Only the chunk headers are parsed. The chunks that are kept are moved towards the start of the file in blocks of
+    at most `block_size` bytes, then the file is truncated and its RIFF size is patched. Nothing is rewritten if there
+    is nothing to remove, and a chunk that is already where it belongs is never touched.
+    The file is corrupt if this is interrupted half way through, so only use it on files that can be made again.
+
+    Args:
+        path (str): Path to the WAV file.
+        keep (iterable[bytes]): The IDs of the chunks to keep. Note the space in "fmt ".
+        block_size (int): The most audio to hold in memory at a time, in bytes.
+
+    Returns:
+        int: How many bytes were removed.
+
+    Raises:
+        RiffError: If the file is not a valid RIFF/WAVE file.
+        OSError: If the file could not be read or written.
+    """
+    keep = frozenset(keep)
+    file_size = os.path.getsize(path)
+    with open(path, 'r+b') as f:
+        riff, riff_size, wave = struct.unpack('<4sI4s', f.read(12).ljust(12, b'\0'))
+        if riff != b'RIFF' or wave != b'WAVE':
+            raise RiffError("{path} is not a RIFF/WAVE file".format(path=path))
+
+        chunks = []  # (ID, offset of the header, size, size as written in the header)
+        offset = 12
+        while offset + 8 <= file_size:
+            f.seek(offset)
+            chunk_id, size = read_chunk_header(f)
+            written = size
+            if offset + 8 + size > file_size or (chunk_id == b'data' and not size):
+                # Streamed writers leave the data size as 0 or 0xFFFFFFFF, and the last chunk can be cut short.
+                size = file_size - offset - 8
+            chunks.append((chunk_id, offset, size, written))
+            offset += 8 + size + size % 2
+        chunks = [chunk for chunk in chunks if chunk[0] in keep]
+
+        end = 12
+        for chunk_id, offset, size, written in chunks:
+            length = 8 + size + size % 2
+            if offset != end:
+                _move(f, offset, end, min(length, file_size - offset), block_size)
+            if size != written and size <= MAX_CHUNK_SIZE:
+                f.seek(end + 4)
+                f.write(struct.pack('<I', size))
+            end += length
+        end = min(end, file_size)  # A cut off odd sized last chunk has no pad byte.
+
+        if end < file_size:
+            f.truncate(end)
+        if end - 8 != riff_size and end - 8 <= MAX_CHUNK_SIZE:
+            f.seek(4)
+            f.write(struct.pack('<I', end - 8))
+
+    if end < file_size:
+        logger.debug("Stripped {num} bytes of chunks from {path}".format(num=file_size - end, path=path))
+    return file_size - end
+
+
+def _move(f, src, dest, length, block_size):
+    # Chunks only ever move towards the start of the file, so copying front to back never overwrites unread data.
+    buf = bytearray(min(block_size, length))
+    view = memoryview(buf)
+    done = 0
+    while done < length:
+        f.seek(src + done)
+        read = f.readinto(view[:min(block_size, length - done)])
+        if not read:
+            break
+        f.seek(dest + done)
+        f.write(view[:read])
+        done += read
@@ -0,0 +1,111 @@
+# Copyright (C) 10se1ucgo 2016
+#
+# This file is part of pyjam.
+#
+# pyjam is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# pyjam is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with pyjam.  If not, see <http://www.gnu.org/licenses/>.
+
+# Finds track files. Every directory listing is a network round trip on NFS/SMB shares, so subdirectories are
+# listed concurrently and the stat info that comes with the directory entries is reused wherever possible.
+import collections
+import logging
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+try:
+    from os import scandir
+except ImportError:
+    from scandir import scandir
+
+from .common import get_path
+
+__all__ = ['SCAN_WORKERS', 'scan_dir', 'scan_tree', 'scan_roots']
+logger = logging.getLogger(__name__)
+SCAN_WORKERS = 8
+
+
+def scan_dir(path, extension='.wav'):
+    """List a single directory.
+
+    Args:
+        path (str): The directory to list.
+        extension (str): Only files ending with this extension (case insensitive) are returned.
+
+    Returns:
+        tuple[list[tuple[str, float, int]], list[str]]: (path, mtime, size) of every matching file,
+            and the paths of every subdirectory.
+    """
+    files = []
+    dirs = []
+    try:
+        entries = scandir(path)
+    except OSError:
+        logger.exception("Could not list {path}".format(path=path))
+        return files, dirs
+
+    for entry in entries:
+        try:
+            # Don't follow symlinked directories, a link back up the tree would never finish.
+            if entry.is_dir(follow_symlinks=False):
+                dirs.append(entry.path)
+            elif entry.is_file() and entry.name.lower().endswith(extension):
+                stat = entry.stat()
+                files.append((get_path(entry.path), stat.st_mtime, stat.st_size))
+        except OSError:
+            logger.exception("Could not stat {path}".format(path=entry.path))
+    return files, dirs
+
+
+def scan_tree(root, pool, extension='.wav'):
+    """Recursively find every matching file under a directory, listing subdirectories in parallel.
+
+    Args:
+        root (str): The directory to scan.
+        pool (concurrent.futures.Executor): The pool to list directories with.
+        extension (str): Only files ending with this extension (case insensitive) are returned.
+
+    Returns:
+        list[tuple[str, float, int]]: (path, mtime, size) of every matching file, sorted by path.
+    """
+    files = []
+    pending = {pool.submit(scan_dir, root, extension)}
+    while pending:
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            found, dirs = future.result()
+            files.extend(found)
+            pending.update(pool.submit(scan_dir, path, extension) for path in dirs)
+    # Listing order depends on the filesystem and on which listing finished first.
+    files.sort(key=lambda file: file[0].lower())
+    return files
+
+
+def scan_roots(roots, extension='.wav', max_workers=SCAN_WORKERS):
+    """Scan several audio folders at once.
+
+    Args:
+        roots (list[str]): The directories to scan. Duplicates are only scanned once.
+        extension (str): Only files ending with this extension (case insensitive) are returned.
+        max_workers (int): The maximum amount of directories listed at the same time.
+
+    Returns:
+        collections.OrderedDict[str, list[tuple[str, float, int]]]: The files found in each root, in the order the
+            roots were given.
+    """
+    results = collections.OrderedDict((get_path(root), None) for root in roots)
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        for root in results:
+            results[root] = scan_tree(root, pool, extension)
+    logger.info("Scanned {roots}, found {total} files".format(
+        roots=list(results), total=sum(len(files) for files in results.values())
+    ))
+    return results
@@ -0,0 +1,275 @@
+# Copyright (C) 10se1ucgo 2016
+#
+# This file is part of pyjam.
+#
+# pyjam is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# pyjam is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with pyjam.  If not, see <http://www.gnu.org/licenses/>.
+
+# Local library search. Track names and aliases are broken up into trigrams once, when the track list is built,
+# so a lookup only has to touch the tracks that share at least one trigram with the query.
+# Trigrams that a lot of tracks have (" th", "the", "he ", ...) are kept as bitmasks (Python ints, one bit per track)
+# instead of lists of positions. Candidates come from merging the posting lists of the rare trigrams, and the bitmasks
+# are only counted over in full when those lists can't account for enough of the best matches.
+from __future__ import division
+import binascii
+import collections
+import itertools
+import logging
+
+import unidecode
+
+__all__ = ['SearchResult', 'TrackSearchIndex', 'search_text', 'trigrams']
+logger = logging.getLogger(__name__)
+# Only this many candidates per requested result (the ones sharing the most trigrams) are scored properly.
+CANDIDATE_FACTOR = 20
+# A trigram gets a bitmask once at least 1 in MASK_RATIO tracks have it. A bitmask takes 1 bit per track and a list
+# 8 bytes (one pointer) per entry, so from there on the bitmask is never the bigger one.
+MASK_RATIO = 64
+
+# score is between 0 and 1, higher is better. position is the track's position in the track list.
+SearchResult = collections.namedtuple('SearchResult', ['score', 'position', 'track'])
+
+
+def trigrams(text):
+    """Break a piece of text up into trigrams.
+    Every word is padded with spaces, so short words and the start and end of words still produce trigrams.
+
+    Args:
+        text (str): The (filtered) text.
+
+    Returns:
+        set[str]: The trigrams.
+    """
+    grams = set()
+    for word in text.split():
+        word = ' {word} '.format(word=word)
+        grams.update(word[i:i + 3] for i in range(len(word) - 2))
+    return grams
+
+
+def search_text(text):
+    """Normalize a track name or a query for searching.
+    Unlike filter_alias, digits are kept, so "blink 182" can be found by "182".
+
+    Args:
+        text (str): The text.
+
+    Returns:
+        str: The lowercase, transliterated text, with anything that isn't a letter or a digit turned into a space.
+    """
+    filtered = []
+    for char in unidecode.unidecode(text):
+        if char.isalnum() or char.isspace():
+            filtered.append(char.lower())
+        elif char != "'" and char != '"':
+            filtered.append(' ')
+    return ''.join(filtered).strip()
+
+
+class TrackSearchIndex(object):
+    """
+    A trigram index over the names and aliases of a track list.
+    """
+    def __init__(self, tracks):
+        """
+        Args:
+            tracks (list[Track]): The Tracks to index.
+        """
+        self.tracks = tracks
+        postings = collections.defaultdict(list)
+        self._texts = []
+        self._sizes = []
+        for position, track in enumerate(tracks):
+            text = self._track_text(track)
+            grams = trigrams(text)
+            for gram in grams:
+                postings[gram].append(position)
+            self._texts.append(text)
+            self._sizes.append(len(grams))
+
+        threshold = max(len(tracks) // MASK_RATIO, 1)
+        self._masks = {gram: _to_mask(positions) for gram, positions in postings.items() if len(positions) >= threshold}
+        # A plain dict is smaller, and a lookup for a missing trigram shouldn't add it.
+        self._postings = {gram: positions for gram, positions in postings.items() if gram not in self._masks}
+
+    @staticmethod
+    def _track_text(track):
+        return ' '.join([search_text(track.name)] + track.aliases)
+
+    def reindex(self, position):
+        """Update the index after a track's name or aliases changed in place.
+
+        Args:
+            position (int): The position of the track in the track list.
+
+        Returns:
+            None
+        """
+        text = self._track_text(self.tracks[position])
+        old_grams = trigrams(self._texts[position])
+        new_grams = trigrams(text)
+        for gram in old_grams - new_grams:
+            if gram in self._masks:
+                self._masks[gram] &= ~(1 << position)
+                if not self._masks[gram]:
+                    del self._masks[gram]
+                continue
+            self._postings[gram].remove(position)
+            if not self._postings[gram]:
+                del self._postings[gram]
+        for gram in new_grams - old_grams:
+            if gram in self._masks:
+                self._masks[gram] |= 1 << position
+            else:
+                self._postings.setdefault(gram, []).append(position)
+        self._texts[position] = text
+        self._sizes[position] = len(new_grams)
+
+    def search(self, query, limit=10):
+        """Find the tracks that best match a query.
+
+        Args:
+            query (str): The search query.
+            limit (int): The maximum amount of results.
+
+        Returns:
+            list[SearchResult]: The best matches, best first.
+        """
+        query = search_text(query)
+        query_grams = trigrams(query)
+        if not query_grams:
+            return []
+
+        rare = [positions for positions in map(self._postings.get, query_grams) if positions]
+        common = [mask for mask in map(self._masks.get, query_grams) if mask]
+        candidates = _candidates(rare, common, limit * CANDIDATE_FACTOR)
+
+        ranked = []
+        for position, shared in candidates:
+            # Half of the Dice coefficient of the two trigram sets (2 * shared / (a + b)), so long names don't win
+            # just by containing more trigrams. Halving it keeps it below the bonus for exact substrings.
+            score = shared / (len(query_grams) + self._sizes[position])
+            if query in self._texts[position]:
+                # Exact substrings (whole words, or a prefix of an alias) always rank above fuzzy matches.
+                score += 0.5
+            ranked.append((-score, position))
+        ranked.sort()
+        return [SearchResult(-score, position, self.tracks[position]) for score, position in ranked[:limit]]
+
+    def __len__(self):
+        return len(self.tracks)
+
+    def __repr__(self):
+        return "{c}(tracks={num}, trigrams={grams})".format(c=self.__class__, num=len(self),
+                                                            grams=len(self._postings) + len(self._masks))
+
+
+def _candidates(rare, common, cap):
+    # The `cap` tracks sharing the most trigrams with the query, as (position, shared) pairs. The posting lists of the
+    # rare trigrams are merged first, so the tracks in all of them (their intersection) come first. Only those are
+    # looked up in the bitmasks of the common trigrams, most rare trigrams first, until the rest can't make the cut.
+    # The bitmasks are only counted over in full when tracks without any rare trigram could make it too.
+    num_common = len(common)
+    rare_shared = collections.Counter(itertools.chain.from_iterable(rare))
+    if not common:
+        return sorted(rare_shared.items(), key=lambda item: (-item[1], item[0]))[:cap]
+    bitmaps = [_to_bytes(mask) for mask in common] if rare_shared else []
+    shared = {}
+    tally = [0] * (len(rare) + num_common + 1)  # How many of the candidates share each amount of trigrams.
+    previous = None
+    for position, count in rare_shared.most_common():
+        if count != previous:
+            previous = count
+            if count + num_common < _cutoff(tally, cap):
+                break
+        byte, bit = position >> 3, position & 7
+        for bitmap in bitmaps:
+            if byte < len(bitmap):
+                count += bitmap[byte] >> bit & 1
+        shared[position] = count
+        tally[count] += 1
+
+    if sum(tally[num_common + 1:]) < cap:
+        # How many of the common trigrams every track has, as a binary number spread over bitmasks: bit i of a
+        # track's count is its bit in counts[i].
+        counts = []
+        for mask in common:
+            _add_mask(counts, mask)
+        for count in range(min(num_common, 2 ** len(counts) - 1), 0, -1):
+            found = sum(tally[count:])
+            if found >= cap:
+                break
+            for position in _positions(_count_equals(counts, count)):
+                if position in rare_shared:
+                    continue  # Already counted, or it was left out because it can't make the cut.
+                shared[position] = count
+                tally[count] += 1
+                found += 1
+                if found >= cap:
+                    break
+
+    return sorted(shared.items(), key=lambda item: (-item[1], item[0]))[:cap]
+
+
+def _cutoff(tally, cap):
+    # The least amount of shared trigrams among the best `cap` candidates so far, 0 if there aren't `cap` of them yet.
+    found = 0
+    for count in range(len(tally) - 1, 0, -1):
+        found += tally[count]
+        if found >= cap:
+            return count
+    return 0
+
+
+def _to_mask(positions):
+    bits = bytearray(max(positions) // 8 + 1)
+    for position in positions:
+        bits[position >> 3] |= 1 << (position & 7)
+    bits.reverse()  # Big endian, for hexlify. int.from_bytes is Python 3 only.
+    return int(binascii.hexlify(bytes(bits)), 16)
+
+
+def _to_bytes(mask):
+    # Bit n of the mask is bit n % 8 of byte n // 8, so a single track can be looked up without shifting the whole int.
+    hexed = '{0:x}'.format(mask)
+    bits = bytearray(binascii.unhexlify('0' + hexed if len(hexed) % 2 else hexed))
+    bits.reverse()
+    return bits
+
+
+def _add_mask(counts, mask):
+    # Add 1 to the count of every track in `mask`, a ripple carry adder over all of the tracks at once.
+    carry = mask
+    for i, bits in enumerate(counts):
+        counts[i], carry = bits ^ carry, bits & carry
+        if not carry:
+            return
+    counts.append(carry)
+
+
+def _count_equals(counts, count):
+    # The tracks whose count is exactly `count`. ~bits has an infinite amount of leading ones, but every count has at
+    # least one bit set, and AND-ing with a plain mask gets rid of them.
+    mask = -1
+    for i, bits in enumerate(counts):
+        mask &= bits if count >> i & 1 else ~bits
+    return mask
+
+
+def _positions(mask):
+    # The positions of the set bits, lowest first.
+    bits = bin(mask)[:1:-1]
+    position = bits.find('1')
+    while position != -1:
+        yield position
+        position = bits.find('1', position + 1)
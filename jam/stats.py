@@ -0,0 +1,130 @@
+# Copyright (C) 10se1ucgo 2016
+#
+# This file is part of pyjam.
+#
+# pyjam is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# pyjam is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with pyjam.  If not, see <http://www.gnu.org/licenses/>.
+
+# Latency bookkeeping for the in-game relay loop (jam_cmd.cfg written -> voice_input.wav ready).
+import collections
+import contextlib
+import logging
+import threading
+import time
+
+__all__ = ['SPANS', 'LatencyStats', 'timer', 'percentile']
+logger = logging.getLogger(__name__)
+timer = getattr(time, 'perf_counter', time.time)  # Python 2 doesn't have perf_counter.
+
+# The spans Jam records, in the order they happen. Anything else is listed after these.
+SPANS = collections.OrderedDict([
+    ('notify', "jam_cmd.cfg written -> event received"),
+    ('parse', "jam_cmd.cfg parsed"),
+    ('copy', "track staged as voice_input.wav"),
+    ('cfg', "track cfgs written"),
+    ('command', "command handled"),
+    ('total', "event received -> done"),
+])
+
+
+def percentile(values, fraction):
+    """Get a percentile of some values, using the nearest rank.
+
+    Args:
+        values (list[float]): The values, sorted.
+        fraction (float): The percentile, from 0 to 1.
+
+    Returns:
+        float: The value at that percentile.
+    """
+    if not values:
+        return 0.0
+    rank = max(int(round(fraction * len(values) + 0.5)) - 1, 0)
+    return values[min(rank, len(values) - 1)]
+
+
+class LatencyStats(object):
+    """
+    Rolling latency samples for a set of named spans.
+    """
+    def __init__(self, size=1000):
+        """
+        Args:
+            size (int): How many of the latest samples to keep for each span.
+        """
+        self.size = size
+        self._samples = collections.defaultdict(lambda: collections.deque(maxlen=self.size))
+        self._lock = threading.Lock()
+
+    def record(self, name, seconds):
+        """Record a single sample.
+
+        Args:
+            name (str): The name of the span.
+            seconds (float): How long it took.
+
+        Returns:
+            None
+        """
+        with self._lock:
+            self._samples[name].append(seconds)
+
+    @contextlib.contextmanager
+    def span(self, name):
+        """Time a block of code and record it as a sample.
+
+        Args:
+            name (str): The name of the span.
+
+        Returns:
+            contextmanager: The context manager.
+        """
+        start = timer()
+        try:
+            yield
+        finally:
+            self.record(name, timer() - start)
+
+    def histogram(self):
+        """Get the latency percentiles of every span.
+
+        Returns:
+            collections.OrderedDict[str, dict]: For every span: count, p50, p95, p99 and max, in seconds.
+        """
+        with self._lock:
+            samples = {name: sorted(values) for name, values in self._samples.items() if values}
+        names = [name for name in SPANS if name in samples] + sorted(set(samples) - set(SPANS))
+        return collections.OrderedDict((name, {
+            'count': len(samples[name]), 'p50': percentile(samples[name], 0.50),
+            'p95': percentile(samples[name], 0.95), 'p99': percentile(samples[name], 0.99), 'max': samples[name][-1]
+        }) for name in names)
+
+    def summary(self):
+        """Format the histogram for humans.
+
+        Returns:
+            list[str]: One line per span, times in milliseconds.
+        """
+        histogram = self.histogram()
+        if not histogram:
+            return ["No samples yet."]
+        return ["{name:<8} p50 {p50:8.2f}  p95 {p95:8.2f}  p99 {p99:8.2f}  max {max:8.2f}  n={count}".format(
+            name=name, count=values['count'], **{key: values[key] * 1000 for key in ('p50', 'p95', 'p99', 'max')}
+        ) for name, values in histogram.items()]
+
+    def clear(self):
+        with self._lock:
+            self._samples.clear()
+
+    def __repr__(self):
+        return "{c}(size={size})".format(c=self.__class__, size=self.size)
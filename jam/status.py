@@ -0,0 +1,146 @@
+# Copyright (C) 10se1ucgo 2016
+#
+# This file is part of pyjam.
+#
+# pyjam is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# pyjam is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with pyjam.  If not, see <http://www.gnu.org/licenses/>.
+
+# jam_stdin.cfg, the only way pyjam can talk back to the player in-game (they run `stdin` to read it).
+from __future__ import division
+import collections
+import logging
+import threading
+import time
+
+from .common import atomic_write, wrap_exceptions
+
+__all__ = ['MAX_RATE', 'HISTORY_SIZE', 'StatusMessage', 'StatusWriter']
+logger = logging.getLogger(__name__)
+MAX_RATE = 4.0  # Progress updates per second.
+HISTORY_SIZE = 5
+
+# commands are raw cfg lines (e.g. exec jam) that are only kept while the message is the newest one.
+StatusMessage = collections.namedtuple('StatusMessage', ['title', 'lines', 'commands', 'progress'])
+
+
+class StatusWriter(object):
+    """
+    Publishes messages to jam_stdin.cfg atomically, with a few of the previous messages above the newest one.
+    Progress updates replace each other and are written at most `max_rate` times per second.
+    """
+    def __init__(self, path, max_rate=MAX_RATE, size=HISTORY_SIZE):
+        """
+        Args:
+            path (str): Path to jam_stdin.cfg.
+            max_rate (float): The most progress updates written per second.
+            size (int): How many messages to show.
+        """
+        self.path = path
+        self.max_rate = max_rate
+        self.published = 0
+        self.coalesced = 0
+        self._messages = collections.deque(maxlen=size)
+        self._lock = threading.Lock()
+        self._timer = None
+        self._last_write = 0.0
+        self._closed = False
+
+    def post(self, title, lines=(), commands=(), progress=False):
+        """Show a message in-game.
+
+        Args:
+            title (str): The heading of the message, e.g. "PYJAM DOWNLOADER".
+            lines (iterable[str]): The lines of the message.
+            commands (iterable[str]): Cfg commands to run along with it, as long as it's the newest message.
+            progress (bool): If True, the message replaces the previous progress message with the same title, and
+                is written later if the last write was less than 1 / max_rate seconds ago.
+
+        Returns:
+            None
+        """
+        message = StatusMessage(title, tuple(lines), tuple(commands), progress)
+        with self._lock:
+            if self._closed:
+                return
+            if progress and self._messages and self._messages[-1].progress and self._messages[-1].title == title:
+                self._messages[-1] = message
+            else:
+                self._messages.append(message)
+
+            wait = self._last_write + 1 / self.max_rate - time.time() if progress else 0
+            if wait > 0:
+                if self._timer is None:
+                    self._timer = threading.Timer(wait, self.flush)
+                    self._timer.daemon = True
+                    self._timer.start()
+                else:
+                    self.coalesced += 1
+                return
+        self.flush()
+
+    @wrap_exceptions
+    def flush(self):
+        """Write every pending message right away.
+
+        Returns:
+            None
+        """
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            if self._closed:
+                return
+            text = self.render()
+            atomic_write(self.path, text, sync=False)
+            self._last_write = time.time()
+            self.published += 1
+
+    def render(self):
+        """Render jam_stdin.cfg, oldest message first so that the newest one ends up right above the prompt.
+
+        Returns:
+            str: The contents of jam_stdin.cfg.
+        """
+        out = []
+        for message in self._messages:
+            if out:
+                out.append('echo\n')
+            out.append('echo "{title}"\n'.format(title=_escape(message.title)))
+            out.append('echo "{line}"\n'.format(line='-' * len(message.title)))
+            out.extend('echo "{line}"\n'.format(line=_escape(line)) for line in message.lines)
+        if self._messages:
+            out.extend(command + '\n' for command in self._messages[-1].commands)
+        return ''.join(out)
+
+    def close(self):
+        """Drop every pending message and ignore the ones posted afterwards, so a command that is still running can't
+        write jam_stdin.cfg again once pyjam has removed it.
+
+        Returns:
+            None
+        """
+        with self._lock:
+            self._closed = True
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            self._messages.clear()
+
+    def __repr__(self):
+        return "{c}(file={file}, messages={num})".format(c=self.__class__, file=self.path, num=len(self._messages))
+
+
+def _escape(line):
+    # The console can't escape quotes inside a quoted string.
+    return line.replace('"', "'")
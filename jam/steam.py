@@ -0,0 +1,230 @@
+# Copyright (C) 10se1ucgo 2016
+#
+# This file is part of pyjam.
+#
+# pyjam is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# pyjam is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with pyjam.  If not, see <http://www.gnu.org/licenses/>.
+
+# Finds where a game keeps its per-account cfg files (the ones host_writeconfig writes to), from Steam's own
+# bookkeeping: the accounts in config/loginusers.vdf, and the app ids in steam_appid.txt or appmanifest_*.acf.
+import glob
+import logging
+import os
+import re
+
+from .common import get_path
+
+try:
+    FileNotFoundError  # This will throw a NameError if the user is using Python 2.
+except NameError:
+    FileNotFoundError = IOError
+
+__all__ = ['STEAM_ID64_BASE', 'parse_vdf', 'read_vdf', 'get_active_account', 'get_library_folders', 'get_app_id',
+           'get_cfg_dir', 'get_watch_dir', 'get_watch_pattern']
+logger = logging.getLogger(__name__)
+# userdata folders are named after the 32 bit account ID, loginusers.vdf uses 64 bit Steam IDs.
+STEAM_ID64_BASE = 76561197960265728
+VDF_TOKEN = re.compile(r'"((?:[^"\\]|\\.)*)"|([{}])')
+
+
+def parse_vdf(text):
+    """Parse Valve's KeyValues text format (as used by .vdf and .acf files).
+    Only what Steam's own files need is supported: quoted keys and values, and nested sections.
+
+    Args:
+        text (str): The file contents.
+
+    Returns:
+        dict: The parsed sections. Keys are lowercased, since Steam isn't consistent about their case.
+    """
+    root = {}
+    stack = [root]
+    key = None
+    for quoted, brace in (match.groups() for match in VDF_TOKEN.finditer(text)):
+        if brace == '{':
+            section = {}
+            stack[-1][key if key is not None else ''] = section
+            stack.append(section)
+            key = None
+        elif brace == '}':
+            if len(stack) > 1:
+                stack.pop()
+            key = None
+        elif key is None:
+            key = quoted.lower()
+        else:
+            stack[-1][key] = quoted.replace('\\\\', '\\')
+            key = None
+    return root
+
+
+def read_vdf(path):
+    """Read and parse a KeyValues file.
+
+    Args:
+        path (str): Path to the file.
+
+    Returns:
+        dict or None: The parsed file. None if it couldn't be read.
+    """
+    try:
+        with open(path) as f:
+            return parse_vdf(f.read())
+    except (FileNotFoundError, OSError, UnicodeError):
+        logger.debug("Could not read {path}".format(path=path))
+        return None
+
+
+def get_active_account(steam_path):
+    """Get the account that is (or was most recently) logged in to Steam.
+
+    Args:
+        steam_path (str): Path to Steam.
+
+    Returns:
+        str or None: The account ID, as used for the userdata folders. None if it can't be determined.
+    """
+    users = (read_vdf(get_path(steam_path, 'config/loginusers.vdf')) or {}).get('users', {})
+    accounts = []
+    for steam_id, user in users.items():
+        if not steam_id.isdigit() or not isinstance(user, dict):
+            continue
+        try:
+            timestamp = int(user.get('timestamp', 0))
+        except ValueError:
+            timestamp = 0
+        accounts.append((user.get('mostrecent') == '1', timestamp, str(int(steam_id) - STEAM_ID64_BASE)))
+
+    if not accounts:
+        # No (readable) loginusers.vdf, but there's no guessing needed if only one account ever used this Steam.
+        user_data = get_path(steam_path, 'userdata')
+        try:
+            folders = [name for name in os.listdir(user_data) if name.isdigit() and name != '0']
+        except OSError:
+            return None
+        return folders[0] if len(folders) == 1 else None
+    return max(accounts)[2]
+
+
+def get_library_folders(steam_path):
+    """Get every Steam library folder.
+
+    Args:
+        steam_path (str): Path to Steam.
+
+    Returns:
+        list[str]: Paths to the steamapps folders, starting with Steam's own.
+    """
+    folders = [get_path(steam_path, 'steamapps')]
+    libraries = read_vdf(get_path(steam_path, 'steamapps/libraryfolders.vdf')) or {}
+    for key, value in libraries.get('libraryfolders', {}).items():
+        if not key.isdigit():
+            continue
+        # Newer Steam versions have a section per library, older ones just the path.
+        path = value.get('path') if isinstance(value, dict) else value
+        if path:
+            folders.append(get_path(path, 'steamapps'))
+    return folders
+
+
+def get_app_id(mod_path, steam_path):
+    """Get the app ID of a game.
+
+    Args:
+        mod_path (str): The mod path of the game (e.g. .../Counter-Strike Global Offensive/csgo).
+        steam_path (str): Path to Steam.
+
+    Returns:
+        str or None: The app ID. None if it can't be determined.
+    """
+    mod_path = os.path.abspath(mod_path)
+    game_path = os.path.dirname(mod_path)
+    for path in (mod_path, game_path):
+        try:
+            with open(get_path(path, 'steam_appid.txt')) as f:
+                app_id = f.read().strip()
+        except (FileNotFoundError, OSError):
+            continue
+        if app_id.isdigit():
+            return app_id
+
+    # The game folder is steamapps/common/<installdir>, and the manifests say which app has which installdir.
+    install_dir = os.path.basename(game_path).lower()
+    for library in get_library_folders(steam_path):
+        for manifest_path in glob.glob(get_path(library, 'appmanifest_*.acf')):
+            manifest = (read_vdf(manifest_path) or {}).get('appstate', {})
+            if manifest.get('installdir', '').lower() == install_dir and manifest.get('appid', '').isdigit():
+                return manifest['appid']
+    return None
+
+
+def get_cfg_dir(steam_path, mod_path):
+    """Get the folder host_writeconfig writes to for the active account.
+
+    Args:
+        steam_path (str): Path to Steam.
+        mod_path (str): The mod path of the game.
+
+    Returns:
+        str or None: The folder (userdata/<account>/<app id>/local/cfg). None if it can't be determined.
+    """
+    account = get_active_account(steam_path)
+    app_id = get_app_id(mod_path, steam_path)
+    if account is None or app_id is None:
+        logger.info("Could not determine the Steam account ({account}) or app ID ({app_id})".format(
+            account=account, app_id=app_id
+        ))
+        return None
+    return get_path(steam_path, 'userdata/{account}/{app_id}/local/cfg'.format(account=account, app_id=app_id))
+
+
+def get_watch_dir(steam_path, mod_path):
+    """Get the narrowest folder that jam_cmd.cfg can be watched in.
+
+    Args:
+        steam_path (str): Path to Steam.
+        mod_path (str): The mod path of the game.
+
+    Returns:
+        tuple[str, bool]: The folder, and whether or not it has to be watched recursively. Falls back to the active
+            account's userdata folder, then to the whole userdata folder.
+    """
+    user_data = get_path(steam_path, 'userdata')
+    cfg_dir = get_cfg_dir(steam_path, mod_path)
+    if cfg_dir is not None:
+        if os.path.isdir(cfg_dir):
+            return cfg_dir, False
+        # The game hasn't written any cfgs for this account yet.
+        account_dir = os.path.dirname(os.path.dirname(os.path.dirname(cfg_dir)))
+        if os.path.isdir(account_dir):
+            return account_dir, True
+    return user_data, True
+
+
+def get_watch_pattern(steam_path, mod_path, file_name):
+    """Get a glob pattern for the files host_writeconfig could write, for watching them without a folder watch.
+
+    Args:
+        steam_path (str): Path to Steam.
+        mod_path (str): The mod path of the game.
+        file_name (str): The name of the cfg file, e.g. jam_cmd.cfg.
+
+    Returns:
+        str: The pattern. A plain path if the cfg folder of the active account is known.
+    """
+    watch_dir, recursive = get_watch_dir(steam_path, mod_path)
+    if not recursive:
+        return get_path(watch_dir, file_name)
+    if watch_dir == get_path(steam_path, 'userdata'):
+        return get_path(watch_dir, '*/*/local/cfg/' + file_name)
+    return get_path(watch_dir, '*/local/cfg/' + file_name)
@@ -0,0 +1,334 @@
+# Copyright (C) 10se1ucgo 2016
+#
+# This file is part of pyjam.
+#
+# pyjam is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# pyjam is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with pyjam.  If not, see <http://www.gnu.org/licenses/>.
+
+# Where the current track list and custom track data live. The GUI and Jam both read from and write to them,
+# from any thread.
+import contextlib
+import copy
+import json
+import logging
+import threading
+
+from .common import get_path, atomic_write, wrap_exceptions
+from .search import TrackSearchIndex
+
+try:
+    FileNotFoundError  # This will throw a NameError if the user is using Python 2.
+except NameError:
+    FileNotFoundError = IOError
+
+__all__ = ['TrackStore', 'TrackDataStore']
+logger = logging.getLogger(__name__)
+
+
+class TrackStore(object):
+    """
+    A thread safe track list that notifies listeners whenever it changes.
+    """
+    def __init__(self, tracks=None):
+        """
+        Args:
+            tracks (list[Track] or None): The initial list of Tracks.
+        """
+        self._tracks = list(tracks or [])
+        self._search_index = TrackSearchIndex(self._tracks)
+        self._lock = threading.Lock()
+        self._index_built = threading.Condition(self._lock)
+        self._build_lock = threading.Lock()
+        self._generation = 0
+        self._listeners = []
+        self._update_listeners = []
+
+    def get_tracks(self):
+        """Get the current track list.
+
+        Returns:
+            list[Track]: The Tracks. The list is never modified in place, so it's safe to keep around.
+        """
+        with self._lock:
+            return self._tracks
+
+    def get_track(self, index):
+        """Get a single track.
+
+        Args:
+            index (int): The index of the Track.
+
+        Returns:
+            Track: The Track.
+
+        Raises:
+            IndexError: If there is no Track with that index.
+        """
+        return self.get_tracks()[index]
+
+    def search(self, query, limit=10):
+        """Search the track list by name and aliases.
+
+        Args:
+            query (str): The search query.
+            limit (int): The maximum amount of results.
+
+        Returns:
+            list[SearchResult]: The best matches, best first.
+        """
+        with self._lock:
+            search_index = self._get_search_index()
+        return search_index.search(query, limit)
+
+    def _get_search_index(self):
+        # Must be called with the lock held. Waits for the index of the current track list to be built.
+        while self._search_index is None:
+            self._index_built.wait()
+        return self._search_index
+
+    def set_tracks(self, tracks):
+        """Replace the track list and notify every listener.
+        The search index is rebuilt on a background thread, searches in the meantime wait for it.
+
+        Args:
+            tracks (list[Track]): The new list of Tracks.
+
+        Returns:
+            None
+        """
+        tracks = list(tracks)
+        with self._lock:
+            self._tracks = tracks
+            self._search_index = None
+            self._generation += 1
+            generation = self._generation
+            listeners = list(self._listeners)
+        builder = threading.Thread(target=self._build_search_index, args=(tracks, generation))
+        builder.daemon = True
+        builder.start()
+        for listener in listeners:
+            listener(tracks)
+
+    @wrap_exceptions
+    def _build_search_index(self, tracks, generation):
+        # One build at a time. Builds for a track list that was replaced in the meantime are skipped.
+        with self._build_lock:
+            with self._lock:
+                if generation != self._generation:
+                    return
+            search_index = None
+            try:
+                search_index = TrackSearchIndex(tracks)
+            finally:
+                with self._lock:
+                    if generation == self._generation:
+                        # Searches shouldn't wait forever if the build failed, they just won't find anything.
+                        self._search_index = search_index if search_index is not None else TrackSearchIndex([])
+                        self._index_built.notify_all()
+
+    def update_tracks(self, positions):
+        """Let everyone know that some Tracks were changed in place (e.g. new aliases or binds).
+
+        Args:
+            positions (list[int]): The positions of the changed Tracks in the track list.
+
+        Returns:
+            None
+        """
+        with self._lock:
+            search_index = self._get_search_index()
+            for position in positions:
+                search_index.reindex(position)
+            changed = [self._tracks[position] for position in positions]
+            listeners = list(self._update_listeners)
+        for listener in listeners:
+            listener(changed)
+
+    def add_listener(self, listener):
+        """Get notified whenever the track list is replaced.
+
+        Args:
+            listener (function): Called with the new list of Tracks, on the thread that replaced it.
+
+        Returns:
+            None
+        """
+        with self._lock:
+            self._listeners.append(listener)
+
+    def remove_listener(self, listener):
+        with self._lock:
+            self._listeners.remove(listener)
+
+    def add_update_listener(self, listener):
+        """Get notified whenever Tracks are changed in place.
+
+        Args:
+            listener (function): Called with a list of the changed Tracks, on the thread that changed them.
+
+        Returns:
+            None
+        """
+        with self._lock:
+            self._update_listeners.append(listener)
+
+    def remove_update_listener(self, listener):
+        with self._lock:
+            self._update_listeners.remove(listener)
+
+    def __len__(self):
+        return len(self.get_tracks())
+
+    def __repr__(self):
+        return "{c}(tracks={num})".format(c=self.__class__, num=len(self))
+
+
+class TrackDataStore(object):
+    """
+    The custom track data (aliases and binds) of an audio folder, kept in memory.
+    Every change (or batch of changes) is written to track_data.json with a single atomic write.
+    """
+    # Format for custom track data.
+    # {
+    #     "song1": {"aliases": ["alias1", "alias2", "etc."], "bind": "DOWNARROW"},
+    #     "song2": {"aliases": ["alias3", "alias4", "etc."], "bind": "KP_INS"}
+    # }
+    def __init__(self, audio_path):
+        """
+        Args:
+            audio_path (str): The audio folder.
+        """
+        self.data_path = get_path(audio_path, 'track_data.json')
+        self._lock = threading.RLock()
+        self._batch = None
+        self._data = self._load()
+
+    def _load(self):
+        try:
+            with open(self.data_path) as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return {}
+        except ValueError:
+            logger.exception("Invalid track data for {path}".format(path=self.data_path))
+            return {}
+        return data if isinstance(data, dict) else {}
+
+    def get_data(self):
+        """Get a copy of all of the track data.
+
+        Returns:
+            dict: The track data, keyed by track name.
+        """
+        with self._lock:
+            return copy.deepcopy(self._data)
+
+    def get(self, name, key, default=None):
+        """Get a single value for a track.
+
+        Args:
+            name (str): The name of the track.
+            key (str): 'aliases' or 'bind'.
+            default (object): Returned if the track has no such value.
+
+        Returns:
+            object: The value.
+        """
+        with self._lock:
+            return copy.deepcopy(self._data.get(name, {}).get(key, default))
+
+    def set(self, name, key, value):
+        """Set (or clear) a value for a track.
+        A bind or alias can only belong to one track, so it's removed from any other track that had it.
+
+        Args:
+            name (str): The name of the track.
+            key (str): 'aliases' or 'bind'.
+            value (object): The new value. None clears it.
+
+        Returns:
+            set[str]: The names of every track whose data changed.
+        """
+        with self.batch() as batch:
+            if self._data.get(name, {}).get(key) == value:
+                return set()
+            changed = {name}
+            if value is not None:
+                for other, values in self._data.items():
+                    if other == name or key not in values:
+                        continue
+                    if key == 'aliases':
+                        remaining = [alias for alias in values[key] if alias not in value]
+                    else:
+                        remaining = None if values[key] == value else values[key]
+                    if remaining == values[key]:
+                        continue
+                    changed.add(other)
+                    if remaining:
+                        values[key] = remaining
+                    else:
+                        del values[key]
+                self._data.setdefault(name, {})[key] = value
+            elif key in self._data.get(name, {}):
+                del self._data[name][key]
+
+            for other in changed:
+                if other in self._data and not self._data[other]:
+                    del self._data[other]
+            batch.update(changed)
+        return changed
+
+    def clear(self):
+        """Remove the data of every track.
+
+        Returns:
+            set[str]: The names of every track whose data changed.
+        """
+        with self.batch() as batch:
+            changed = set(self._data)
+            self._data = {}
+            batch.update(changed)
+        return changed
+
+    @contextlib.contextmanager
+    def batch(self):
+        """Group several changes into a single write. Batches can be nested, the outermost one writes.
+
+        Returns:
+            contextmanager[set[str]]: The names of every track changed so far in the batch.
+        """
+        with self._lock:
+            if self._batch is not None:
+                yield self._batch
+                return
+
+            self._batch = set()
+            try:
+                yield self._batch
+            finally:
+                changed, self._batch = self._batch, None
+                if changed:
+                    self.save()
+
+    def save(self):
+        """Write the track data to disk.
+
+        Returns:
+            None
+        """
+        with self._lock:
+            logger.info("Writing track data to {path}".format(path=self.data_path))
+            atomic_write(self.data_path, json.dumps(self._data, sort_keys=True))
+
+    def __repr__(self):
+        return "{c}(file={file})".format(c=self.__class__, file=self.data_path)